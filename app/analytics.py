@@ -0,0 +1,220 @@
+"""
+图分析任务
+
+把 Book/Author/School/Company 子图导出为边列表，用 NumPy/SciPy 稀疏矩阵一次性计算
+度数、PageRank 和社区标签，再分批写回节点属性 degree、pagerank、community，
+查询接口和可视化直接读取这些属性排序和确定节点大小，请求时不做任何计算。
+
+写回后使这些节点的单实体缓存和图快照缓存失效。
+任务在后台运行，同一时间只运行一个，状态保存在进程内(最多保留 ANALYTICS_JOB_HISTORY 个已结束的任务)。
+需要安装可选依赖：pip install numpy scipy (或 pip install .[analytics])。
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+
+from app.cache import entity_cache
+from app.db import open_session, write
+from app.events import graph_events
+from app.projection import export_edge_list
+
+logger = logging.getLogger(__name__)
+
+# 保留的已结束任务记录数，排队和运行中的任务不会被清除
+ANALYTICS_JOB_HISTORY = 20
+FINISHED = ("succeeded", "failed")
+# 写回属性时每个事务的节点数
+ANALYTICS_WRITE_BATCH = 10000
+
+WRITE_SCORES = """
+UNWIND $rows AS row
+MATCH (n) WHERE elementId(n) = row.element_id
+SET n.degree = row.degree, n.pagerank = row.pagerank, n.community = row.community
+"""
+
+
+def _require_scipy():
+    try:
+        import numpy as np
+        import scipy.sparse as sparse
+    except ImportError as e:
+        raise RuntimeError("Graph analytics requires numpy and scipy: pip install numpy scipy") from e
+    return np, sparse
+
+
+def compute_scores(n, sources, targets, damping=0.85, max_iterations=100, tolerance=1e-6, community_iterations=20):
+    """
+    计算度数、PageRank 和社区标签，关系按无向处理
+    :param n: 节点数
+    :param sources: 关系起点下标
+    :param targets: 关系终点下标
+    :param damping: PageRank 阻尼系数
+    :param max_iterations: PageRank 最大迭代次数
+    :param tolerance: PageRank 两次迭代的 L1 差小于该值时停止
+    :param community_iterations: 标签传播最大迭代次数
+    :return: {"degree", "pagerank", "community"} 三个长度为 n 的数组，以及 "iterations"
+    """
+    np, sparse = _require_scipy()
+    if n == 0:
+        empty = np.zeros(0)
+        return {"degree": empty.astype(np.int64), "pagerank": empty, "community": empty.astype(np.int64), "iterations": 0}
+    rows = np.frombuffer(sources, dtype=np.int32) if len(sources) else np.zeros(0, dtype=np.int32)
+    cols = np.frombuffer(targets, dtype=np.int32) if len(targets) else np.zeros(0, dtype=np.int32)
+    # 对称邻接矩阵，重复关系累加为权重
+    adjacency = sparse.coo_matrix(
+        (np.ones(2 * len(rows)), (np.concatenate([rows, cols]), np.concatenate([cols, rows]))), shape=(n, n)
+    ).tocsr()
+    degree = np.asarray(adjacency.sum(axis=1)).ravel()
+
+    # PageRank 幂迭代：r = d * A^T D^-1 r + (1 - d + d * 悬挂节点的分数) / n
+    dangling = degree == 0
+    inverse_degree = np.divide(1.0, degree, out=np.zeros(n), where=~dangling)
+    transition = adjacency.T.tocsr()
+    rank = np.full(n, 1.0 / n)
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        spread = transition @ (rank * inverse_degree)
+        updated = damping * spread + (1 - damping + damping * rank[dangling].sum()) / n
+        delta = np.abs(updated - rank).sum()
+        rank = updated
+        if delta < tolerance:
+            break
+
+    # 标签传播：每个节点取邻居(含自身)中出现次数最多的标签，相同次数取较小的标签
+    # 带自环可以避免书籍-作者这种二分图上同步更新时的来回振荡
+    labels = np.arange(n)
+    propagation = (adjacency + sparse.identity(n, format="csr")).tocsr()
+    for _ in range(community_iterations):
+        # 第 i 行第 j 列为节点 i 的邻居中标签为 j 的权重，合并重复项会原地修改数组，所以要复制
+        votes = sparse.csr_matrix(
+            (propagation.data, labels[propagation.indices], propagation.indptr), shape=(n, n), copy=True
+        )
+        votes.sum_duplicates()
+        updated = np.asarray(votes.argmax(axis=1)).ravel()
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    # 社区编号按首次出现重新编为 0, 1, 2...
+    _, community = np.unique(labels, return_inverse=True)
+
+    return {"degree": degree.astype(np.int64), "pagerank": rank, "community": community, "iterations": iterations}
+
+
+class AnalyticsJobs:
+    """后台分析任务的提交与状态查询"""
+
+    def __init__(self, history=ANALYTICS_JOB_HISTORY):
+        self.history = history
+        self._jobs = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._tasks = set()
+
+    def submit(self, driver, **options):
+        """
+        提交一个分析任务，立即返回任务状态
+        :param options: 传给 compute_scores 的参数
+        :raises RuntimeError: 没有安装 numpy/scipy
+        """
+        _require_scipy()
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "phase": None,
+            "options": options,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "nodes": None,
+            "edges": None,
+            "communities": None,
+            "iterations": None,
+            "seconds": {},
+            "error": None,
+        }
+        self._jobs[job["id"]] = job
+        self._evict()
+        task = asyncio.get_running_loop().create_task(self._run(driver, job))
+        # 保存引用，避免任务在完成前被回收
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def _evict(self):
+        """已结束的任务超过 history 个时，从最早的开始清除"""
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in FINISHED]
+        for job_id in finished[:len(finished) - self.history]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list(self):
+        """最近的任务，新任务在前"""
+        return list(reversed(self._jobs.values()))
+
+    async def _phase(self, job, phase, coroutine):
+        job["phase"] = phase
+        start = time.perf_counter()
+        try:
+            return await coroutine
+        finally:
+            job["seconds"][phase] = round(time.perf_counter() - start, 3)
+
+    async def _run(self, driver, job):
+        # 同一时间只运行一个任务，后提交的任务排队
+        async with self._lock:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            try:
+                element_ids, ids, sources, targets = await self._phase(job, "export", export_edge_list(driver, "analytics"))
+                job["nodes"], job["edges"] = len(element_ids), len(sources)
+                # 矩阵计算是 CPU 密集的，放到线程中避免阻塞事件循环
+                scores = await self._phase(job, "compute", asyncio.to_thread(
+                    compute_scores, len(element_ids), sources, targets, **job["options"]
+                ))
+                job["iterations"] = scores["iterations"]
+                job["communities"] = int(scores["community"].max()) + 1 if len(element_ids) else 0
+                await self._phase(job, "write", self._write_back(driver, element_ids, ids, scores))
+                job["status"] = "succeeded"
+            except Exception as e:
+                logger.exception("Analytics job %s failed", job["id"])
+                job["status"] = "failed"
+                job["error"] = str(e) or type(e).__name__
+            finally:
+                job["phase"] = None
+                job["finished_at"] = time.time()
+                self._evict()
+
+    async def _write_back(self, driver, element_ids, ids, scores):
+        """
+        分批写回分析结果，每批提交后使其节点的单实体缓存失效
+        :param ids: 节点图 id，有业务主键的节点与单实体缓存键相同(如 Book:1)，没有的为 elementId，不在缓存中
+        """
+        degree = scores["degree"].tolist()
+        pagerank = scores["pagerank"].tolist()
+        community = scores["community"].tolist()
+        try:
+            async with open_session(driver) as session:
+                for start in range(0, len(element_ids), ANALYTICS_WRITE_BATCH):
+                    end = start + ANALYTICS_WRITE_BATCH
+                    rows = [
+                        {"element_id": element_id, "degree": d, "pagerank": p, "community": c}
+                        for element_id, d, p, c in zip(
+                            element_ids[start:end], degree[start:end], pagerank[start:end], community[start:end]
+                        )
+                    ]
+                    await write(session, "analytics.write_back", WRITE_SCORES, rows=rows)
+                    keys = [
+                        graph_id for graph_id, element_id in zip(ids[start:end], element_ids[start:end])
+                        if graph_id != element_id
+                    ]
+                    if keys:
+                        await entity_cache.invalidate(*keys)
+        finally:
+            # 写回不发布图变更事件(失败时也可能已提交部分批次)，图快照缓存需要失效
+            graph_events.touch()
+
+
+analytics_jobs = AnalyticsJobs()
@@ -0,0 +1,16 @@
+# 批量查询接口一次最多接受的 id 数量
+MAX_BATCH_IDS = 1000
+
+
+def order_by_ids(ids, found):
+    """
+    按请求中的顺序整理批量查询结果
+    :param ids: 请求的 id 列表，重复的 id 只保留第一次出现
+    :param found: 查询到的结果，id -> 实体
+    :return: {"items": [...], "missing": [...]}
+    """
+    ids = list(dict.fromkeys(ids))
+    return {
+        "items": [found[i] for i in ids if i in found],
+        "missing": [i for i in ids if i not in found],
+    }
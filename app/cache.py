@@ -0,0 +1,196 @@
+"""
+单实体查询的读穿透缓存
+
+进程内默认使用带 TTL 的 LRU 缓存；设置 CACHE_BACKEND=redis 时使用 Redis 作为多个
+worker 共享的缓存(需要安装 redis 包)。写操作通过 invalidate 删除对应的缓存项。
+缓存值应当是可 JSON 序列化的 dict，调用方不要修改取到的值。
+"""
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))          # 秒，0 表示关闭缓存
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+
+class CacheBackend:
+    """缓存后端接口"""
+
+    async def get(self, key):
+        raise NotImplementedError
+
+    async def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    async def delete(self, *keys):
+        raise NotImplementedError
+
+    async def clear(self):
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    """进程内 LRU 缓存，每一项带过期时间"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+
+    async def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    async def set(self, key, value, ttl):
+        self._items[key] = (value, time.monotonic() + ttl)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self._items.pop(key, None)
+
+    async def clear(self):
+        self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class RedisCache(CacheBackend):
+    """基于 Redis 的共享缓存，多个 worker 之间的写操作互相可见"""
+
+    def __init__(self, url=CACHE_REDIS_URL, prefix="neo4j-api:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package: pip install redis") from e
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key):
+        data = await self.client.get(self.prefix + key)
+        return json.loads(data) if data is not None else None
+
+    async def set(self, key, value, ttl):
+        await self.client.set(self.prefix + key, json.dumps(value, default=str), px=int(ttl * 1000))
+
+    async def delete(self, *keys):
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def clear(self):
+        keys = [key async for key in self.client.scan_iter(self.prefix + "*")]
+        if keys:
+            await self.client.delete(*keys)
+
+
+class ReadThroughCache:
+    """
+    读穿透缓存：未命中时调用 loader 加载并写入缓存，并发的相同请求只加载一次
+    loader 返回 None(实体不存在)时不缓存
+    """
+
+    def __init__(self, backend: CacheBackend, ttl=CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._inflight = {}
+
+    @staticmethod
+    def key(label, entity_id):
+        """缓存键，如 Book:1"""
+        return f"{label}:{entity_id}"
+
+    async def get_or_load(self, key, loader):
+        """
+        :param key: 缓存键
+        :param loader: 无参数的协程函数，返回实体 dict 或 None
+        """
+        if self.ttl <= 0:
+            return await loader()
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        while (future := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 加载的请求被取消(如客户端断开)时，等待者不跟着失败，重新检查后由其中一个自己加载
+                # 等待者本身被取消时照常抛出
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            # invalidate 会移除 inflight 项，此时加载结果可能已过期，不再写入缓存；
+            # 之后其他请求可能已登记了新的加载，只移除自己的
+            current = self._inflight.get(key) is future
+            if current:
+                del self._inflight[key]
+        if value is not None and current:
+            await self.backend.set(key, value, self.ttl)
+        future.set_result(value)
+        return value
+
+    async def invalidate(self, *keys):
+        """删除缓存项，写操作完成后调用"""
+        for key in keys:
+            self._inflight.pop(key, None)
+        await self.backend.delete(*keys)
+
+    async def clear(self):
+        self._inflight.clear()
+        await self.backend.clear()
+
+    def stats(self):
+        """命中统计"""
+        total = self.hits + self.misses
+        stats = {
+            "backend": type(self.backend).__name__,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+        if isinstance(self.backend, LRUCache):
+            stats["entries"] = len(self.backend)
+        return stats
+
+
+def create_cache() -> ReadThroughCache:
+    """根据 CACHE_BACKEND 创建缓存"""
+    if CACHE_BACKEND == "redis":
+        return ReadThroughCache(RedisCache())
+    if CACHE_BACKEND != "memory":
+        raise RuntimeError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+    return ReadThroughCache(LRUCache())
+
+
+# 单实体 GET 共用的缓存
+entity_cache = create_cache()
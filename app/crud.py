@@ -1,6 +1,11 @@
-from neo4j import Session
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
 from app.schemas import CompanyCreate, CompanyOut
 
+if TYPE_CHECKING:
+    from neo4j import Session
+
 def create_company(session: Session, company: CompanyCreate) -> CompanyOut:
     query = """
     MERGE (c:Company {company_id:$company_id})
@@ -1,24 +1,335 @@
-from neo4j import GraphDatabase, Session
+from __future__ import annotations
+
+import asyncio
+import logging
 import os
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.requests import Request
-from starlette.responses import Response
+import time
+from contextlib import asynccontextmanager
+from itertools import count
+from typing import TYPE_CHECKING, AsyncIterator
+from app import slow_query
+from app.metrics import ROW_BUCKETS, Gauge, Histogram
+
+# neo4j 包在创建驱动时才导入，只用到 schema、服务或路由定义的脚本和测试不需要加载驱动
+if TYPE_CHECKING:
+    from neo4j import AsyncDriver, AsyncSession
+
+logger = logging.getLogger(__name__)
 
 NEO4J_URI = os.getenv("NEO4J_URI", "neo4j://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASS = os.getenv("NEO4J_PASS", "fengjutian")
+# 连接池配置，多个 uvicorn worker 各有一个连接池，总连接数为 worker 数 * NEO4J_MAX_POOL_SIZE
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "100"))
+# 连接池耗尽时等待空闲连接的最长时间，秒
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60"))
+# 空闲超过该时间的连接在取出前先做存活检查，秒；不设置时不检查
+NEO4J_LIVENESS_CHECK_TIMEOUT = os.getenv("NEO4J_LIVENESS_CHECK_TIMEOUT")
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+# 启动时预先建立的连接数
+NEO4J_POOL_WARMUP = int(os.getenv("NEO4J_POOL_WARMUP", "10"))
+# 托管事务遇到瞬时错误(死锁、leader 切换等)时的最长重试时间，秒
+NEO4J_MAX_RETRY_TIME = float(os.getenv("NEO4J_MAX_RETRY_TIME", "15"))
+# 打开超过该时间仍未关闭的 session 计为疑似泄漏，秒
+SESSION_LEAK_SECONDS = float(os.getenv("NEO4J_SESSION_LEAK_SECONDS", "30"))
+# 关闭驱动前等待进行中的查询结束的最长时间，秒
+NEO4J_DRAIN_TIMEOUT = float(os.getenv("NEO4J_DRAIN_TIMEOUT", "10"))
+
+# 异步驱动由应用 lifespan 创建和关闭，见 main.py
+driver: AsyncDriver | None = None
+
+
+async def init_driver() -> AsyncDriver:
+    """Create the shared async Neo4j driver."""
+    global driver
+    if driver is None:
+        from neo4j import AsyncGraphDatabase
+
+        config = {
+            "max_connection_pool_size": NEO4J_MAX_POOL_SIZE,
+            "connection_acquisition_timeout": NEO4J_ACQUISITION_TIMEOUT,
+            "max_connection_lifetime": NEO4J_MAX_CONNECTION_LIFETIME,
+            "max_transaction_retry_time": NEO4J_MAX_RETRY_TIME,
+        }
+        if NEO4J_LIVENESS_CHECK_TIMEOUT is not None:
+            config["liveness_check_timeout"] = float(NEO4J_LIVENESS_CHECK_TIMEOUT)
+        driver = AsyncGraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS), **config)
+    return driver
+
+
+async def check_connectivity(neo4j_driver: AsyncDriver, timeout: float = 5.0) -> str | None:
+    """
+    检查能否连接到 Neo4j
+    :return: 连接正常返回 None，否则返回错误信息
+    """
+    from neo4j.exceptions import DriverError, Neo4jError
+
+    try:
+        await asyncio.wait_for(neo4j_driver.verify_connectivity(), timeout)
+    except (Neo4jError, DriverError, OSError, asyncio.TimeoutError) as e:
+        return str(e) or type(e).__name__
+    return None
+
+
+async def warm_up_pool(neo4j_driver: AsyncDriver, connections: int = NEO4J_POOL_WARMUP) -> str | None:
+    """
+    预先建立连接，避免第一批请求承担建连和认证的耗时
+    同时开启 connections 个事务，使连接池创建同样数量的连接，然后全部归还
+    部分连接失败(如获取连接超时、超过服务端连接数上限)时，已打开的连接照常归还
+    :return: 全部成功返回 None，否则返回第一个错误的信息
+    """
+    from neo4j.exceptions import DriverError, Neo4jError
+
+    connections = min(connections, NEO4J_MAX_POOL_SIZE)
+    sessions = [neo4j_driver.session() for _ in range(connections)]
+    errors = []
+    try:
+        results = await asyncio.gather(*(session.begin_transaction() for session in sessions), return_exceptions=True)
+        transactions = []
+        for result in results:
+            (errors if isinstance(result, BaseException) else transactions).append(result)
+        errors += [
+            result for result in await asyncio.gather(*(tx.rollback() for tx in transactions), return_exceptions=True)
+            if isinstance(result, BaseException)
+        ]
+    finally:
+        errors += [
+            result for result in await asyncio.gather(*(session.close() for session in sessions), return_exceptions=True)
+            if isinstance(result, BaseException)
+        ]
+    for error in errors:
+        # 连接错误只报告，其他异常(如取消)照常抛出
+        if not isinstance(error, (Neo4jError, DriverError, OSError, asyncio.TimeoutError)):
+            raise error
+    if errors:
+        return f"{len(errors)} of {connections} connections failed: {str(errors[0]) or type(errors[0]).__name__}"
+    return None
+
+
+async def close_driver() -> None:
+    """Close the shared async Neo4j driver."""
+    global driver
+    if driver is not None:
+        await driver.close()
+        driver = None
+
+
+def get_driver() -> AsyncDriver:
+    """Get the shared async Neo4j driver."""
+    if driver is None:
+        raise RuntimeError("Neo4j driver is not initialized, call init_driver() first")
+    return driver
+
+
+class SessionStats:
+    """统计应用打开的 session，用于发现未关闭的 session"""
+
+    def __init__(self):
+        self.opened = 0
+        self.closed = 0
+        self.peak = 0
+        self._ids = count()
+        self._open = {}
+
+    def open(self) -> int:
+        key = next(self._ids)
+        self._open[key] = time.monotonic()
+        self.opened += 1
+        self.peak = max(self.peak, len(self._open))
+        return key
+
+    def close(self, key: int) -> None:
+        self._open.pop(key, None)
+        self.closed += 1
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            "opened": self.opened,
+            "closed": self.closed,
+            "active": len(self._open),
+            "peak_active": self.peak,
+            "leaked": sum(1 for start in self._open.values() if now - start > SESSION_LEAK_SECONDS),
+        }
+
+
+session_stats = SessionStats()
+
+
+async def drain_sessions(timeout: float = NEO4J_DRAIN_TIMEOUT, interval: float = 0.05) -> int:
+    """
+    等待所有 session 关闭，关闭驱动前调用，避免中断进行中的查询(后台任务、流式导出等)
+    :param timeout: 最长等待时间，秒
+    :return: 超时后仍未关闭的 session 数
+    """
+    deadline = time.monotonic() + timeout
+    while session_stats.stats()["active"] and time.monotonic() < deadline:
+        await asyncio.sleep(interval)
+    return session_stats.stats()["active"]
+
+# 按查询名称统计，名称由调用方给出，如 book.get
+QUERY_SECONDS = Histogram(
+    "neo4j_query_duration_seconds", "Client-side query duration including retries", ["query", "kind"]
+)
+QUERY_ROWS = Histogram("neo4j_query_rows", "Records returned per query", ["query"], buckets=ROW_BUCKETS)
+QUERY_SERVER_SECONDS = Histogram(
+    "neo4j_query_server_seconds",
+    "Server-side result_available_after (phase=available) and result_consumed_after (phase=consumed)",
+    ["query", "phase"],
+)
+ACQUIRE_SECONDS = Histogram(
+    "neo4j_connection_acquire_seconds",
+    "Time until a managed transaction starts: pool acquisition, plus BEGIN when not pipelined",
+)
+
+
+def pool_stats(neo4j_driver: AsyncDriver | None = None):
+    """
+    连接池使用情况
+    驱动没有公开连接池的统计接口，这里读取其内部的连接列表
+    """
+    neo4j_driver = neo4j_driver or driver
+    pool = getattr(neo4j_driver, "_pool", None)
+    if pool is None:
+        return {"max_size": None, "in_use": 0, "idle": 0}
+    connections = [c for conns in list(pool.connections.values()) for c in conns]
+    in_use = sum(1 for c in connections if c.in_use)
+    return {
+        "max_size": pool.pool_config.max_connection_pool_size,
+        "in_use": in_use,
+        "idle": len(connections) - in_use,
+    }
+
+
+Gauge("neo4j_pool_max_size", "Configured connection pool size", lambda: pool_stats()["max_size"])
+Gauge(
+    "neo4j_pool_connections", "Pooled connections by state",
+    lambda: {("in_use",): pool_stats()["in_use"], ("idle",): pool_stats()["idle"]}, ["state"],
+)
+Gauge("neo4j_sessions_active", "Open sessions", lambda: session_stats.stats()["active"])
+Gauge("neo4j_sessions_leaked", "Sessions open longer than NEO4J_SESSION_LEAK_SECONDS", lambda: session_stats.stats()["leaked"])
+Gauge("neo4j_sessions_opened_total", "Sessions opened", lambda: session_stats.opened, kind="counter")
+
+
+@asynccontextmanager
+async def open_session(neo4j_driver: AsyncDriver, **config) -> AsyncIterator[AsyncSession]:
+    """打开一个 session，退出时关闭，打开和关闭计入 session_stats"""
+    key = session_stats.open()
+    try:
+        async with neo4j_driver.session(**config) as session:
+            yield session
+    finally:
+        session_stats.close(key)
+
+
+@asynccontextmanager
+async def session_scope(neo4j_driver: AsyncDriver, session: AsyncSession | None = None) -> AsyncIterator[AsyncSession]:
+    """优先复用请求级 session，没有时(脚本中直接调用服务)临时打开一个"""
+    if session is not None:
+        yield session
+    else:
+        async with open_session(neo4j_driver) as session:
+            yield session
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """
+    请求级 Neo4j session 依赖
+    同一请求内的多个依赖和服务调用共用这个 session，请求结束时关闭
+    """
+    async with open_session(get_driver()) as session:
+        yield session
+
+
+def _observe(name, kind, query, params, seconds, rows, summary=None):
+    QUERY_SECONDS.observe(seconds, query=name, kind=kind)
+    QUERY_ROWS.observe(rows, query=name)
+    if summary is not None:
+        # 驱动返回的是毫秒
+        if summary.result_available_after is not None:
+            QUERY_SERVER_SECONDS.observe(summary.result_available_after / 1000, query=name, phase="available")
+        if summary.result_consumed_after is not None:
+            QUERY_SERVER_SECONDS.observe(summary.result_consumed_after / 1000, query=name, phase="consumed")
+    slow_query.record(driver, name, kind, query, params, seconds, rows)
+
+
+async def _execute(session: AsyncSession, kind: str, name: str, query: str, params):
+    start = time.perf_counter()
+    started = False
+
+    async def work(tx):
+        nonlocal started
+        if not started:
+            # 事务函数第一次被调用时连接已取到，重试不重复计入
+            started = True
+            ACQUIRE_SECONDS.observe(time.perf_counter() - start)
+        result = await tx.run(query, params)
+        records = [record async for record in result]
+        return records, await result.consume()
+
+    execute = session.execute_read if kind == "read" else session.execute_write
+    records, summary = [], None
+    try:
+        records, summary = await execute(work)
+        return records
+    finally:
+        _observe(name, kind, query, params, time.perf_counter() - start, len(records), summary)
+
+
+async def read(session: AsyncSession, name: str, query: str, params=None, /, **kwargs):
+    """
+    在托管读事务中执行查询，瞬时错误由驱动自动重试
+    :param name: 查询名称，用于指标和慢查询日志，如 book.get
+    :return: 记录列表
+    """
+    return await _execute(session, "read", name, query, {**(params or {}), **kwargs})
+
+
+async def write(session: AsyncSession, name: str, query: str, params=None, /, **kwargs):
+    """
+    在托管写事务中执行查询，瞬时错误由驱动自动重试，查询需要可以安全重放
+    :param name: 查询名称，用于指标和慢查询日志，如 book.create
+    :return: 记录列表
+    """
+    return await _execute(session, "write", name, query, {**(params or {}), **kwargs})
+
 
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+async def auto_commit(session: AsyncSession, name: str, query: str, params=None, /, **kwargs):
+    """
+    以自动提交事务执行写查询，用于 CALL { ... } IN TRANSACTIONS 这类不能在托管事务中运行的语句
+    出错时不重试，分批提交的语句失败时已提交的批次不会回滚
+    :param name: 查询名称
+    :return: (记录列表, ResultSummary)
+    """
+    start = time.perf_counter()
+    records, summary = [], None
+    params = {**(params or {}), **kwargs}
+    try:
+        result = await session.run(query, params)
+        records = [record async for record in result]
+        summary = await result.consume()
+        return records, summary
+    finally:
+        _observe(name, "write", query, params, time.perf_counter() - start, len(records), summary)
 
-def get_session() -> Session:
-    """Get a Neo4j session."""
-    return driver.session()
 
-class CloseNeo4jSessionMiddleware(BaseHTTPMiddleware):
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        response = await call_next(request)
-        # Neo4j sessions will be automatically closed when they go out of scope
-        return response
+async def stream(session: AsyncSession, name: str, query: str, params=None, /, **kwargs):
+    """
+    以自动提交事务逐条读取记录，按 session 的 fetch_size 分批拉取，用于流式导出
+    流式结果无法在托管事务中重放，出错时不重试
+    :param name: 查询名称
+    :return: 记录的异步迭代器
+    """
+    start = time.perf_counter()
+    rows = 0
+    summary = None
+    params = {**(params or {}), **kwargs}
+    try:
+        result = await session.run(query, params)
+        async for record in result:
+            rows += 1
+            yield record
+        summary = await result.consume()
+    finally:
+        # 客户端提前断开时不再拉取剩余记录，也就没有服务端耗时
+        _observe(name, "stream", query, params, time.perf_counter() - start, rows, summary)
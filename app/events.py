@@ -0,0 +1,91 @@
+"""
+图变更事件的进程内广播
+
+写接口调用 publish 发布节点/关系的增删改事件，每个 SSE 连接持有一个有界队列。
+事件只编码一次，广播时逐个放入各连接的队列；队列满(客户端太慢)的连接会收到
+resync 事件后被断开，客户端重连后应重新拉取 /api/graph 快照。
+"""
+import asyncio
+import json
+import os
+import time
+
+# 每个连接最多缓存的未发送事件数
+EVENT_QUEUE_SIZE = int(os.getenv("GRAPH_EVENT_QUEUE_SIZE", "1000"))
+
+RESYNC = b"event: resync\ndata: {}\n\n"
+
+
+class GraphEventBroker:
+    def __init__(self, queue_size=EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._listeners = []
+        self._next_id = 0
+        # 图数据版本，每次变更加一，按版本缓存的图快照随之失效
+        self.version = 0
+        self.published = 0
+        self.deliveries = 0
+        self.dropped_clients = 0
+        self.fanout_ns = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        """注册一个连接，返回其事件队列，队列中的 None 表示需要断开"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def add_listener(self, callback):
+        """注册进程内的事件回调 callback(op, kind, data)，如内存中的图投影"""
+        self._listeners.append(callback)
+
+    def touch(self):
+        """图数据在不发布事件的情况下发生了变化(批量导入、分析结果写回)，只增加版本"""
+        self.version += 1
+
+    def publish(self, op, kind, data):
+        """
+        发布一个事件
+        :param op: add / update / remove
+        :param kind: node / link
+        :param data: 节点 {id, name, group, category} 或关系 {source, target, type}
+        """
+        self.version += 1
+        for callback in self._listeners:
+            callback(op, kind, data)
+        if not self._subscribers:
+            return
+        start = time.perf_counter_ns()
+        self._next_id += 1
+        payload = json.dumps({"op": op, "kind": kind, "data": data}, ensure_ascii=False, default=str)
+        message = f"id: {self._next_id}\nevent: graph\ndata: {payload}\n\n".encode()
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+                self.deliveries += 1
+            except asyncio.QueueFull:
+                # 客户端跟不上，清空积压并通知其断开
+                self._subscribers.discard(queue)
+                self.dropped_clients += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+        self.published += 1
+        self.fanout_ns += time.perf_counter_ns() - start
+
+    def stats(self):
+        """广播统计，fanout_us_per_client 为每个事件投递到单个连接的平均耗时"""
+        return {
+            "clients": len(self._subscribers),
+            "published": self.published,
+            "deliveries": self.deliveries,
+            "dropped_clients": self.dropped_clients,
+            "fanout_us_per_event": round(self.fanout_ns / self.published / 1000, 3) if self.published else 0.0,
+            "fanout_us_per_client": round(self.fanout_ns / self.deliveries / 1000, 3) if self.deliveries else 0.0,
+        }
+
+
+graph_events = GraphEventBroker()
@@ -0,0 +1,35 @@
+import os
+from typing import AsyncIterator
+from fastapi.responses import StreamingResponse
+from app.fastjson import dumps
+
+# 导出接口每次从 Neo4j 拉取的记录数
+EXPORT_FETCH_SIZE = int(os.getenv("NEO4J_EXPORT_FETCH_SIZE", "1000"))
+MAX_EXPORT_FETCH_SIZE = 10000
+# 响应分块大小，攒够后再写给客户端
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+async def ndjson_lines(rows: AsyncIterator[dict], chunk_bytes: int = EXPORT_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """
+    把逐条产生的记录编码为 NDJSON，每行一条记录
+    :param rows: 记录的异步迭代器
+    :param chunk_bytes: 每个分块的大致字节数
+    """
+    buffer = []
+    size = 0
+    async for row in rows:
+        line = dumps(row) + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def ndjson_response(rows: AsyncIterator[dict]) -> StreamingResponse:
+    """以 application/x-ndjson 流式返回记录"""
+    return StreamingResponse(ndjson_lines(rows), media_type="application/x-ndjson")
@@ -0,0 +1,37 @@
+"""
+JSON 快速编码
+
+安装了 orjson 时用 orjson 编码，否则退回标准库 json：pip install orjson (或 pip install .[fastjson])。
+列表和导出接口可以返回 FastJSONResponse，把服务层查询出的 dict 直接编码为字节，
+跳过 response_model 校验和 jsonable_encoder 的逐行复制。只用于字段和类型已经由
+Cypher 投影保证的接口，response_model 仍然保留用于接口文档。
+"""
+import json
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    # Neo4j 的日期时间等类型按字符串输出，与 json.dumps(default=str) 一致
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """编码为紧凑的 UTF-8 JSON 字节"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+
+class FastJSONResponse(Response):
+    """直接编码内容的 JSON 响应，不做校验"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,153 @@
+"""
+图数据库 schema 管理：启动时幂等地创建唯一约束和索引，并报告缺失或未使用的索引
+
+用法:
+    python -m app.indexes          # 创建约束和索引并打印报告
+"""
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from neo4j import AsyncDriver
+
+logger = logging.getLogger(__name__)
+
+# 唯一约束：(名称, 标签, 属性)，同时为点查询提供索引
+CONSTRAINTS = [
+    ("book_id", "Book", "id"),
+    ("school_id", "School", "id"),
+    ("author_id", "Author", "author_id"),
+    ("user_id", "User", "user_id"),
+    ("company_id", "Company", "company_id"),
+    ("sequence_name", "Sequence", "name"),
+]
+
+# 普通索引：名称索引供关系接口按名称 MERGE 时使用，名称可能重复所以不加唯一约束
+INDEXES = [
+    ("author_name", "Author", "name"),
+    ("book_title", "Book", "title"),
+    ("school_name", "School", "name"),
+    # 按分析指标排序，见 /authors/top
+    ("author_pagerank", "Author", "pagerank"),
+    ("author_degree", "Author", "degree"),
+]
+
+# 全文索引：(名称, 标签, 属性列表)，供 /search 使用
+FULLTEXT_INDEXES = [
+    ("search_book", "Book", ["title"]),
+    ("search_author", "Author", ["name", "occupation", "birth_place"]),
+    # 通过 /author2school 创建的学校只有 name
+    ("search_school", "School", ["title", "name"]),
+    ("search_company", "Company", ["name"]),
+]
+
+
+def schema_statements() -> list[str]:
+    """所有约束和索引的创建语句"""
+    statements = [
+        f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"
+        for name, label, prop in CONSTRAINTS
+    ]
+    statements += [
+        f"CREATE INDEX {name} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})"
+        for name, label, prop in INDEXES
+    ]
+    statements += [
+        f"CREATE FULLTEXT INDEX {name} IF NOT EXISTS FOR (n:{label}) ON EACH [{', '.join(f'n.{prop}' for prop in props)}]"
+        for name, label, props in FULLTEXT_INDEXES
+    ]
+    return statements
+
+
+async def ensure_schema(driver: AsyncDriver) -> bool:
+    """
+    创建所有约束和索引，已存在的会被跳过
+    单条语句失败(例如已有重复数据)只记录日志，不影响应用启动
+    :param driver: Neo4j 驱动实例
+    :return: 是否全部创建成功
+    """
+    from neo4j.exceptions import DriverError, Neo4jError
+
+    ok = True
+    try:
+        async with driver.session() as session:
+            for statement in schema_statements():
+                try:
+                    result = await session.run(statement)
+                    await result.consume()
+                except Neo4jError as e:
+                    ok = False
+                    logger.warning("Failed to apply schema statement %r: %s", statement, e.message)
+    except DriverError as e:
+        logger.warning("Skipping schema setup, Neo4j is not available: %s", e)
+        return False
+    return ok
+
+
+async def index_report(driver: AsyncDriver) -> dict:
+    """
+    对比声明的索引和数据库中实际存在的索引
+    :param driver: Neo4j 驱动实例
+    :return: {"missing": [...], "unused": [...]}
+        missing: 声明了但不存在或未 ONLINE 的约束/索引
+        unused: 数据库中从未被读取过的索引(不含 LOOKUP 索引)
+    """
+    async with driver.session() as session:
+        result = await session.run(
+            "SHOW INDEXES YIELD name, type, labelsOrTypes, properties, state, readCount"
+        )
+        existing = [record.data() async for record in result]
+
+    online = {
+        (tuple(index["labelsOrTypes"] or []), tuple(index["properties"] or []))
+        for index in existing if index["state"] == "ONLINE"
+    }
+    missing = [
+        {"name": name, "label": label, "property": prop}
+        for name, label, prop in CONSTRAINTS + INDEXES
+        if ((label,), (prop,)) not in online
+    ]
+    missing += [
+        {"name": name, "label": label, "property": ",".join(props)}
+        for name, label, props in FULLTEXT_INDEXES
+        if ((label,), tuple(props)) not in online
+    ]
+    unused = [
+        {"name": index["name"], "labels": index["labelsOrTypes"], "properties": index["properties"]}
+        for index in existing
+        if index["type"] != "LOOKUP" and not index["readCount"]
+    ]
+    return {"missing": missing, "unused": unused}
+
+
+async def log_index_report(driver: AsyncDriver) -> None:
+    """启动时记录缺失和未使用的索引"""
+    from neo4j.exceptions import DriverError, Neo4jError
+
+    try:
+        report = await index_report(driver)
+    except (DriverError, Neo4jError) as e:
+        logger.warning("Could not inspect indexes: %s", e)
+        return
+    for index in report["missing"]:
+        logger.warning("Missing index %s on :%s(%s)", index["name"], index["label"], index["property"])
+    for index in report["unused"]:
+        logger.info("Unused index %s on %s%s", index["name"], index["labels"], index["properties"])
+
+
+if __name__ == "__main__":
+    import asyncio
+    import json
+    from app.db import init_driver, close_driver
+
+    async def main():
+        driver = await init_driver()
+        try:
+            await ensure_schema(driver)
+            print(json.dumps(await index_report(driver), indent=2, ensure_ascii=False))
+        finally:
+            await close_driver()
+
+    asyncio.run(main())
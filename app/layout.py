@@ -0,0 +1,94 @@
+"""
+服务端力导向布局(Fruchterman-Reingold)
+
+斥力只在相邻网格内的节点之间计算，每轮迭代的开销近似与节点数成线性关系，
+大图可以在服务端预先算好坐标，前端直接按坐标渲染(ECharts layout: 'none')。
+"""
+import math
+import random
+from collections import defaultdict
+
+# 理想边长，画布边长为 EDGE_LENGTH * sqrt(节点数)
+EDGE_LENGTH = 50.0
+LAYOUT_ITERATIONS = 50
+
+
+def force_layout(node_ids, edges, iterations=LAYOUT_ITERATIONS, edge_length=EDGE_LENGTH, seed=0):
+    """
+    计算力导向布局坐标
+    :param node_ids: 节点 id 列表
+    :param edges: (source, target) 列表，端点不在 node_ids 中的边会被忽略
+    :param iterations: 迭代次数
+    :param edge_length: 理想边长
+    :param seed: 随机种子，相同输入得到相同布局
+    :return: {node_id: (x, y)}
+    """
+    n = len(node_ids)
+    if n == 0:
+        return {}
+    rnd = random.Random(seed)
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    size = edge_length * math.sqrt(n)
+    xs = [rnd.uniform(0, size) for _ in range(n)]
+    ys = [rnd.uniform(0, size) for _ in range(n)]
+    pairs = [
+        (index[s], index[t]) for s, t in edges
+        if s in index and t in index and s != t
+    ]
+
+    k = edge_length
+    k2 = k * k
+    cell = 1.5 * k
+    max_distance2 = cell * cell
+    start_temperature = size / 10
+
+    for iteration in range(iterations):
+        dx = [0.0] * n
+        dy = [0.0] * n
+
+        # 斥力：k^2 / d，只考虑周围 3x3 网格内的节点
+        grid = defaultdict(list)
+        for i in range(n):
+            grid[(int(xs[i] // cell), int(ys[i] // cell))].append(i)
+        for (cx, cy), members in grid.items():
+            neighbors = [
+                j for ox in (-1, 0, 1) for oy in (-1, 0, 1)
+                for j in grid.get((cx + ox, cy + oy), ())
+            ]
+            for i in members:
+                xi, yi = xs[i], ys[i]
+                for j in neighbors:
+                    if i == j:
+                        continue
+                    ddx = xi - xs[j]
+                    ddy = yi - ys[j]
+                    d2 = ddx * ddx + ddy * ddy
+                    if d2 < 0.01:
+                        # 重合的节点随机推开
+                        ddx, ddy, d2 = rnd.uniform(-1, 1), rnd.uniform(-1, 1), 0.01
+                    if d2 < max_distance2:
+                        force = k2 / d2
+                        dx[i] += ddx * force
+                        dy[i] += ddy * force
+
+        # 引力：d^2 / k，沿边方向
+        for i, j in pairs:
+            ddx = xs[i] - xs[j]
+            ddy = ys[i] - ys[j]
+            d = math.sqrt(ddx * ddx + ddy * ddy) or 0.1
+            force = d / k
+            dx[i] -= ddx * force
+            dy[i] -= ddy * force
+            dx[j] += ddx * force
+            dy[j] += ddy * force
+
+        # 位移不超过当前温度，温度线性下降
+        temperature = start_temperature * (1 - iteration / iterations)
+        for i in range(n):
+            displacement = math.sqrt(dx[i] * dx[i] + dy[i] * dy[i])
+            if displacement > 0:
+                step = min(displacement, temperature) / displacement
+                xs[i] = min(size, max(0.0, xs[i] + dx[i] * step))
+                ys[i] = min(size, max(0.0, ys[i] + dy[i] * step))
+
+    return {node_id: (round(xs[i], 1), round(ys[i], 1)) for node_id, i in index.items()}
@@ -0,0 +1,141 @@
+"""
+Prometheus 文本格式的进程内指标
+
+不依赖 prometheus_client：直方图在观测时累加，回调指标(连接池、session 等)在
+抓取 /metrics 时读取当前值。多 worker 部署时每个 worker 各自统计，需要分别抓取。
+RequestMetricsMiddleware 按路由记录 HTTP 请求耗时，Cypher 查询的指标见 app/db.py。
+"""
+import bisect
+import time
+
+# 延迟直方图的默认桶，秒
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 返回记录数的桶
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+# 已注册的指标，按注册顺序输出
+REGISTRY = []
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """带标签的直方图，observe 的单位与 buckets 一致"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # 标签值 -> [各桶计数(不累计)..., 总和, 总数]
+        self._series = {}
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def snapshot(self):
+        """{标签值: {"count", "sum"}}，用于 JSON 统计"""
+        return {key: {"count": series[-1], "sum": series[-2]} for key, series in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, ('le', _number(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """
+    抓取时通过回调读取的指标
+    :param callback: 无参数函数，返回数值，或 {标签值元组: 数值}
+    :param kind: gauge 或 counter
+    """
+
+    def __init__(self, name, documentation, callback, labelnames=(), kind="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+        REGISTRY.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        value = self.callback()
+        values = value if isinstance(value, dict) else {(): value}
+        for key, number in sorted(values.items()):
+            if number is not None:
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(number)}")
+        return lines
+
+
+def render_metrics() -> str:
+    """所有已注册指标的 Prometheus 文本格式"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request duration by route template", ["method", "route", "status"]
+)
+
+
+class RequestMetricsMiddleware:
+    """
+    记录每个路由的请求耗时的 ASGI 中间件
+    route 标签使用路由模板(如 /books/{book_id})，未匹配的路径统一记为 <unmatched>，避免标签数量无限增长
+    流式响应(导出、SSE)记录的是直到响应结束的时间
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope["method"], route=route, status=str(status))
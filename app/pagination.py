@@ -0,0 +1,33 @@
+from fastapi import HTTPException
+
+# 列表接口默认每页数量和上限
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def parse_fields(fields: str | None, allowed: dict) -> list[str] | None:
+    """
+    解析 fields 查询参数，如 "title,author"
+    :param fields: 逗号分隔的字段名，为空时返回 None 表示全部字段
+    :param allowed: 允许返回的字段，字段名 -> Cypher 表达式
+    :return: 需要返回的字段列表，id 作为翻页游标始终包含在内
+    """
+    if not fields:
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [name for name in dict.fromkeys(requested) if name != "id"]
+
+
+def projection(var: str, allowed: dict, fields: list[str] | None = None) -> str:
+    """
+    构造 Cypher map projection，只在 RETURN 中取需要的字段
+    :param var: 节点变量名
+    :param allowed: 字段名 -> Cypher 表达式
+    :param fields: 需要返回的字段，None 表示全部字段
+    :return: 形如 b {id: b.id, title: b.title} 的表达式
+    """
+    names = fields if fields is not None else list(allowed)
+    return var + " {" + ", ".join(f"{name}: {allowed[name]}" for name in names) + "}"
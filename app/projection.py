@@ -0,0 +1,395 @@
+"""
+图的进程内邻接投影
+
+把 Book/Author/School/Company 节点及其之间的关系加载为 CSR(压缩稀疏行)结构：节点按
+下标编号，offsets[i]:offsets[i + 1] 是节点 i 在 targets 中的邻居，两者都是 array 数组，
+每条关系只占两个 4 字节整数。最短路径和连通分量在内存中用 BFS 计算，不再访问 Neo4j。
+
+投影默认关闭，设置 GRAPH_PROJECTION_MAX_AGE(秒)后启用。写接口发布的图变更事件会增量
+更新投影：新增的节点和关系记在增量表中，删除的节点只做标记；增量过多、收到无法增量
+处理的事件(如批量导入)或超过 GRAPH_PROJECTION_MAX_AGE 后投影视为过期，查询回退到 Cypher，
+同时在后台重建。其他 worker 或绕过 API 的写入只能等投影过期后重建才能看到。
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from array import array
+from collections import deque
+
+from app.db import open_session, stream
+from services.graph_services import GRAPH_LABELS, NODE_KEYS, node_id
+
+logger = logging.getLogger(__name__)
+
+# 投影的最长使用时间，秒，0 表示关闭投影
+GRAPH_PROJECTION_MAX_AGE = float(os.getenv("GRAPH_PROJECTION_MAX_AGE", "0"))
+# 增量修改超过关系数的该比例(至少 1000 次)后重建
+GRAPH_PROJECTION_REBUILD_RATIO = float(os.getenv("GRAPH_PROJECTION_REBUILD_RATIO", "0.1"))
+# 加载时每批拉取的记录数
+GRAPH_PROJECTION_FETCH_SIZE = 10000
+
+
+class CSRGraph:
+    """
+    无向邻接的 CSR 快照加上之后的增量
+    节点用图 id(如 Book:1，见 services/graph_services.node_id)标识
+    """
+
+    def __init__(self, ids, offsets, targets):
+        self.ids = ids
+        self.index = {graph_id: i for i, graph_id in enumerate(ids)}
+        self.offsets = offsets
+        self.targets = targets
+        # 快照之后新增的邻居，下标 -> [邻居下标]
+        self.added = {}
+        # 快照之后删除的节点下标
+        self.removed = set()
+        self.changes = 0
+
+    @classmethod
+    def from_arrays(cls, ids, sources, targets):
+        """
+        由关系两端的下标数组构建
+        :param ids: 节点图 id 列表
+        :param sources: 关系起点下标，array("i")
+        :param targets: 关系终点下标，array("i")，与 sources 等长
+        """
+        n = len(ids)
+        offsets = array("q", bytes(8 * (n + 1)))
+        for i in sources:
+            offsets[i + 1] += 1
+        for i in targets:
+            offsets[i + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        cursor = array("q", offsets)
+        neighbors = array("i", bytes(4 * offsets[n]))
+        # 按无向图存储，每条关系在两端各记一次
+        for a, b in zip(sources, targets):
+            neighbors[cursor[a]] = b
+            cursor[a] += 1
+            neighbors[cursor[b]] = a
+            cursor[b] += 1
+        return cls(ids, offsets, neighbors)
+
+    @classmethod
+    def build(cls, ids, edges):
+        """
+        由 (图 id, 图 id) 关系列表构建，端点不在 ids 中的关系被忽略
+        """
+        index = {graph_id: i for i, graph_id in enumerate(ids)}
+        sources, targets = array("i"), array("i")
+        for a, b in edges:
+            i, j = index.get(a), index.get(b)
+            if i is not None and j is not None:
+                sources.append(i)
+                targets.append(j)
+        return cls.from_arrays(list(ids), sources, targets)
+
+    @property
+    def edge_count(self):
+        return len(self.targets) // 2 + sum(len(v) for v in self.added.values()) // 2
+
+    def neighbors(self, i):
+        if i + 1 < len(self.offsets):
+            yield from self.targets[self.offsets[i]:self.offsets[i + 1]]
+        yield from self.added.get(i, ())
+
+    def add_node(self, graph_id):
+        """新增节点，已存在时忽略；删除后又出现的节点无法增量处理，返回 False"""
+        i = self.index.get(graph_id)
+        if i is not None:
+            return i not in self.removed
+        self.index[graph_id] = len(self.ids)
+        self.ids.append(graph_id)
+        self.changes += 1
+        return True
+
+    def remove_node(self, graph_id):
+        i = self.index.get(graph_id)
+        if i is not None:
+            self.removed.add(i)
+            self.changes += 1
+        return True
+
+    def add_edge(self, source, target):
+        """新增关系，端点不在投影中时返回 False"""
+        i, j = self.index.get(source), self.index.get(target)
+        if i is None or j is None or i in self.removed or j in self.removed:
+            return False
+        self.added.setdefault(i, []).append(j)
+        self.added.setdefault(j, []).append(i)
+        self.changes += 1
+        return True
+
+    def _path(self, parents, node):
+        path = []
+        while node is not None:
+            path.append(self.ids[node])
+            node = parents[node]
+        return path
+
+    def shortest_path(self, source, target, max_depth):
+        """
+        双向 BFS 求最短路径(忽略关系方向)
+        :return: 图 id 列表，从 source 到 target；max_depth 跳内不连通时返回 None
+        :raises KeyError: 节点不在投影中
+        """
+        s, t = self.index[source], self.index[target]
+        if s in self.removed or t in self.removed:
+            raise KeyError(source if s in self.removed else target)
+        if s == t:
+            return [source]
+        forward, backward = {s: None}, {t: None}
+        forward_frontier, backward_frontier = [s], [t]
+        for _ in range(max_depth):
+            # 每次扩展较小的一侧
+            if len(forward_frontier) > len(backward_frontier):
+                forward, backward = backward, forward
+                forward_frontier, backward_frontier = backward_frontier, forward_frontier
+            next_frontier = []
+            for node in forward_frontier:
+                for neighbor in self.neighbors(node):
+                    if neighbor in forward or neighbor in self.removed:
+                        continue
+                    forward[neighbor] = node
+                    if neighbor in backward:
+                        path = self._path(forward, neighbor)[::-1] + self._path(backward, neighbor)[1:]
+                        return path if path[0] == source else path[::-1]
+                    next_frontier.append(neighbor)
+            if not next_frontier:
+                return None
+            forward_frontier = next_frontier
+        return None
+
+    def component(self, graph_id, limit):
+        """
+        节点所在的连通分量
+        :return: (分量大小, 按 BFS 顺序的前 limit 个图 id)
+        :raises KeyError: 节点不在投影中
+        """
+        start = self.index[graph_id]
+        if start in self.removed:
+            raise KeyError(graph_id)
+        seen = {start}
+        queue = deque([start])
+        members = []
+        while queue:
+            node = queue.popleft()
+            if len(members) < limit:
+                members.append(self.ids[node])
+            for neighbor in self.neighbors(node):
+                if neighbor not in seen and neighbor not in self.removed:
+                    seen.add(neighbor)
+                    queue.append(neighbor)
+        return len(seen), members
+
+    def components(self, top=10):
+        """
+        全图的连通分量统计
+        :return: {"count", "singletons", "largest": 最大的 top 个分量的大小}
+        """
+        n = len(self.ids)
+        labels = array("i", [-1]) * n
+        sizes = []
+        for start in range(n):
+            if labels[start] != -1 or start in self.removed:
+                continue
+            component = len(sizes)
+            labels[start] = component
+            queue = deque([start])
+            size = 0
+            while queue:
+                node = queue.popleft()
+                size += 1
+                for neighbor in self.neighbors(node):
+                    if labels[neighbor] == -1 and neighbor not in self.removed:
+                        labels[neighbor] = component
+                        queue.append(neighbor)
+            sizes.append(size)
+        return {
+            "count": len(sizes),
+            "singletons": sum(1 for size in sizes if size == 1),
+            "largest": sorted(sizes, reverse=True)[:top],
+        }
+
+    def memory(self):
+        """
+        内存占用，字节
+        adjacency 为 CSR 数组，index 为图 id 字符串、id 列表和 id -> 下标字典，delta 为增量表
+        """
+        adjacency = len(self.offsets) * self.offsets.itemsize + len(self.targets) * self.targets.itemsize
+        index = sys.getsizeof(self.ids) + sys.getsizeof(self.index) + sum(sys.getsizeof(graph_id) for graph_id in self.ids)
+        delta = sys.getsizeof(self.added) + sum(sys.getsizeof(v) for v in self.added.values()) + sys.getsizeof(self.removed)
+        edges = self.edge_count
+        return {
+            "adjacency_bytes": adjacency,
+            "index_bytes": index,
+            "delta_bytes": delta,
+            "adjacency_bytes_per_million_edges": round(adjacency / edges * 1_000_000) if edges else None,
+            "total_bytes_per_million_edges": round((adjacency + index + delta) / edges * 1_000_000) if edges else None,
+        }
+
+
+NODES_QUERY = """
+MATCH (n) WHERE any(l IN labels(n) WHERE l IN $labels)
+RETURN elementId(n) AS element_id, labels(n) AS labels, n {.id, .author_id, .company_id} AS props
+"""
+
+EDGES_QUERY = """
+MATCH (a)-[]->(b)
+WHERE any(l IN labels(a) WHERE l IN $labels) AND any(l IN labels(b) WHERE l IN $labels)
+RETURN elementId(a) AS source, elementId(b) AS target
+"""
+
+
+async def export_edge_list(driver, name):
+    """
+    以节点下标的形式导出 Book/Author/School/Company 子图
+    :param name: 查询名称前缀，如 projection，对应 projection.nodes 和 projection.edges
+    :return: (elementId 列表, 图 id 列表, 起点下标 array("i"), 终点下标 array("i"))
+    """
+    element_ids, ids = [], []
+    index = {}
+    sources, targets = array("i"), array("i")
+    async with open_session(driver, fetch_size=GRAPH_PROJECTION_FETCH_SIZE) as session:
+        async for record in stream(session, f"{name}.nodes", NODES_QUERY, labels=GRAPH_LABELS):
+            label = next(l for l in record["labels"] if l in NODE_KEYS)
+            index[record["element_id"]] = len(ids)
+            element_ids.append(record["element_id"])
+            ids.append(node_id(label, record["props"][NODE_KEYS[label]], record["element_id"]))
+        async for record in stream(session, f"{name}.edges", EDGES_QUERY, labels=GRAPH_LABELS):
+            source, target = index.get(record["source"]), index.get(record["target"])
+            # 两次查询之间新建的节点不在 index 中，其关系一并忽略
+            if source is not None and target is not None:
+                sources.append(source)
+                targets.append(target)
+    return element_ids, ids, sources, targets
+
+
+class GraphProjection:
+    """
+    管理 CSRGraph 的加载、增量更新和过期
+    通过 graph_events.add_listener(graph_projection.apply) 接收写接口的变更事件
+    """
+
+    def __init__(self, max_age=GRAPH_PROJECTION_MAX_AGE, rebuild_ratio=GRAPH_PROJECTION_REBUILD_RATIO):
+        self.max_age = max_age
+        self.rebuild_ratio = rebuild_ratio
+        self.graph = None
+        self.built_at = None
+        self.build_seconds = None
+        self.stale = True
+        # invalidate 的次数，重建期间发生的失效不会被重建结果清除
+        self.generation = 0
+        self.builds = 0
+        self._lock = asyncio.Lock()
+        self._task = None
+        # 重建期间收到的事件，重建完成后在新的投影上重放
+        self._pending = None
+
+    @property
+    def enabled(self):
+        return self.max_age > 0
+
+    @property
+    def fresh(self):
+        """投影可用于查询"""
+        return (
+            self.graph is not None
+            and not self.stale
+            and time.monotonic() - self.built_at < self.max_age
+        )
+
+    def invalidate(self):
+        """标记投影过期，如批量导入之后"""
+        self.generation += 1
+        self.stale = True
+
+    def apply(self, op, kind, data):
+        """
+        按图变更事件增量更新投影，参数与 GraphEventBroker.publish 相同
+        无法增量处理的事件使投影过期
+        """
+        if self._pending is not None:
+            self._pending.append((op, kind, data))
+        if self.graph is not None:
+            self._apply(self.graph, op, kind, data)
+
+    def _apply(self, graph, op, kind, data):
+        if kind == "node" and op == "add":
+            applied = graph.add_node(data["id"])
+        elif kind == "node" and op == "remove":
+            applied = graph.remove_node(data["id"])
+        elif kind == "node":
+            # 名称等属性的修改不影响邻接
+            applied = True
+        elif kind == "link" and op == "add":
+            applied = graph.add_edge(data["source"], data["target"])
+        else:
+            applied = False
+        if not applied or graph.changes > max(1000, graph.edge_count * self.rebuild_ratio):
+            self.stale = True
+
+    async def _load(self, driver):
+        _, ids, sources, targets = await export_edge_list(driver, "projection")
+        # 填充 CSR 是纯 CPU 计算，放到线程中避免阻塞事件循环
+        return await asyncio.to_thread(CSRGraph.from_arrays, ids, sources, targets)
+
+    async def refresh(self, driver):
+        """重新加载投影，同一时间只有一次加载"""
+        async with self._lock:
+            start = time.perf_counter()
+            generation = self.generation
+            self._pending = []
+            try:
+                graph = await self._load(driver)
+                # 加载期间被 invalidate 时，加载的数据可能不包含那次变更，投影仍然过期
+                self.stale = self.generation != generation
+                for event in self._pending:
+                    self._apply(graph, *event)
+            finally:
+                pending, self._pending = self._pending, None
+            self.graph = graph
+            self.built_at = time.monotonic()
+            self.build_seconds = time.perf_counter() - start
+            self.builds += 1
+            logger.info(
+                "Graph projection built: %d nodes, %d edges in %.2fs (%d events replayed)",
+                len(graph.ids), graph.edge_count, self.build_seconds, len(pending)
+            )
+
+    def schedule_refresh(self, driver):
+        """在后台重建投影，已有重建在进行时不重复启动"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self.refresh(driver))
+        self._task.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Graph projection build failed: %s", task.exception())
+
+    def stats(self):
+        stats = {
+            "enabled": self.enabled,
+            "fresh": self.fresh,
+            "builds": self.builds,
+            "building": self._task is not None and not self._task.done(),
+        }
+        if self.graph is not None:
+            stats.update({
+                "nodes": len(self.graph.ids) - len(self.graph.removed),
+                "edges": self.graph.edge_count,
+                "changes_since_build": self.graph.changes,
+                "age_seconds": round(time.monotonic() - self.built_at, 1),
+                "build_seconds": round(self.build_seconds, 3),
+                "memory": self.graph.memory(),
+            })
+        return stats
+
+
+graph_projection = GraphProjection()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import TYPE_CHECKING
+from app.db import open_session, read, write
+
+if TYPE_CHECKING:
+    from neo4j import AsyncDriver
+
+# 每次从 Sequence 节点预留的ID数量，进程内用完后再预留下一段
+ID_BLOCK_SIZE = int(os.getenv("NEO4J_ID_BLOCK_SIZE", "100"))
+
+# 进程内创建的所有分配器，见 reset_sequences
+_sequences = []
+
+
+class IdSequence:
+    """
+    基于 Sequence 节点的自增ID分配器
+
+    每个标签对应一个 (:Sequence {name}) 节点，value 属性记录已经分配出去的最大ID。
+    分配器每次原子地把 value 增加 block_size，相当于为当前进程预留一段ID，
+    之后在内存中逐个发放，用完再预留，所以每次插入不再需要扫描整个标签。
+    进程退出时未用完的ID会被丢弃，ID 唯一且递增，但不保证连续。
+    多个 worker 进程各自预留不同的段，ID 不会重复，但不同 worker 发放的 ID 交错递增。
+    """
+
+    def __init__(self, name, seed_query, block_size=ID_BLOCK_SIZE):
+        """
+        :param name: 序列名，一般为节点标签
+        :param seed_query: Sequence 节点不存在时用于获取现有最大ID的查询，需返回 max_id
+        :param block_size: 每次预留的ID数量
+        """
+        self.name = name
+        self.seed_query = seed_query
+        self.block_size = block_size
+        self._next = 0
+        self._limit = 0
+        self._lock = asyncio.Lock()
+        _sequences.append(self)
+
+    async def next_id(self, driver: AsyncDriver) -> int:
+        """
+        获取下一个ID
+        :param driver: Neo4j 驱动实例
+        :return: 新的唯一ID
+        """
+        async with self._lock:
+            if self._next >= self._limit:
+                upper = await self._reserve_block(driver, self.block_size)
+                self._next = upper - self.block_size
+                self._limit = upper
+            self._next += 1
+            return self._next
+
+    async def next_ids(self, driver: AsyncDriver, count: int) -> list[int]:
+        """
+        批量获取ID，先用完内存中剩余的ID，不足的部分一次性预留
+        :param driver: Neo4j 驱动实例
+        :param count: 需要的ID数量
+        :return: count 个新的唯一ID
+        """
+        async with self._lock:
+            ids = list(range(self._next + 1, min(self._limit, self._next + count) + 1))
+            self._next += len(ids)
+            missing = count - len(ids)
+            if missing:
+                size = max(missing, self.block_size)
+                upper = await self._reserve_block(driver, size)
+                ids.extend(range(upper - size + 1, upper - size + missing + 1))
+                self._next = upper - size + missing
+                self._limit = upper
+            return ids
+
+    def reset(self):
+        """丢弃内存中尚未发放的ID，下次分配时重新预留"""
+        self._next = 0
+        self._limit = 0
+
+    async def _reserve_block(self, driver: AsyncDriver, size: int) -> int:
+        """预留 size 个ID，返回这段ID的上界(包含)"""
+        async with open_session(driver) as session:
+            # 在同一个 SET 中读写 value，Neo4j 会先获取节点写锁，避免并发下的丢失更新
+            records = await write(
+                session,
+                "sequence.increment",
+                "MATCH (s:Sequence {name: $name}) "
+                "SET s.value = s.value + $size "
+                "RETURN s.value AS upper",
+                name=self.name, size=size
+            )
+            if records:
+                return records[0]["upper"]
+            # 第一次使用：根据现有数据的最大ID初始化 Sequence 节点，只会执行一次
+            # Sequence.name 的唯一约束由 app/indexes.py 在启动时创建
+            start = (await read(session, "sequence.seed", self.seed_query))[0]["max_id"]
+            records = await write(
+                session,
+                "sequence.create",
+                "MERGE (s:Sequence {name: $name}) "
+                "ON CREATE SET s.value = $start + $size "
+                "ON MATCH SET s.value = s.value + $size "
+                "RETURN s.value AS upper",
+                name=self.name, start=start, size=size
+            )
+            return records[0]["upper"]
+
+
+def reset_sequences():
+    """
+    丢弃所有分配器在内存中预留的ID
+    worker 进程启动时调用：如果父进程在 fork 前已经预留过一段ID，子进程会继承同一段，
+    多个 worker 会发放重复的ID
+    """
+    for sequence in _sequences:
+        sequence.reset()
@@ -0,0 +1,74 @@
+"""
+多进程启动入口
+
+用 uvicorn 启动 N 个 worker 进程，每个 worker 单独导入应用，在自己的 lifespan 中创建
+Neo4j 驱动和连接池，父进程不创建驱动，不会有连接跨进程共享。
+收到 SIGTERM/SIGINT 后 worker 停止接收新请求，等待进行中的请求结束(最长 --graceful-timeout 秒)，
+再在 lifespan 中等待后台查询结束并关闭驱动。
+
+进程内的状态在多个 worker 下的行为：
+  ID 分配器：每个 worker 从 Sequence 节点预留不同的 ID 段，不会重复
+  单实体缓存：默认的内存缓存每个 worker 一份，写操作只能使其所在 worker 的缓存失效，
+             其他 worker 最多返回 CACHE_TTL 秒的旧数据，多 worker 时应设置 CACHE_BACKEND=redis
+  变更事件、图投影、分析任务状态：每个 worker 一份，只包含本 worker 处理的写操作和提交的任务
+
+用法:
+    python -m app.server --workers 4 --port 8000 --max-connections 200
+"""
+import argparse
+import logging
+import os
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers():
+    return int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+
+def configure_workers(workers, max_connections=None, warmup=None):
+    """
+    设置 worker 进程继承的环境变量
+    :param max_connections: 所有 worker 合计的 Neo4j 连接数，平均分给每个 worker
+    :param warmup: 所有 worker 合计启动时预先建立的连接数
+    """
+    if max_connections:
+        os.environ["NEO4J_MAX_POOL_SIZE"] = str(max(1, max_connections // workers))
+    if warmup is not None:
+        os.environ["NEO4J_POOL_WARMUP"] = str(warmup // workers)
+    if workers > 1 and os.getenv("CACHE_BACKEND", "memory") == "memory" and float(os.getenv("CACHE_TTL", "60")) > 0:
+        logger.warning(
+            "CACHE_BACKEND=memory keeps a separate entity cache in each of the %d workers: a write invalidates "
+            "only its own worker, others may serve stale entities for up to CACHE_TTL seconds. "
+            "Set CACHE_BACKEND=redis or CACHE_TTL=0.", workers
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=default_workers(), help="default: WEB_CONCURRENCY or CPU count")
+    parser.add_argument("--max-connections", type=int, help="Neo4j connections across all workers")
+    parser.add_argument("--warmup", type=int, help="connections opened at startup across all workers")
+    parser.add_argument("--graceful-timeout", type=float, default=30, help="seconds to wait for in-flight requests")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper())
+    configure_workers(args.workers, args.max_connections, args.warmup)
+    uvicorn.run(
+        "main:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
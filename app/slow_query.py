@@ -0,0 +1,152 @@
+"""
+慢查询日志
+
+耗时超过 NEO4J_SLOW_QUERY_MS 的查询以 JSON 行写入滚动日志，包含查询名称、语句、参数和耗时。
+同一名称的查询每隔 NEO4J_SLOW_QUERY_PROFILE_INTERVAL 秒附带一次执行计划摘要(db hits、
+算子、是否使用索引)，计划在后台用独立 session 获取，不阻塞原请求，关闭驱动前未完成的会被取消：
+读查询使用 PROFILE 重新执行一次；写查询和流式导出只做 EXPLAIN，不会重复写入。
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from logging.handlers import RotatingFileHandler
+
+# 慢查询阈值，毫秒，0 表示关闭
+SLOW_QUERY_MS = float(os.getenv("NEO4J_SLOW_QUERY_MS", "500"))
+# profile: 读查询 PROFILE、写查询 EXPLAIN；explain: 全部 EXPLAIN；off: 不获取执行计划
+SLOW_QUERY_PLAN = os.getenv("NEO4J_SLOW_QUERY_PLAN", "profile")
+SLOW_QUERY_PROFILE_INTERVAL = float(os.getenv("NEO4J_SLOW_QUERY_PROFILE_INTERVAL", "60"))
+SLOW_QUERY_LOG = os.getenv("NEO4J_SLOW_QUERY_LOG", "logs/slow_queries.log")
+SLOW_QUERY_LOG_BYTES = int(os.getenv("NEO4J_SLOW_QUERY_LOG_BYTES", str(10 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("NEO4J_SLOW_QUERY_LOG_BACKUPS", "5"))
+
+# 参数中的长列表(批量导入的 rows 等)只记录长度
+MAX_LOGGED_ITEMS = 10
+
+logger = logging.getLogger("neo4j.slow_query")
+_last_planned = {}
+_tasks = set()
+
+
+def _get_logger():
+    """第一次写入时再创建日志文件"""
+    if not logger.handlers and SLOW_QUERY_LOG:
+        directory = os.path.dirname(SLOW_QUERY_LOG)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = RotatingFileHandler(
+            SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def loggable_params(params):
+    """截断参数中的长列表"""
+    return {
+        key: f"<{len(value)} items>" if isinstance(value, (list, tuple)) and len(value) > MAX_LOGGED_ITEMS else value
+        for key, value in params.items()
+    }
+
+
+def summarize_plan(plan):
+    """
+    汇总 PROFILE/EXPLAIN 返回的执行计划树
+    :param plan: ResultSummary.profile 或 ResultSummary.plan
+    :return: {"operators", "db_hits", "peak_rows", "index_used", "label_scan"}
+             peak_rows 为各算子中最大的行数，EXPLAIN 没有 db_hits/peak_rows
+    """
+    operators = []
+    db_hits = 0
+    peak_rows = 0
+    profiled = "dbHits" in plan
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        operators.append(node.get("operatorType", "").split("@")[0])
+        db_hits += node.get("dbHits", 0)
+        peak_rows = max(peak_rows, node.get("rows", 0))
+        stack.extend(reversed(node.get("children", [])))
+    return {
+        "operators": operators,
+        "db_hits": db_hits if profiled else None,
+        "peak_rows": peak_rows if profiled else None,
+        "index_used": any("Index" in op for op in operators),
+        "label_scan": any(op in ("NodeByLabelScan", "AllNodesScan") for op in operators),
+    }
+
+
+def _entry(name, kind, query, params, seconds, rows):
+    return {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "query_name": name,
+        "kind": kind,
+        "duration_ms": round(seconds * 1000, 1),
+        "rows": rows,
+        "query": " ".join(query.split()),
+        "params": loggable_params(params),
+    }
+
+
+def _write(entry):
+    _get_logger().info(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+async def _plan_and_write(driver, entry, query, params, mode):
+    from neo4j.exceptions import DriverError, Neo4jError
+    # app.db 导入了本模块，这里延迟导入
+    from app.db import open_session
+
+    try:
+        # 计入 session_stats，关闭驱动前 drain_sessions 会等待计划查询结束
+        async with open_session(driver) as session:
+            result = await session.run(f"{mode} {query}", params)
+            summary = await result.consume()
+        plan = summary.profile if mode == "PROFILE" else summary.plan
+        entry["plan"] = {"mode": mode, **summarize_plan(plan)} if plan else None
+    except (Neo4jError, DriverError) as e:
+        entry["plan_error"] = str(e)
+    except asyncio.CancelledError:
+        # 关闭时被取消，仍然记录慢查询本身
+        entry["plan_error"] = "cancelled at shutdown"
+        _write(entry)
+        raise
+    _write(entry)
+
+
+async def cancel_pending():
+    """取消仍在获取执行计划的后台任务并等待其结束，关闭驱动前调用"""
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def record(driver, name, kind, query, params, seconds, rows):
+    """
+    记录一次查询，未超过阈值时直接返回
+    :param driver: 用于获取执行计划的驱动，为空时不获取
+    :param kind: read / write / stream
+    """
+    if SLOW_QUERY_MS <= 0 or seconds * 1000 < SLOW_QUERY_MS:
+        return
+    entry = _entry(name, kind, query, params, seconds, rows)
+    now = time.monotonic()
+    if (
+        driver is None
+        or SLOW_QUERY_PLAN == "off"
+        or now - _last_planned.get(name, float("-inf")) < SLOW_QUERY_PROFILE_INTERVAL
+    ):
+        _write(entry)
+        return
+    _last_planned[name] = now
+    mode = "PROFILE" if SLOW_QUERY_PLAN == "profile" and kind == "read" else "EXPLAIN"
+    task = asyncio.get_running_loop().create_task(_plan_and_write(driver, entry, query, params, mode))
+    # 保存引用，避免任务在完成前被回收
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
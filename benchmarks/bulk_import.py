@@ -0,0 +1,108 @@
+"""
+批量导入吞吐量基准测试
+
+先用 /bulk/books 和 /bulk/authors 创建测试书籍和作者，再分别通过逐条接口
+POST /book2author/links(每个请求一条关系)和批量接口 POST /bulk/book2author 按 id
+写入相同数量的 书籍-作者 关系，对比每秒写入的行数。测试数据的书名和作者名
+带有 bench- 前缀，测试结束后删除。
+
+用法:
+    uvicorn main:app --port 8000
+    python -m benchmarks.bulk_import --rows 2000 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from app.db import init_driver, close_driver
+
+PREFIX = "bench-"
+
+
+def post(url, body, content_type="application/json"):
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type}, method="POST")
+    with urllib.request.urlopen(request, timeout=600) as response:
+        return json.loads(response.read())
+
+
+async def node_ids(tag):
+    """查询测试书籍和作者的 id：{书名: id}, {作者名: author_id}"""
+    driver = await init_driver()
+    try:
+        async with driver.session() as session:
+            result = await session.run(
+                "MATCH (b:Book) WHERE b.title STARTS WITH $prefix RETURN b.title AS title, b.id AS id",
+                prefix=f"{PREFIX}{tag}-"
+            )
+            books = {record["title"]: record["id"] async for record in result}
+            result = await session.run(
+                "MATCH (a:Author) WHERE a.name STARTS WITH $prefix RETURN a.name AS name, a.author_id AS id",
+                prefix=f"{PREFIX}{tag}-"
+            )
+            authors = {record["name"]: int(record["id"]) async for record in result}
+        return books, authors
+    finally:
+        await close_driver()
+
+
+def make_rows(base_url, rows, tag):
+    """创建测试书籍和作者，返回按 id 的关系行，每个作者 10 本书"""
+    titles = [f"{PREFIX}{tag}-book-{i}" for i in range(rows)]
+    names = [f"{PREFIX}{tag}-author-{i}" for i in range((rows + 9) // 10)]
+    post(f"{base_url}/bulk/books", json.dumps([{"title": title, "author": ""} for title in titles]).encode())
+    author = {"email": "", "gender": "", "birth_date": "", "birth_place": "", "family_members": "", "imdb_id": "", "occupation": ""}
+    post(f"{base_url}/bulk/authors", json.dumps([{**author, "name": name} for name in names]).encode())
+    books, authors = asyncio.run(node_ids(tag))
+    return [{"book_id": books[title], "author_id": authors[names[i // 10]]} for i, title in enumerate(titles)]
+
+
+def per_item(base_url, rows, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda row: post(f"{base_url}/book2author/links", json.dumps({"links": [row]}).encode()), rows))
+    return len(rows) / (time.perf_counter() - start)
+
+
+def bulk(base_url, rows, batch_size):
+    start = time.perf_counter()
+    stats = post(f"{base_url}/bulk/book2author?batch_size={batch_size}", json.dumps(rows).encode())
+    return len(rows) / (time.perf_counter() - start), stats
+
+
+async def cleanup():
+    driver = await init_driver()
+    try:
+        async with driver.session() as session:
+            for label, prop in (("Book", "title"), ("Author", "name")):
+                result = await session.run(
+                    f"MATCH (n:{label}) WHERE n.{prop} STARTS WITH $prefix DETACH DELETE n", prefix=PREFIX
+                )
+                await result.consume()
+    finally:
+        await close_driver()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-item vs bulk import throughput")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent requests for the per-item endpoint")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    base_url = args.url.rstrip("/")
+
+    try:
+        item_rps = per_item(base_url, make_rows(base_url, args.rows, "item"), args.concurrency)
+        print(f"per-item endpoint: {item_rps:.1f} rows/s")
+        bulk_rps, stats = bulk(base_url, make_rows(base_url, args.rows, "bulk"), args.batch_size)
+        print(f"bulk endpoint:     {bulk_rps:.1f} rows/s (server side {stats['rows_per_s']} rows/s, {stats['batches']} batches)")
+        print(f"speedup:           {bulk_rps / item_rps:.1f}x")
+    finally:
+        asyncio.run(cleanup())
+
+
+if __name__ == "__main__":
+    main()
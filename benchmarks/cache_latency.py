@@ -0,0 +1,54 @@
+"""
+单实体缓存读取延迟基准测试
+
+创建一本测试书籍，分别在每次读取前清空缓存(相当于直接查询 Neo4j)和命中缓存
+两种情况下调用 BookService.get_book，统计 p50/p99 延迟，结束后删除测试书籍。
+
+用法:
+    python -m benchmarks.cache_latency --reads 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.cache import entity_cache
+from app.db import init_driver, close_driver
+from services.books_services import BookService
+
+
+async def measure(service, book_id, reads, cached):
+    key = entity_cache.key("Book", book_id)
+    latencies = []
+    for _ in range(reads):
+        if not cached:
+            await entity_cache.invalidate(key)
+        start = time.perf_counter()
+        await service.get_book(book_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+
+def summarize(name, latencies):
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:>9}: p50={statistics.median(latencies):.3f}ms p99={p99:.3f}ms")
+
+
+async def main(reads):
+    driver = await init_driver()
+    service = BookService(driver)
+    book = await service.create_book("bench-cache-book", "bench")
+    try:
+        summarize("uncached", await measure(service, book["id"], reads, cached=False))
+        summarize("cached", await measure(service, book["id"], reads, cached=True))
+        print(entity_cache.stats())
+    finally:
+        await service.delete_book(book["id"])
+        await close_driver()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single-entity read latency with and without the cache")
+    parser.add_argument("--reads", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.reads))
@@ -0,0 +1,68 @@
+"""
+并发吞吐量基准测试
+
+对运行中的 API 发起并发 GET 请求，统计每秒请求数和延迟分位数。
+用于对比同步驱动与异步驱动下 uvicorn worker 的并发处理能力：
+分别在改造前后的代码上启动服务，使用相同参数运行本脚本即可。
+
+用法:
+    uvicorn main:app --port 8000
+    python -m benchmarks.concurrent_throughput --url http://127.0.0.1:8000 --path /books/ --concurrency 50 --requests 2000
+"""
+import argparse
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def fetch(url: str, timeout: float) -> float:
+    """发起单个请求，返回耗时(秒)"""
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run(url: str, concurrency: int, total: int, timeout: float) -> dict:
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(fetch, url, timeout) for _ in range(total)]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent request throughput benchmark")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/books/")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    target = args.url.rstrip("/") + args.path
+    print(f"Benchmarking GET {target} with concurrency={args.concurrency}, requests={args.requests}")
+    stats = run(target, args.concurrency, args.requests, args.timeout)
+    for key, value in stats.items():
+        print(f"{key:>15}: {value:.2f}" if isinstance(value, float) else f"{key:>15}: {value}")
+
+
+if __name__ == "__main__":
+    main()
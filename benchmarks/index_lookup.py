@@ -0,0 +1,78 @@
+"""
+索引点查询基准测试
+
+在独立的 :BenchLookup 标签下生成测试节点，分别测量没有索引和创建索引后
+按 key 点查询的延迟，测试结束后删除测试节点和索引，不影响业务数据。
+
+用法:
+    python -m benchmarks.index_lookup --nodes 100000 --lookups 500
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.db import init_driver, close_driver
+
+LABEL = "BenchLookup"
+INDEX_NAME = "bench_lookup_key"
+
+
+async def populate(driver, nodes: int, batch_size: int = 10000):
+    async with driver.session() as session:
+        for start in range(0, nodes, batch_size):
+            result = await session.run(
+                f"UNWIND range($start, $end) AS i CREATE (:{LABEL} {{key: i, name: 'node-' + toString(i)}})",
+                start=start, end=min(start + batch_size, nodes) - 1
+            )
+            await result.consume()
+
+
+async def measure(driver, nodes: int, lookups: int) -> list[float]:
+    """执行 lookups 次随机点查询，返回每次的延迟(毫秒)"""
+    latencies = []
+    async with driver.session() as session:
+        for _ in range(lookups):
+            key = random.randrange(nodes)
+            start = time.perf_counter()
+            result = await session.run(f"MATCH (n:{LABEL} {{key: $key}}) RETURN n.name AS name", key=key)
+            await result.single()
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def summarize(name: str, latencies: list[float]):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:>14}: p50={statistics.median(latencies):.2f}ms p99={p99:.2f}ms mean={statistics.mean(latencies):.2f}ms")
+
+
+async def main(nodes: int, lookups: int):
+    driver = await init_driver()
+    try:
+        print(f"Creating {nodes} :{LABEL} nodes...")
+        await populate(driver, nodes)
+
+        summarize("without index", await measure(driver, nodes, lookups))
+
+        async with driver.session() as session:
+            await (await session.run(f"CREATE INDEX {INDEX_NAME} IF NOT EXISTS FOR (n:{LABEL}) ON (n.key)")).consume()
+            await (await session.run("CALL db.awaitIndexes(300)")).consume()
+
+        summarize("with index", await measure(driver, nodes, lookups))
+    finally:
+        async with driver.session() as session:
+            await (await session.run(f"DROP INDEX {INDEX_NAME} IF EXISTS")).consume()
+            await (await session.run(
+                f"MATCH (n:{LABEL}) CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF 10000 ROWS"
+            )).consume()
+        await close_driver()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Point lookup latency with and without an index")
+    parser.add_argument("--nodes", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.nodes, args.lookups))
@@ -0,0 +1,54 @@
+"""
+连接池负载测试
+
+以超过连接池大小的并发访问 API，结束后检查 /db/stats：
+所有请求级 session 都应已关闭(active、leaked 为 0)，且没有请求因获取连接超时而失败。
+
+用法:
+    uvicorn main:app --port 8000
+    python -m benchmarks.pool_load --url http://127.0.0.1:8000 --path /books/ --concurrency 200 --requests 5000
+"""
+import argparse
+import json
+import sys
+import urllib.request
+
+from benchmarks.concurrent_throughput import run
+
+
+def get_stats(base_url: str) -> dict:
+    with urllib.request.urlopen(base_url + "/db/stats", timeout=10) as response:
+        return json.loads(response.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neo4j session/pool load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/books/")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip("/")
+    before = get_stats(base_url)
+    print(f"Loading GET {base_url + args.path} with concurrency={args.concurrency}, requests={args.requests}")
+    print(f"pool max_size={before['pool']['max_size']}")
+    result = run(base_url + args.path, args.concurrency, args.requests, args.timeout)
+    after = get_stats(base_url)
+
+    for key, value in result.items():
+        print(f"{key:>15}: {value:.2f}" if isinstance(value, float) else f"{key:>15}: {value}")
+    sessions = after["sessions"]
+    print(f"sessions opened={sessions['opened'] - before['sessions']['opened']} "
+          f"active={sessions['active']} peak_active={sessions['peak_active']} leaked={sessions['leaked']}")
+    print(f"pool in_use={after['pool']['in_use']} idle={after['pool']['idle']}")
+
+    if result["errors"] or sessions["active"] or sessions["leaked"]:
+        print("FAILED: requests failed or sessions were not released")
+        sys.exit(1)
+    print("OK: no failed requests, all sessions released")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+内存图投影基准测试
+
+在进程内按优先连接生成幂律分布的图，构建 CSR 投影，报告构建耗时、每百万条关系的
+内存占用，以及随机节点对最短路径、单个连通分量和全图连通分量的耗时，不需要 Neo4j。
+
+用法:
+    python -m benchmarks.projection --edges 100000 1000000 --nodes-per-edge 0.2 --queries 1000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.projection import CSRGraph
+
+
+def power_law_graph(edges: int, nodes: int, seed: int = 42):
+    """每条关系的一端随机选取，另一端按已有度数加权选取"""
+    rng = random.Random(seed)
+    ids = [f"Book:{i}" for i in range(nodes)]
+    pool = list(range(nodes))
+    pairs = []
+    for _ in range(edges):
+        a, b = rng.randrange(nodes), rng.choice(pool)
+        pairs.append((ids[a], ids[b]))
+        pool.append(b)
+    return ids, pairs
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(edges: int, nodes: int, queries: int, max_depth: int):
+    ids, pairs = power_law_graph(edges, nodes)
+    start = time.perf_counter()
+    graph = CSRGraph.build(ids, pairs)
+    build = time.perf_counter() - start
+    memory = graph.memory()
+    print(f"edges={edges} nodes={nodes}: build={build:.2f}s "
+          f"adjacency={memory['adjacency_bytes_per_million_edges'] / 2**20:.1f} MiB/M edges "
+          f"total={memory['total_bytes_per_million_edges'] / 2**20:.1f} MiB/M edges")
+
+    rng = random.Random(0)
+    latencies = []
+    found = 0
+    for _ in range(queries):
+        source, target = rng.choice(ids), rng.choice(ids)
+        start = time.perf_counter()
+        path = graph.shortest_path(source, target, max_depth)
+        latencies.append((time.perf_counter() - start) * 1_000_000)
+        found += path is not None
+    print(f"  shortest_path: p50={statistics.median(latencies):.0f}us p99={percentile(latencies, 0.99):.0f}us "
+          f"found={found}/{queries}")
+
+    start = time.perf_counter()
+    size, _ = graph.component(ids[0], 100)
+    print(f"  component: size={size} {(time.perf_counter() - start) * 1000:.1f}ms")
+    start = time.perf_counter()
+    components = graph.components()
+    print(f"  components: count={components['count']} largest={components['largest'][:3]} "
+          f"{time.perf_counter() - start:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build time, memory and query latency of the in-memory graph projection")
+    parser.add_argument("--edges", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--nodes-per-edge", type=float, default=0.2)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--max-depth", type=int, default=6)
+    args = parser.parse_args()
+    for edges in args.edges:
+        run(edges, max(2, int(edges * args.nodes_per_edge)), args.queries, args.max_depth)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+全文搜索延迟基准测试
+
+从现有的书籍和作者中随机取名称，用其前几个字符作为输入，分别测量
+typeahead(不命中缓存/命中缓存)和完整搜索的 p50/p99 延迟，目标是 typeahead 在 20ms 以内。
+需要先启动过一次应用(或运行 python -m app.indexes)以创建全文索引。
+
+用法:
+    python -m benchmarks.search_latency --queries 500 --prefix 3
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.db import init_driver, close_driver
+from services.search_services import SearchService, typeahead_cache
+
+
+async def sample_names(driver, count):
+    async with driver.session() as session:
+        result = await session.run(
+            "MATCH (n) WHERE n:Book OR n:Author WITH coalesce(n.title, n.name) AS name WHERE name IS NOT NULL "
+            "RETURN name ORDER BY rand() LIMIT $count",
+            count=count
+        )
+        return [record["name"] async for record in result]
+
+
+async def measure(call, inputs):
+    latencies = []
+    for text in inputs:
+        start = time.perf_counter()
+        await call(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+
+def summarize(name, latencies):
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:>18}: p50={statistics.median(latencies):.2f}ms p99={p99:.2f}ms")
+
+
+async def main(queries, prefix):
+    driver = await init_driver()
+    service = SearchService(driver)
+    try:
+        names = await sample_names(driver, queries)
+        if not names:
+            print("No books or authors to sample, import some data first")
+            return
+        inputs = [name[:prefix] for name in names]
+
+        async def uncached(text):
+            await typeahead_cache.clear()
+            await service.typeahead(text)
+
+        summarize("typeahead uncached", await measure(uncached, inputs))
+        summarize("typeahead cached", await measure(service.typeahead, inputs))
+        summarize("search", await measure(service.search, inputs))
+    finally:
+        await close_driver()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Full-text typeahead and search latency")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--prefix", type=int, default=3, help="characters of each sampled name to type")
+    args = parser.parse_args()
+    asyncio.run(main(args.queries, args.prefix))
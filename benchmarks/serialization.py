@@ -0,0 +1,95 @@
+"""
+列表响应序列化基准测试
+
+生成与 GET /authors/ 返回结构相同的作者行，比较两条响应路径每 10k 行的 CPU 时间和峰值内存：
+  validated: response_model=List[Author] 校验，序列化为 JSON 兼容对象后再由 JSONResponse 编码
+  fast:      FastJSONResponse 直接编码服务层返回的 dict
+同时比较 NDJSON 导出逐行编码的耗时。安装 orjson 后 fast 路径使用 orjson，不需要 Neo4j。
+
+用法:
+    python -m benchmarks.serialization --rows 10000 --repeat 20
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app import fastjson
+from app.fastjson import FastJSONResponse
+from routers.author import Author
+
+
+def author_rows(count):
+    return [
+        {
+            "id": i,
+            "name": f"作者 {i}",
+            "email": f"author{i}@example.com",
+            "gender": "female" if i % 2 else "male",
+            "birth_date": "1970-01-01",
+            "birth_place": "北京",
+            "family_members": "",
+            "imdb_id": f"nm{i:07d}",
+            "occupation": "writer",
+            "degree": i % 50,
+            "pagerank": 1.0 / (i + 1),
+            "community": i % 100,
+        }
+        for i in range(count)
+    ]
+
+
+def validated(rows, adapter=TypeAdapter(List[Author])):
+    content = adapter.dump_python(adapter.validate_python(rows), mode="json")
+    return JSONResponse(content).body
+
+
+def fast(rows):
+    return FastJSONResponse(rows).body
+
+
+def ndjson_json(rows):
+    return b"".join((json.dumps(row, ensure_ascii=False, default=str) + "\n").encode() for row in rows)
+
+
+def ndjson_fast(rows):
+    return b"".join(fastjson.dumps(row) + b"\n" for row in rows)
+
+
+def measure(encode, rows, repeat):
+    """每次调用的 CPU 时间(毫秒)和峰值内存(MiB)"""
+    encode(rows)
+    start = time.process_time()
+    for _ in range(repeat):
+        size = len(encode(rows))
+    cpu = (time.process_time() - start) / repeat * 1000
+    tracemalloc.start()
+    encode(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak / 2**20, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU time and peak memory of list response serialization")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    rows = author_rows(args.rows)
+    scale = 10000 / args.rows
+    print(f"encoder={'orjson' if fastjson.orjson else 'json'} rows={args.rows} (per 10k rows)")
+    results = {}
+    for name, encode in [("validated", validated), ("fast", fast), ("ndjson json", ndjson_json), ("ndjson fast", ndjson_fast)]:
+        cpu, peak, size = measure(encode, rows, args.repeat)
+        results[name] = cpu
+        print(f"{name:>12}: cpu={cpu * scale:.1f}ms peak={peak * scale:.1f}MiB body={size * scale / 2**20:.2f}MiB")
+    print(f"list speedup={results['validated'] / results['fast']:.1f}x "
+          f"export speedup={results['ndjson json'] / results['ndjson fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
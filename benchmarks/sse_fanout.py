@@ -0,0 +1,45 @@
+"""
+SSE 事件广播开销基准测试
+
+在进程内模拟 N 个已连接的客户端(每个客户端一个消费协程)，发布 M 个事件，
+统计服务端每个事件、每个客户端的广播耗时，不需要 Neo4j。
+
+用法:
+    python -m benchmarks.sse_fanout --clients 1 10 100 1000 --events 1000
+"""
+import argparse
+import asyncio
+
+from app.events import GraphEventBroker
+
+
+async def run(clients, events):
+    broker = GraphEventBroker(queue_size=events + 1)
+    queues = [broker.subscribe() for _ in range(clients)]
+
+    async def consume(queue):
+        for _ in range(events):
+            await queue.get()
+
+    consumers = [asyncio.create_task(consume(queue)) for queue in queues]
+    for i in range(events):
+        broker.publish("add", "node", {"id": f"Book:{i}", "name": f"book-{i}", "group": "Book", "category": 0})
+        if i % 100 == 0:
+            # 让消费协程运行，模拟真实的事件循环调度
+            await asyncio.sleep(0)
+    await asyncio.gather(*consumers)
+    return broker.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-client fan-out cost of graph change events")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--events", type=int, default=1000)
+    args = parser.parse_args()
+    for clients in args.clients:
+        stats = asyncio.run(run(clients, args.events))
+        print(f"clients={clients:>5}: {stats['fanout_us_per_event']:>10.3f} us/event  {stats['fanout_us_per_client']:.3f} us/client")
+
+
+if __name__ == "__main__":
+    main()
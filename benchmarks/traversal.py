@@ -0,0 +1,124 @@
+"""
+图遍历基准测试
+
+按优先连接(preferential attachment)生成幂律分布的书籍-作者图：每本书的作者按
+已有书籍数加权选择，少数作者成为连接大量书籍的超级节点。分别从超级节点和中位数
+作者出发，测量不同跳数和 fan_out 下邻域遍历的耗时和返回规模，以及合作者查询的耗时。
+测试节点带 :BenchGraph 标签，主键从 1000000000 开始，结束后删除。
+
+用法:
+    python -m benchmarks.traversal --books 50000 --authors 5000 --fan-out 10 50 200
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.db import init_driver, close_driver
+from services.traversal_services import TraversalService
+
+LABEL = "BenchGraph"
+ID_OFFSET = 1000000000
+
+
+def power_law_edges(books: int, authors: int, per_book: int, seed: int = 42):
+    """每本书选 per_book 个作者，被选中的概率与作者已有书籍数 + 1 成正比"""
+    rng = random.Random(seed)
+    # 每个作者先出现一次，之后每被选中一次再追加一次
+    pool = list(range(authors))
+    edges = []
+    for book in range(books):
+        chosen = {rng.choice(pool) for _ in range(per_book)}
+        for author in chosen:
+            edges.append({"book": ID_OFFSET + book, "author": str(ID_OFFSET + author)})
+            pool.append(author)
+    return edges
+
+
+async def populate(driver, books: int, authors: int, edges, batch_size: int = 10000):
+    async with driver.session() as session:
+        for start in range(0, books, batch_size):
+            await (await session.run(
+                f"UNWIND range($start, $end) AS i CREATE (:Book:{LABEL} {{id: $offset + i, title: 'bench-' + toString(i)}})",
+                start=start, end=min(start + batch_size, books) - 1, offset=ID_OFFSET
+            )).consume()
+        for start in range(0, authors, batch_size):
+            await (await session.run(
+                f"UNWIND range($start, $end) AS i "
+                f"CREATE (:Author:{LABEL} {{author_id: toString($offset + i), name: 'bench-author-' + toString(i)}})",
+                start=start, end=min(start + batch_size, authors) - 1, offset=ID_OFFSET
+            )).consume()
+        for start in range(0, len(edges), batch_size):
+            await (await session.run(
+                f"UNWIND $rows AS row "
+                f"MATCH (b:{LABEL} {{id: row.book}}) MATCH (a:{LABEL} {{author_id: row.author}}) "
+                "CREATE (b)-[:WRITTEN_BY]->(a)",
+                rows=edges[start:start + batch_size]
+            )).consume()
+
+
+async def measure(service, author_id: str, depth: int, fan_out: int, limit: int, runs: int):
+    """返回 (延迟列表(毫秒), 最后一次的 summary)"""
+    seed = await service.find_node("Author", author_id)
+    latencies = []
+    summary = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        async for line in service.neighborhood(seed, depth, fan_out, limit):
+            summary = line
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, summary
+
+
+async def main(books: int, authors: int, per_book: int, depths, fan_outs, limit: int, runs: int):
+    edges = power_law_edges(books, authors, per_book)
+    degrees = {}
+    for edge in edges:
+        degrees[edge["author"]] = degrees.get(edge["author"], 0) + 1
+    ranked = sorted(degrees, key=degrees.get, reverse=True)
+    starts = {"hub": ranked[0], "median": ranked[len(ranked) // 2]}
+    print(f"{books} books, {authors} authors, {len(edges)} edges; "
+          f"hub degree={degrees[starts['hub']]}, median degree={degrees[starts['median']]}")
+
+    driver = await init_driver()
+    service = TraversalService(driver)
+    try:
+        await populate(driver, books, authors, edges)
+        async with driver.session() as session:
+            await (await session.run("CALL db.awaitIndexes(300)")).consume()
+
+        for name, author_id in starts.items():
+            for depth in depths:
+                for fan_out in fan_outs:
+                    latencies, summary = await measure(service, author_id, depth, fan_out, limit, runs)
+                    print(
+                        f"{name:>6} depth={depth} fan_out={fan_out:>4}: "
+                        f"p50={statistics.median(latencies):.1f}ms max={max(latencies):.1f}ms "
+                        f"nodes={summary['nodes']} links={summary['links']} "
+                        f"truncated={len(summary['truncated'])} limit_reached={summary['limit_reached']}"
+                    )
+            for fan_out in fan_outs:
+                start = time.perf_counter()
+                found = [row async for row in service.coauthors(author_id, fan_out)]
+                print(f"{name:>6} coauthors fan_out={fan_out:>4}: "
+                      f"{(time.perf_counter() - start) * 1000:.1f}ms results={len(found)}")
+    finally:
+        async with driver.session() as session:
+            await (await session.run(
+                f"MATCH (n:{LABEL}) CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF 10000 ROWS"
+            )).consume()
+        await close_driver()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Neighborhood traversal latency on a synthetic power-law graph")
+    parser.add_argument("--books", type=int, default=50000)
+    parser.add_argument("--authors", type=int, default=5000)
+    parser.add_argument("--per-book", type=int, default=2, help="authors drawn per book")
+    parser.add_argument("--depth", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--fan-out", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--limit", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.books, args.authors, args.per_book, args.depth, args.fan_out, args.limit, args.runs))
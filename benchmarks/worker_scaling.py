@@ -0,0 +1,79 @@
+"""
+多 worker 吞吐量扩展基准测试
+
+依次用 1/2/4/8 个 worker 启动 python -m app.server，等待所有 worker 就绪后用
+benchmarks.concurrent_throughput 压测同一个路径，再发送 SIGTERM 并检查进程在优雅退出时间内结束。
+输出每种 worker 数的吞吐量、延迟和相对 1 个 worker 的加速比。
+
+压测 /books/ 等路径需要运行中的 Neo4j；只测量框架本身的扩展时可以用 --path /。
+
+用法:
+    python -m benchmarks.worker_scaling --workers 1 2 4 8 --path /books/ --concurrency 64 --requests 5000
+"""
+import argparse
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.concurrent_throughput import run
+
+
+def wait_ready(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                response.read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def measure(workers, args):
+    base = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--workers", str(workers), "--port", str(args.port), "--log-level", "warning"]
+    )
+    try:
+        if not wait_ready(base + "/", args.startup_timeout):
+            raise RuntimeError(f"Server with {workers} workers did not start")
+        # 每个 worker 都接收过请求后再计时
+        run(base + args.path, args.concurrency, args.concurrency * workers, args.timeout)
+        return run(base + args.path, args.concurrency, args.requests, args.timeout)
+    finally:
+        start = time.perf_counter()
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(args.shutdown_timeout)
+            print(f"  shutdown: {time.perf_counter() - start:.2f}s exit={server.returncode}")
+        except subprocess.TimeoutExpired:
+            server.kill()
+            print(f"  shutdown: not finished after {args.shutdown_timeout}s, killed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput scaling of python -m app.server across worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--path", default="/books/")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--shutdown-timeout", type=float, default=45.0)
+    args = parser.parse_args()
+
+    baseline = None
+    for workers in args.workers:
+        print(f"workers={workers}")
+        stats = measure(workers, args)
+        baseline = baseline or stats["throughput_rps"]
+        print(f"  {stats['throughput_rps']:.0f} req/s p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms "
+              f"errors={stats['errors']} speedup={stats['throughput_rps'] / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+批量导入命令行工具
+
+用法:
+    python bulk_import.py books books.csv
+    python bulk_import.py authors authors.json --batch-size 5000
+    python bulk_import.py book2author links.csv
+文件扩展名为 .csv 时按 CSV 解析(首行为表头)，否则按 JSON 数组解析
+book2author 的行为 book_id,author_id，书籍和作者需要已经导入
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from pydantic import ValidationError
+
+from app.db import init_driver, close_driver
+from routers.bulk import ROW_MODELS, validate_rows
+from services import bulk_services
+
+
+def print_progress(done, total):
+    print(f"\r{done}/{total} rows ({done * 100 // max(total, 1)}%)", end="", file=sys.stderr, flush=True)
+
+
+async def run(kind, path, batch_size, retries):
+    with open(path, "rb") as f:
+        rows = bulk_services.parse_rows(f.read(), "text/csv" if path.endswith(".csv") else "application/json")
+    rows = validate_rows(kind, rows)
+
+    driver = await init_driver()
+    try:
+        services = bulk_services.BulkImportService(driver)
+        importer = {
+            "books": services.import_books,
+            "authors": services.import_authors,
+            "book2author": services.import_book_authors,
+        }[kind]
+        return await importer(rows, batch_size, retries, on_progress=print_progress)
+    finally:
+        await close_driver()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import books, authors and book-author relations into Neo4j")
+    parser.add_argument("kind", choices=list(ROW_MODELS))
+    parser.add_argument("path", help="JSON array or CSV file")
+    parser.add_argument("--batch-size", type=int, default=bulk_services.BULK_BATCH_SIZE)
+    parser.add_argument("--retries", type=int, default=bulk_services.BULK_RETRIES)
+    args = parser.parse_args()
+
+    try:
+        stats = asyncio.run(run(args.kind, args.path, args.batch_size, args.retries))
+    except (ValueError, ValidationError) as e:
+        print(f"Invalid input: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(file=sys.stderr)
+    print(json.dumps(stats, indent=2))
+    if stats["failed_batches"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,110 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException
-from app.db import get_session, CloseNeo4jSessionMiddleware
-from app import crud, schemas
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.cache import entity_cache
+from app.db import (
+    get_session, get_driver, init_driver, close_driver, check_connectivity, warm_up_pool,
+    drain_sessions, pool_stats, session_stats,
+)
+from app.metrics import RequestMetricsMiddleware, render_metrics
+from app.events import graph_events
+from app.indexes import ensure_schema, log_index_report
+from app.projection import graph_projection
+from app.sequence import reset_sequences
+from app import crud, schemas, slow_query
 from routers import all_routers
 
-app = FastAPI(title="Neo4j FastAPI Example")
+logger = logging.getLogger(__name__)
 
-# Add middleware to close Neo4j sessions
-app.add_middleware(CloseNeo4jSessionMiddleware)
 
-for r in all_routers:
-    app.include_router(r)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期：启动时创建 Neo4j 异步驱动、预热连接池和创建约束/索引，
+    关闭时等待进行中的查询结束再释放连接池
+    每个 worker 进程各自执行一次，驱动在 worker 进程中创建，不会跨 fork 共享连接
+    """
+    reset_sequences()
+    driver = await init_driver()
+    error = await check_connectivity(driver)
+    if error is None:
+        # 预热失败同样不阻止启动，之后的请求按需建立连接
+        warm_up_error = await warm_up_pool(driver)
+        if warm_up_error is not None:
+            logger.error("Neo4j connection pool warm-up failed: %s", warm_up_error)
+    else:
+        # 不阻止启动，Neo4j 恢复后请求可以正常处理，/health 在此之前返回 503
+        logger.error("Cannot connect to Neo4j: %s", error)
+    await ensure_schema(driver)
+    await log_index_report(driver)
+    if graph_projection.enabled:
+        # 写接口的变更事件增量更新投影，首次构建在后台进行，完成前查询回退到 Cypher
+        graph_events.add_listener(graph_projection.apply)
+        graph_projection.schedule_refresh(driver)
+    try:
+        yield
+    finally:
+        # uvicorn 在此之前已停止接收新请求并等待进行中的请求结束，这里再等待后台任务的查询
+        remaining = await drain_sessions()
+        if remaining:
+            logger.warning("Closing the Neo4j driver with %d sessions still open", remaining)
+        # 等待超时后仍在获取慢查询执行计划的任务不再需要，在关闭驱动前取消
+        await slow_query.cancel_pending()
+        await close_driver()
 
 
-@app.get("/")
-async def root():
-    return {
-        "message": "Neo4j FastAPI Example",
-        "version": "0.1.0",
-        "docs_url": "/docs",
-        "description": "API for managing company data in Neo4j graph database"
-    }
+def create_app() -> FastAPI:
+    """
+    创建应用并注册中间件和路由
+    导入本模块不会连接 Neo4j，也不会导入 neo4j 驱动：驱动在 lifespan 中创建，服务在请求中创建，
+    只需要路由或 schema 的测试和脚本可以直接调用 create_app()
+    uvicorn main:app 或 uvicorn --factory main:create_app 启动
+    """
+    app = FastAPI(title="Neo4j FastAPI Example", lifespan=lifespan)
+
+    # 按路由记录请求耗时，见 /metrics
+    app.add_middleware(RequestMetricsMiddleware)
+
+    for r in all_routers:
+        app.include_router(r)
+
+    @app.get("/")
+    async def root():
+        return {
+            "message": "Neo4j FastAPI Example",
+            "version": "0.1.0",
+            "docs_url": "/docs",
+            "description": "API for managing company data in Neo4j graph database"
+        }
+
+    @app.get("/cache/stats")
+    async def cache_stats():
+        """单实体缓存的命中统计"""
+        return entity_cache.stats()
+
+    @app.get("/db/stats")
+    async def db_stats():
+        """Neo4j session 和连接池的使用情况，请求结束后 sessions.active 应回到 0"""
+        return {"sessions": session_stats.stats(), "pool": pool_stats()}
+
+    @app.get("/health")
+    async def health():
+        """健康检查，Neo4j 不可用时返回 503"""
+        error = await check_connectivity(get_driver())
+        if error is not None:
+            return JSONResponse({"status": "unavailable", "neo4j": error}, status_code=503)
+        return {"status": "ok", "pool": pool_stats()}
+
+    @app.get("/metrics")
+    async def metrics():
+        """Prometheus 文本格式的指标"""
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+
+app = create_app()
 
 # # 创建公司
 # @app.post("/companies/", response_model=schemas.CompanyOut)
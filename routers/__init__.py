@@ -5,6 +5,10 @@ from .author import router as author_router
 from .book2author import router as book2author_router
 from .school import router as school_router
 from .author2school import router as author2school_router
+from .bulk import router as bulk_router
+from .graph import router as graph_router
+from .analytics import router as analytics_router
+from .search import router as search_router
 
 all_routers = [
     users_router,
@@ -13,5 +17,9 @@ all_routers = [
     author_router,
     book2author_router,
     school_router,
-    author2school_router
+    author2school_router,
+    bulk_router,
+    graph_router,
+    analytics_router,
+    search_router
 ]
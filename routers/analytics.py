@@ -0,0 +1,61 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from app.analytics import analytics_jobs
+from app.db import get_driver
+
+router = APIRouter(
+    prefix="/analytics",       # 路由前缀
+    tags=["analytics"],        # 文档分类标签
+)
+
+# 请求体模型
+class AnalyticsOptions(BaseModel):
+    damping: float = Field(0.85, gt=0, lt=1)
+    max_iterations: int = Field(100, ge=1, le=1000)
+    tolerance: float = Field(1e-6, gt=0)
+    community_iterations: int = Field(20, ge=1, le=100)
+
+class AnalyticsJob(BaseModel):
+    id: str
+    status: str # queued / running / succeeded / failed
+    phase: Optional[str] = None # export / compute / write
+    options: AnalyticsOptions
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    nodes: Optional[int] = None
+    edges: Optional[int] = None
+    communities: Optional[int] = None
+    iterations: Optional[int] = None # PageRank 迭代次数
+    seconds: Dict[str, float] # 各阶段耗时
+    error: Optional[str] = None
+
+
+@router.post("/jobs", response_model=AnalyticsJob, status_code=202)
+async def create_analytics_job(options: Optional[AnalyticsOptions] = None):
+    """
+    提交分析任务：计算度数、PageRank 和社区标签，写回节点属性 degree、pagerank、community
+    任务在后台运行，通过 GET /analytics/jobs/{job_id} 查询进度
+    """
+    options = options or AnalyticsOptions()
+    driver = get_driver()
+    try:
+        return analytics_jobs.submit(driver, **options.model_dump())
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/jobs", response_model=List[AnalyticsJob])
+async def list_analytics_jobs():
+    """最近的分析任务，新任务在前"""
+    return analytics_jobs.list()
+
+
+@router.get("/jobs/{job_id}", response_model=AnalyticsJob)
+async def get_analytics_job(job_id: str):
+    """查询分析任务状态"""
+    job = analytics_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,8 +1,15 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from services import author_services
-from app.db import driver
+from services.delete_services import CASCADE_MODES
+from services.graph_services import graph_node
+from app.db import get_driver, get_session
+from app.batch import MAX_BATCH_IDS, order_by_ids
+from app.events import graph_events
+from app.fastjson import FastJSONResponse
+from app.export import EXPORT_FETCH_SIZE, MAX_EXPORT_FETCH_SIZE, ndjson_response
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, parse_fields
 
 router = APIRouter(
     prefix="/authors",       # 路由前缀
@@ -24,37 +31,143 @@ class AuthorCreate(AuthorBase):
 
 class Author(AuthorBase):
     id: int
+    # 图分析指标，由 POST /analytics/jobs 计算
+    degree: Optional[int] = None
+    pagerank: Optional[float] = None
+    community: Optional[int] = None
 
     class Config:
         from_attributes = True
 
+class AuthorUpdate(BaseModel):
+    name: Optional[str] = None
+    email: Optional[str] = None
+    gender: Optional[str] = None
+    birth_date: Optional[str] = None
+    birth_place: Optional[str] = None
+    family_members: Optional[str] = None
+    imdb_id: Optional[str] = None
+    occupation: Optional[str] = None
+
+class AuthorPatch(AuthorUpdate):
+    id: int
+
+class AuthorPatches(BaseModel):
+    items: List[AuthorPatch] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+class AuthorIds(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+class AuthorBatch(BaseModel):
+    items: List[Author]
+    missing: List[int]
+
+class BibliographyBook(BaseModel):
+    # 通过 book2author 创建的书籍只有 title
+    id: Optional[int] = None
+    title: Optional[str] = None
+    author: Optional[str] = None
+
+class Bibliography(BaseModel):
+    author_id: Optional[int] = None
+    name: Optional[str] = None
+    book_count: int
+    books: List[BibliographyBook]
+    next_after: Optional[str] = None # 下一页的 after 参数，没有更多书籍时为空
+
+def bibliography_response(result, limit):
+    """根据本页书籍数量生成 next_after"""
+    books = result["books"]
+    return {**result, "next_after": books[-1]["cursor"] if len(books) == limit else None}
+
 
 @router.get("/", response_model=List[Author])
-async def list_authors():
-    """获取所有作者"""
-    services = author_services.AuthorService(driver)
-    authors = services.get_all_authors()
-    # 转换用户数据为作者数据
-    result = []
-    for item in authors:
-        result.append({
-            "id": item["id"],
-            "name": item["name"],
-            "email": item["email"],
-            "gender": item["gender"],
-            "birth_date": item["birth_date"],
-            "birth_place": item["birth_place"],
-            "family_members": item["family_members"],
-            "imdb_id": item["imdb_id"],
-            "occupation": item["occupation"]
-        })
-    return result
+async def list_authors(
+    after: str = Query("", description="上一页最后一位作者的 id，作者按 author_id 的字符串顺序(\"10\" 在 \"2\" 之前)翻页"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，如 name,occupation"),
+    session=Depends(get_session),
+):
+    """按 id 翻页获取作者"""
+    columns = parse_fields(fields, author_services.AUTHOR_FIELDS)
+    services = author_services.AuthorService(get_driver(), session)
+    authors = await services.get_all_authors(after, limit, columns)
+    # 投影已保证字段和类型，直接编码，不经过 response_model 校验
+    return FastJSONResponse(authors)
+
+@router.get("/export")
+async def export_authors(
+    fetch_size: int = Query(EXPORT_FETCH_SIZE, ge=1, le=MAX_EXPORT_FETCH_SIZE, description="每批从 Neo4j 拉取的记录数"),
+):
+    """以 NDJSON 流式导出所有作者"""
+    services = author_services.AuthorService(get_driver())
+    return ndjson_response(services.iter_authors(fetch_size))
+
+@router.post("/batch-get", response_model=AuthorBatch)
+async def batch_get_authors(body: AuthorIds, session=Depends(get_session)):
+    """按给定顺序批量获取作者，并返回不存在的 id"""
+    services = author_services.AuthorService(get_driver(), session)
+    found = await services.get_authors([str(author_id) for author_id in body.ids])
+    # author_id 在图中以字符串存储
+    return order_by_ids(body.ids, {int(key): author for key, author in found.items()})
+
+@router.get("/top", response_model=List[Author])
+async def list_top_authors(
+    by: Literal[author_services.RANK_FIELDS] = Query("pagerank", description="排序指标"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，如 name,pagerank"),
+    session=Depends(get_session),
+):
+    """按 PageRank 或度数降序获取作者，需要先运行 POST /analytics/jobs"""
+    columns = parse_fields(fields, author_services.AUTHOR_FIELDS)
+    services = author_services.AuthorService(get_driver(), session)
+    authors = await services.get_top_authors(by, limit, columns)
+    return FastJSONResponse(authors)
+
+@router.get("/by-name/{author_name}/books", response_model=Bibliography)
+async def get_author_books_by_name(
+    author_name: str,
+    after: str = Query("", description="上一页返回的 next_after，如 118 或 title:书名"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session=Depends(get_session),
+):
+    """按作者名分页获取作者的书籍，同名作者有多个时返回 409"""
+    services = author_services.AuthorService(get_driver(), session)
+    authors = await services.find_authors_by_name(author_name)
+    if not authors:
+        raise HTTPException(status_code=404, detail="Author not found")
+    if len(authors) > 1:
+        raise HTTPException(status_code=409, detail="Multiple authors have this name, use GET /authors/{author_id}/books")
+    try:
+        result = await services.get_bibliography(element_id=authors[0]["element_id"], after=after, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Author not found")
+    return bibliography_response(result, limit)
+
+@router.get("/{author_id}/books", response_model=Bibliography)
+async def get_author_books(
+    author_id: int,
+    after: str = Query("", description="上一页返回的 next_after，如 118 或 title:书名"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session=Depends(get_session),
+):
+    """分页获取作者的书籍"""
+    services = author_services.AuthorService(get_driver(), session)
+    try:
+        result = await services.get_bibliography(author_id=str(author_id), after=after, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Author not found")
+    return bibliography_response(result, limit)
 
 @router.get("/{author_id}", response_model=Author)
-async def get_author(author_id: int):
+async def get_author(author_id: int, session=Depends(get_session)):
     """根据 ID 获取作者"""
-    services = author_services.AuthorService(driver)
-    author_node = services.get_author(str(author_id))  # 使用用户服务获取数据
+    services = author_services.AuthorService(get_driver(), session)
+    author_node = await services.get_author(str(author_id))  # 使用用户服务获取数据
     if not author_node:
         raise HTTPException(status_code=404, detail="Author not found")
     
@@ -68,15 +181,18 @@ async def get_author(author_id: int):
         "birth_place": author_node.get("birth_place", ""),
         "family_members": author_node.get("family_members", ""),
         "imdb_id": author_node.get("imdb_id", ""),
-        "occupation": author_node.get("occupation", "")
+        "occupation": author_node.get("occupation", ""),
+        "degree": author_node.get("degree"),
+        "pagerank": author_node.get("pagerank"),
+        "community": author_node.get("community"),
     }
     return author_dict  
 
 @router.post("/", response_model=Author)
-async def create_author(author: AuthorCreate):
+async def create_author(author: AuthorCreate, session=Depends(get_session)):
     """创建新作者，author_id将自动生成"""
-    services = author_services.AuthorService(driver)
-    author_node = services.create_author(
+    services = author_services.AuthorService(get_driver(), session)
+    author_node = await services.create_author(
         name=author.name,
         email=author.email,
         gender=author.gender,
@@ -99,13 +215,52 @@ async def create_author(author: AuthorCreate):
         "imdb_id": author_node["imdb_id"],
         "occupation": author_node["occupation"]
     }
+    graph_events.publish("add", "node", graph_node("Author", author_node["author_id"], author_node["name"]))
     return author_dict
 
+@router.patch("/", response_model=AuthorBatch)
+async def patch_authors(body: AuthorPatches, session=Depends(get_session)):
+    """批量部分更新作者，只修改每行给出的字段，所有行在一个事务中写入，并返回不存在的 id"""
+    services = author_services.AuthorService(get_driver(), session)
+    # author_id 在图中以字符串存储
+    updated = await services.update_authors({
+        str(item.id): item.model_dump(exclude={"id"}, exclude_none=True) for item in body.items
+    })
+    for author in updated.values():
+        graph_events.publish("update", "node", graph_node("Author", author["id"], author["name"]))
+    return order_by_ids([item.id for item in body.items], {author["id"]: author for author in updated.values()})
+
+@router.patch("/{author_id}", response_model=Author)
+async def patch_author(author_id: int, author: AuthorUpdate, session=Depends(get_session)):
+    """部分更新作者，只修改请求中给出的字段"""
+    services = author_services.AuthorService(get_driver(), session)
+    updated = await services.update_authors({str(author_id): author.model_dump(exclude_none=True)})
+    if str(author_id) not in updated:
+        raise HTTPException(status_code=404, detail="Author not found")
+    result = updated[str(author_id)]
+    graph_events.publish("update", "node", graph_node("Author", result["id"], result["name"]))
+    return result
+
 @router.delete("/{author_id}")
-async def delete_author(author_id: int):
+async def delete_author(
+    author_id: int,
+    cascade: Literal[CASCADE_MODES] = Query("restrict", description="restrict: 有关系时不删除；detach: 同时删除关系；orphans: 同时删除孤立的作者和学校"),
+    session=Depends(get_session),
+):
     """删除作者"""
-    services = author_services.AuthorService(driver)
-    deleted = services.delete_author(str(author_id))
-    if not deleted:
+    services = author_services.AuthorService(get_driver(), session)
+    result = await services.delete_author(str(author_id), cascade)
+    if result is None:
         raise HTTPException(status_code=404, detail="Author not found")
-    return {"message": f"Author {author_id} deleted"}
+    if not result["deleted"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Author {author_id} has {result['relationships']} relationships, use cascade=detach or cascade=orphans"
+        )
+    for graph_id in result["removed"]:
+        graph_events.publish("remove", "node", {"id": graph_id})
+    return {
+        "message": f"Author {author_id} deleted",
+        "relationships_deleted": result["relationships"],
+        "orphans_deleted": result["orphans"],
+    }
@@ -1,6 +1,12 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
-from app.db import driver
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from typing import List
+from app.batch import MAX_BATCH_IDS
+from app.cache import entity_cache
+from app.db import get_driver, get_session
+from app.events import graph_events
+from services.graph_services import graph_node, node_id
+from services.relation_services import RelationService
 
 router = APIRouter(
     prefix="/author2school",       # 路由前缀
@@ -12,19 +18,61 @@ class AuthorSchool(BaseModel):
     school_name: str
     author_name: str
 
+class AuthorSchoolLink(BaseModel):
+    author_id: int
+    school_id: int
 
-@router.post("/create")
-def create_author_school_relation(data: AuthorSchool):
-    """创建 作者-学校 关系"""
-    cypher = """
-    MERGE (a:Author {name: $author_name})
-    MERGE (s:School {name: $school_name})
-    MERGE (a)-[:WRITTEN_BY]->(s)
-    RETURN s.name AS school, a.name AS author  
+class AuthorSchoolLinks(BaseModel):
+    links: List[AuthorSchoolLink] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+class AuthorSchoolLinkResult(BaseModel):
+    created: int # 新建的关系数
+    existing: int # 已存在的关系数
+    duplicates: int # 请求中重复的行数
+    missing: List[AuthorSchoolLink] # 作者或学校不存在的行
+
+
+@router.post("/links", response_model=AuthorSchoolLinkResult)
+async def link_authors_schools(data: AuthorSchoolLinks, session=Depends(get_session)):
+    """
+    按 id 批量创建 作者-学校 关系
+    作者和学校必须已存在，不会按名称创建节点；已存在的关系不重复创建，请求可以安全重试
+    """
+    services = RelationService(get_driver(), session)
+    result = await services.link_author_schools(
+        [{"author_id": str(link.author_id), "school_id": link.school_id} for link in data.links]
+    )
+    for link in result["links"]:
+        graph_events.publish("add", "link", {
+            "source": node_id("Author", link["author_id"], link["author_element_id"]),
+            "target": node_id("School", link["school_id"], link["school_element_id"]),
+            "type": "WRITTEN_BY",
+        })
+    return {
+        "created": result["created"],
+        "existing": result["existing"],
+        "duplicates": result["duplicates"],
+        "missing": [{"author_id": int(row["author_id"]), "school_id": row["school_id"]} for row in result["missing"]],
+    }
+
+
+@router.post("/create", deprecated=True)
+async def create_author_school_relation(data: AuthorSchool, session=Depends(get_session)):
+    """
+    按名称创建 作者-学校 关系，不存在的作者和学校会按名称新建(没有 id)
+    请改用 POST /author2school/links 按 id 创建
     """
-    with driver.session() as session:
-        result = session.run(cypher, school_name=data.school_name, author_name=data.author_name)
-        record = result.single()
+    services = RelationService(get_driver(), session)
+    record = await services.create_author_school_by_name(data.author_name, data.school_name)
+    await entity_cache.invalidate(
+        entity_cache.key("School", record["school_id"]), entity_cache.key("Author", record["author_id"])
+    )
+    # MERGE 可能新建了节点，add 事件在前端按 id 去重
+    author = graph_node("Author", record["author_id"], record["author"], record["author_element_id"])
+    school = graph_node("School", record["school_id"], record["school"], record["school_element_id"])
+    graph_events.publish("add", "node", author)
+    graph_events.publish("add", "node", school)
+    graph_events.publish("add", "link", {"source": author["id"], "target": school["id"], "type": "WRITTEN_BY"})
     return {"school": record["school"], "author": record["author"]}
 
 
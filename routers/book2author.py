@@ -1,6 +1,12 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
-from app.db import driver
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from typing import List
+from app.batch import MAX_BATCH_IDS
+from app.cache import entity_cache
+from app.db import get_driver, get_session
+from app.events import graph_events
+from services.graph_services import graph_node, node_id
+from services.relation_services import RelationService
 
 router = APIRouter(
     prefix="/book2author",       # 路由前缀
@@ -12,32 +18,70 @@ class BookAuthor(BaseModel):
     book_title: str
     author_name: str
 
+class BookAuthorLink(BaseModel):
+    book_id: int
+    author_id: int
 
-@router.post("/create")
-def create_book_author_relation(data: BookAuthor):
-    """创建 书籍-作者 关系"""
-    cypher = """
-    MERGE (b:Book {title: $book_title})
-    MERGE (a:Author {name: $author_name})
-    MERGE (b)-[:WRITTEN_BY]->(a)
-    RETURN b.title AS book, a.name AS author
+class BookAuthorLinks(BaseModel):
+    links: List[BookAuthorLink] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+class BookAuthorLinkResult(BaseModel):
+    created: int # 新建的关系数
+    existing: int # 已存在的关系数
+    duplicates: int # 请求中重复的行数
+    missing: List[BookAuthorLink] # 书籍或作者不存在的行
+
+
+@router.post("/links", response_model=BookAuthorLinkResult)
+async def link_books_authors(data: BookAuthorLinks, session=Depends(get_session)):
     """
-    with driver.session() as session:
-        result = session.run(cypher, book_title=data.book_title, author_name=data.author_name)
-        record = result.single()
-    return {"book": record["book"], "author": record["author"]}
+    按 id 批量创建 书籍-作者 关系
+    书籍和作者必须已存在，不会按名称创建节点；已存在的关系不重复创建，请求可以安全重试
+    """
+    services = RelationService(get_driver(), session)
+    result = await services.link_book_authors(
+        [{"book_id": link.book_id, "author_id": str(link.author_id)} for link in data.links]
+    )
+    created = result["links"]
+    if created:
+        # 作者的 book_count 变化了
+        await entity_cache.invalidate(*{entity_cache.key("Author", link["author_id"]) for link in created})
+    for link in created:
+        graph_events.publish("add", "link", {
+            "source": node_id("Book", link["book_id"], link["book_element_id"]),
+            "target": node_id("Author", link["author_id"], link["author_element_id"]),
+            "type": "WRITTEN_BY",
+        })
+    return {
+        "created": result["created"],
+        "existing": result["existing"],
+        "duplicates": result["duplicates"],
+        "missing": [{"book_id": row["book_id"], "author_id": int(row["author_id"])} for row in result["missing"]],
+    }
 
 
-@router.get("/author/{author_name}")
-def get_books_by_author(author_name: str):
-    """查询某作者的所有书籍"""
-    cypher = """
-    MATCH (a:Author {name: $author_name})<-[:WRITTEN_BY]-(b:Book)
-    RETURN a.name AS author, collect(b.title) AS books
+@router.post("/create", deprecated=True)
+async def create_book_author_relation(data: BookAuthor, session=Depends(get_session)):
     """
-    with driver.session() as session:
-        result = session.run(cypher, author_name=author_name)
-        record = result.single()
-    if record:
-        return {"author": record["author"], "books": record["books"]}
-    return {"author": author_name, "books": []}
+    按名称创建 书籍-作者 关系，不存在的书籍和作者会按名称新建(没有 id)
+    请改用 POST /book2author/links 按 id 创建
+    """
+    services = RelationService(get_driver(), session)
+    record = await services.create_book_author_by_name(data.book_title, data.author_name)
+    await entity_cache.invalidate(
+        entity_cache.key("Book", record["book_id"]), entity_cache.key("Author", record["author_id"])
+    )
+    # MERGE 可能新建了节点，add 事件在前端按 id 去重
+    book = graph_node("Book", record["book_id"], record["book"], record["book_element_id"])
+    author = graph_node("Author", record["author_id"], record["author"], record["author_element_id"])
+    graph_events.publish("add", "node", book)
+    graph_events.publish("add", "node", author)
+    graph_events.publish("add", "link", {"source": book["id"], "target": author["id"], "type": "WRITTEN_BY"})
+    return {"book": record["book"], "author": record["author"]}
+
+
+@router.get("/author/{author_name}", deprecated=True)
+async def get_books_by_author(author_name: str, session=Depends(get_session)):
+    """查询某作者的所有书籍标题，不分页，请改用 GET /authors/by-name/{author_name}/books"""
+    services = RelationService(get_driver(), session)
+    return await services.get_book_titles_by_author_name(author_name)
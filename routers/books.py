@@ -1,8 +1,15 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from services import books_services
-from app.db import driver
+from services.delete_services import CASCADE_MODES
+from services.graph_services import graph_node
+from app.db import get_driver, get_session
+from app.batch import MAX_BATCH_IDS, order_by_ids
+from app.events import graph_events
+from app.fastjson import FastJSONResponse
+from app.export import EXPORT_FETCH_SIZE, MAX_EXPORT_FETCH_SIZE, ndjson_response
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, parse_fields
 
 router = APIRouter(
     prefix="/books",       # 路由前缀
@@ -23,45 +30,119 @@ class BookUpdate(BaseModel):
     title: Optional[str] = None
     author: Optional[str] = None
 
-# 创建一个全局的 BookService 实例，使用共享的neo4j驱动
-book_service = books_services.BookService(driver)
+class BookPatch(BookUpdate):
+    id: int
+
+class BookPatches(BaseModel):
+    items: List[BookPatch] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+class BookIds(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+class BookBatch(BaseModel):
+    items: List[BookResponse]
+    missing: List[int]
+
+def get_book_service(session=Depends(get_session)) -> books_services.BookService:
+    """BookService 依赖，使用 lifespan 中创建的共享异步驱动和请求级 session"""
+    return books_services.BookService(get_driver(), session)
 
 @router.post("/", response_model=BookResponse)
-async def create_book(book: Book):
+async def create_book(book: Book, book_service: books_services.BookService = Depends(get_book_service)):
     """创建新书籍，自动生成唯一ID"""
-    result = book_service.create_book(book.title, book.author)
+    result = await book_service.create_book(book.title, book.author)
     if result is None:
         raise HTTPException(status_code=400, detail="Failed to create book")
+    graph_events.publish("add", "node", graph_node("Book", result["id"], result["title"]))
     return result
 
 @router.get("/", response_model=List[BookResponse])
-async def get_all_books():
-    """获取所有书籍"""
-    return book_service.get_all_books()
+async def get_all_books(
+    after: int = Query(0, description="上一页最后一本书的 id"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，如 title,author"),
+    book_service: books_services.BookService = Depends(get_book_service),
+):
+    """按 id 翻页获取书籍"""
+    columns = parse_fields(fields, books_services.BOOK_FIELDS)
+    books = await book_service.get_all_books(after, limit, columns)
+    # 投影已保证字段和类型，直接编码，不经过 response_model 校验
+    return FastJSONResponse(books)
+
+@router.get("/export")
+async def export_books(
+    fetch_size: int = Query(EXPORT_FETCH_SIZE, ge=1, le=MAX_EXPORT_FETCH_SIZE, description="每批从 Neo4j 拉取的记录数"),
+):
+    """以 NDJSON 流式导出所有书籍"""
+    # 导出在 iter_books 中打开自己的 session，不使用请求级 session
+    book_service = books_services.BookService(get_driver())
+    return ndjson_response(book_service.iter_books(fetch_size))
+
+@router.post("/batch-get", response_model=BookBatch)
+async def batch_get_books(body: BookIds, book_service: books_services.BookService = Depends(get_book_service)):
+    """按给定顺序批量获取书籍，并返回不存在的 id"""
+    found = await book_service.get_books(body.ids)
+    return order_by_ids(body.ids, found)
 
 @router.get("/{book_id}", response_model=BookResponse)
-async def get_book(book_id: int):
+async def get_book(book_id: int, book_service: books_services.BookService = Depends(get_book_service)):
     """根据ID获取书籍"""
-    result = book_service.get_book(book_id)
+    result = await book_service.get_book(book_id)
     if result is None:
         raise HTTPException(status_code=404, detail="Book not found")
     return result
 
 @router.put("/{book_id}", response_model=BookResponse)
-async def update_book(book_id: int, book: BookUpdate):
+async def update_book(book_id: int, book: BookUpdate, book_service: books_services.BookService = Depends(get_book_service)):
     """更新书籍信息"""
-    result = book_service.update_book(book_id, book.title, book.author)
+    result = await book_service.update_book(book_id, book.title, book.author)
     if result is None:
         raise HTTPException(status_code=404, detail="Book not found")
+    graph_events.publish("update", "node", graph_node("Book", result["id"], result["title"]))
+    return result
+
+@router.patch("/", response_model=BookBatch)
+async def patch_books(body: BookPatches, book_service: books_services.BookService = Depends(get_book_service)):
+    """批量部分更新书籍，只修改每行给出的字段，所有行在一个事务中写入，并返回不存在的 id"""
+    updated = await book_service.update_books({
+        item.id: item.model_dump(exclude={"id"}, exclude_none=True) for item in body.items
+    })
+    for result in updated.values():
+        graph_events.publish("update", "node", graph_node("Book", result["id"], result["title"]))
+    return order_by_ids([item.id for item in body.items], updated)
+
+@router.patch("/{book_id}", response_model=BookResponse)
+async def patch_book(book_id: int, book: BookUpdate, book_service: books_services.BookService = Depends(get_book_service)):
+    """部分更新书籍，只修改请求中给出的字段"""
+    updated = await book_service.update_books({book_id: book.model_dump(exclude_none=True)})
+    if book_id not in updated:
+        raise HTTPException(status_code=404, detail="Book not found")
+    result = updated[book_id]
+    graph_events.publish("update", "node", graph_node("Book", result["id"], result["title"]))
     return result
 
 @router.delete("/{book_id}")
-async def delete_book(book_id: int):
+async def delete_book(
+    book_id: int,
+    cascade: Literal[CASCADE_MODES] = Query("restrict", description="restrict: 有关系时不删除；detach: 同时删除关系；orphans: 同时删除孤立的作者和学校"),
+    book_service: books_services.BookService = Depends(get_book_service),
+):
     """删除书籍"""
-    result = book_service.delete_book(book_id)
-    if not result:
+    result = await book_service.delete_book(book_id, cascade)
+    if result is None:
         raise HTTPException(status_code=404, detail="Book not found")
-    return {"message": f"Book {book_id} deleted"}
+    if not result["deleted"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Book {book_id} has {result['relationships']} relationships, use cascade=detach or cascade=orphans"
+        )
+    for graph_id in result["removed"]:
+        graph_events.publish("remove", "node", {"id": graph_id})
+    return {
+        "message": f"Book {book_id} deleted",
+        "relationships_deleted": result["relationships"],
+        "orphans_deleted": result["orphans"],
+    }
 
 
 
@@ -0,0 +1,95 @@
+import logging
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import Field, TypeAdapter, ValidationError
+from typing import Annotated, List
+from services import bulk_services
+from app.db import get_driver
+from app.events import graph_events
+from app.projection import graph_projection
+from routers.author import AuthorCreate
+from routers.book2author import BookAuthorLink
+from routers.books import Book
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/bulk",       # 路由前缀
+    tags=["bulk"],        # 文档分类标签
+)
+
+# 各导入类型每一行的校验模型
+ROW_MODELS = {
+    "books": Book,
+    "authors": AuthorCreate,
+    "book2author": BookAuthorLink,
+}
+
+
+def validate_rows(kind, rows):
+    """
+    按导入类型校验每一行
+    :param kind: books / authors / book2author
+    :param rows: 解析后的行字典列表
+    :return: 校验后的行字典列表
+    """
+    adapter = TypeAdapter(Annotated[List[ROW_MODELS[kind]], Field(max_length=bulk_services.MAX_BULK_ROWS)])
+    return [row.model_dump() for row in adapter.validate_python(rows)]
+
+
+async def read_rows(request: Request, kind):
+    """读取请求体：Content-Type 为 text/csv 时按 CSV 解析，否则按 JSON 数组解析"""
+    try:
+        rows = bulk_services.parse_rows(await request.body(), request.headers.get("content-type"))
+        return validate_rows(kind, rows)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def log_progress(kind):
+    def on_progress(done, total):
+        logger.info("Bulk import %s: %d/%d rows", kind, done, total)
+    return on_progress
+
+
+@router.post("/books")
+async def import_books(request: Request, batch_size: int = Query(bulk_services.BULK_BATCH_SIZE, ge=1, le=bulk_services.MAX_BULK_BATCH_SIZE)):
+    """批量创建书籍，请求体为 JSON 数组或 CSV(title,author)"""
+    rows = await read_rows(request, "books")
+    services = bulk_services.BulkImportService(get_driver())
+    try:
+        return await services.import_books(rows, batch_size, on_progress=log_progress("books"))
+    finally:
+        # 批量导入不发布图变更事件(失败时也可能已提交部分批次)，内存中的图投影需要重建，图快照缓存需要失效
+        graph_events.touch()
+        graph_projection.invalidate()
+
+
+@router.post("/authors")
+async def import_authors(request: Request, batch_size: int = Query(bulk_services.BULK_BATCH_SIZE, ge=1, le=bulk_services.MAX_BULK_BATCH_SIZE)):
+    """批量创建作者，请求体为 JSON 数组或 CSV，字段与 POST /authors/ 相同"""
+    rows = await read_rows(request, "authors")
+    services = bulk_services.BulkImportService(get_driver())
+    try:
+        return await services.import_authors(rows, batch_size, on_progress=log_progress("authors"))
+    finally:
+        # 批量导入不发布图变更事件(失败时也可能已提交部分批次)，内存中的图投影需要重建，图快照缓存需要失效
+        graph_events.touch()
+        graph_projection.invalidate()
+
+
+@router.post("/book2author")
+async def import_book_authors(request: Request, batch_size: int = Query(bulk_services.BULK_BATCH_SIZE, ge=1, le=bulk_services.MAX_BULK_BATCH_SIZE)):
+    """
+    批量按 id 创建 书籍-作者 关系，请求体为 JSON 数组或 CSV(book_id,author_id)
+    书籍和作者必须已存在，不存在的行在 missing 中返回，不会按名称创建节点
+    """
+    rows = await read_rows(request, "book2author")
+    services = bulk_services.BulkImportService(get_driver())
+    try:
+        return await services.import_book_authors(rows, batch_size, on_progress=log_progress("book2author"))
+    finally:
+        # 批量导入不发布图变更事件(失败时也可能已提交部分批次)，内存中的图投影需要重建，图快照缓存需要失效
+        graph_events.touch()
+        graph_projection.invalidate()
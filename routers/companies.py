@@ -1,25 +1,45 @@
 from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel, Field
+from typing import List
 from app.db import get_session
 from app import schemas
 from services import companies_services
+from services.graph_services import graph_node, node_id
+from app.batch import MAX_BATCH_IDS, order_by_ids
+from app.events import graph_events
 
 router = APIRouter(
     prefix="/companies",       # 路由前缀
     tags=["companies"],        # 文档分类标签
 )
 
+class CompanyIds(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+class CompanyBatch(BaseModel):
+    items: List[schemas.CompanyOut]
+    missing: List[str]
+
 # 创建公司
 @router.post("/", response_model=schemas.CompanyOut)
 async def create_company(company: schemas.CompanyCreate, session=Depends(get_session)):
-    existing_company = companies_services.get_company(session, company.company_id)
+    existing_company = await companies_services.get_company(session, company.company_id)
     if existing_company:
         raise HTTPException(status_code=400, detail="Company already exists")
-    return companies_services.create_company(session, company)
+    result = await companies_services.create_company(session, company)
+    graph_events.publish("add", "node", graph_node("Company", result.company_id, result.name))
+    return result
+
+# 批量获取公司，按给定顺序返回并列出不存在的 id
+@router.post("/batch-get", response_model=CompanyBatch)
+async def batch_get_companies(body: CompanyIds, session=Depends(get_session)):
+    found = await companies_services.get_companies(session, body.ids)
+    return order_by_ids(body.ids, found)
 
 # 获取公司
 @router.get("/{company_id}", response_model=schemas.CompanyOut)
 async def get_company(company_id: str, session=Depends(get_session)):
-    result = companies_services.get_company(session, company_id)
+    result = await companies_services.get_company(session, company_id)
     if not result:
         raise HTTPException(status_code=404, detail="Company not found")
     return result
@@ -27,15 +47,17 @@ async def get_company(company_id: str, session=Depends(get_session)):
 # 更新公司
 @router.put("/{company_id}", response_model=schemas.CompanyOut)
 async def update_company(company_id: str, company: schemas.CompanyCreate, session=Depends(get_session)):
-    result = companies_services.update_company(session, company_id, company)
+    result = await companies_services.update_company(session, company_id, company)
     if not result:
         raise HTTPException(status_code=404, detail="Company not found")
+    graph_events.publish("update", "node", graph_node("Company", result.company_id, result.name))
     return result
 
 # 删除公司
 @router.delete("/{company_id}")
 async def delete_company(company_id: str, session=Depends(get_session)):
-    result = companies_services.delete_company(session, company_id)
+    result = await companies_services.delete_company(session, company_id)
     if not result:
         raise HTTPException(status_code=404, detail="Company not found")
+    graph_events.publish("remove", "node", {"id": node_id("Company", company_id)})
     return {"message": "Company deleted"}
\ No newline at end of file
@@ -0,0 +1,220 @@
+import asyncio
+import os
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from services import graph_services, path_services, traversal_services
+from app.cache import LRUCache, ReadThroughCache
+from app.db import get_driver
+from app.events import RESYNC, graph_events
+from app.export import ndjson_response
+from app.layout import force_layout
+from app.projection import graph_projection
+
+router = APIRouter(
+    prefix="/api",       # 路由前缀
+    tags=["graph"],      # 文档分类标签
+)
+
+# 图快照(含布局)按图数据版本和查询参数缓存，图变更后旧版本的快照不再命中
+GRAPH_CACHE_TTL = float(os.getenv("GRAPH_CACHE_TTL", "300"))
+graph_cache = ReadThroughCache(LRUCache(max_entries=64), ttl=GRAPH_CACHE_TTL)
+# SSE 心跳间隔(秒)，避免代理断开空闲连接
+EVENT_HEARTBEAT = float(os.getenv("GRAPH_EVENT_HEARTBEAT", "15"))
+
+
+@router.get("/graph")
+async def get_graph(
+    labels: Optional[str] = Query(None, description="逗号分隔的节点标签，如 Book,Author"),
+    seed: Optional[str] = Query(None, description="种子节点 id，如 Author:1"),
+    depth: int = Query(1, ge=1, le=graph_services.MAX_GRAPH_DEPTH, description="种子节点的跳数"),
+    limit: int = Query(graph_services.DEFAULT_GRAPH_NODES, ge=1, le=graph_services.MAX_GRAPH_NODES),
+    layout: bool = Query(False, description="是否在服务端预先计算力导向布局坐标 x, y"),
+):
+    """
+    图快照，返回 {nodes, links, categories}
+    nodes: {id, name, group, category[, x, y]}，links: {source, target, type}
+    可直接用于 front-web/index.html(D3) 和 front-web/echartsLarget.html(ECharts)
+    """
+    label_list = [l.strip() for l in labels.split(",") if l.strip()] if labels else graph_services.GRAPH_LABELS
+    unknown = [l for l in label_list if l not in graph_services.NODE_KEYS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown labels: {', '.join(unknown)}")
+    try:
+        seed_node = graph_services.parse_node_id(seed) if seed else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def load():
+        services = graph_services.GraphService(get_driver())
+        graph = await services.snapshot(label_list, seed_node, depth, limit)
+        if layout:
+            # 布局是 CPU 密集计算，放到线程中避免阻塞事件循环
+            positions = await asyncio.to_thread(
+                force_layout,
+                [node["id"] for node in graph["nodes"]],
+                [(link["source"], link["target"]) for link in graph["links"]],
+            )
+            for node in graph["nodes"]:
+                node["x"], node["y"] = positions[node["id"]]
+        graph["categories"] = [{"name": label} for label in graph_services.GRAPH_LABELS]
+        return graph
+
+    key = f"graph:{graph_events.version}:{','.join(sorted(label_list))}:{seed}:{depth if seed else 0}:{limit}:{layout}"
+    return await graph_cache.get_or_load(key, load)
+
+
+@router.get("/graph/neighborhood")
+async def get_neighborhood(
+    seed: str = Query(..., description="起点节点 id，如 Author:1"),
+    depth: int = Query(2, ge=1, le=traversal_services.MAX_TRAVERSAL_DEPTH, description="跳数"),
+    fan_out: int = Query(traversal_services.DEFAULT_FAN_OUT, ge=1, le=traversal_services.MAX_FAN_OUT, description="每个节点最多展开的关系数"),
+    limit: int = Query(traversal_services.DEFAULT_TRAVERSAL_NODES, ge=1, le=traversal_services.MAX_TRAVERSAL_NODES, description="最多返回的节点数"),
+):
+    """
+    k 跳邻域，以 NDJSON 流式返回
+    每行为 {"type": "node"|"link"|"summary", ...}，最后一行 summary 列出被截断的节点
+    """
+    try:
+        label, key = graph_services.parse_node_id(seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    services = traversal_services.TraversalService(get_driver())
+    start = await services.find_node(label, key)
+    if start is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return ndjson_response(services.neighborhood(start, depth, fan_out, limit))
+
+
+async def _author_traversal(author_id, traversal, fan_out, limit):
+    services = traversal_services.TraversalService(get_driver())
+    if await services.find_node("Author", str(author_id)) is None:
+        raise HTTPException(status_code=404, detail="Author not found")
+    return ndjson_response(getattr(services, traversal)(author_id, fan_out, limit))
+
+
+@router.get("/graph/authors/{author_id}/coauthors")
+async def get_coauthors(
+    author_id: int,
+    fan_out: int = Query(traversal_services.DEFAULT_FAN_OUT, ge=1, le=traversal_services.MAX_FAN_OUT, description="最多考察的书籍数及每本书的作者数"),
+    limit: int = Query(traversal_services.DEFAULT_TRAVERSAL_RESULTS, ge=1, le=traversal_services.MAX_TRAVERSAL_RESULTS),
+):
+    """合作者(有共同书籍的作者)，按共同书籍数降序，以 NDJSON 流式返回"""
+    return await _author_traversal(author_id, "coauthors", fan_out, limit)
+
+
+@router.get("/graph/authors/{author_id}/same-school")
+async def get_same_school_authors(
+    author_id: int,
+    fan_out: int = Query(traversal_services.DEFAULT_FAN_OUT, ge=1, le=traversal_services.MAX_FAN_OUT, description="最多考察的学校数及每所学校的作者数"),
+    limit: int = Query(traversal_services.DEFAULT_TRAVERSAL_RESULTS, ge=1, le=traversal_services.MAX_TRAVERSAL_RESULTS),
+):
+    """同校作者，按共同学校数降序，以 NDJSON 流式返回"""
+    return await _author_traversal(author_id, "same_school", fan_out, limit)
+
+
+def _parse_node(value):
+    try:
+        return graph_services.parse_node_id(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/graph/path")
+async def get_shortest_path(
+    source: str = Query(..., description="起点节点 id，如 Author:1"),
+    target: str = Query(..., description="终点节点 id，如 Company:c1"),
+    max_depth: int = Query(path_services.DEFAULT_PATH_DEPTH, ge=1, le=path_services.MAX_PATH_DEPTH, description="最大跳数"),
+):
+    """
+    两个节点之间的最短路径(忽略关系方向)
+    返回 {source, target, path, length, served_by}，max_depth 跳内不连通时 path 为 null
+    """
+    services = path_services.PathService(get_driver())
+    result = await services.shortest_path(_parse_node(source), _parse_node(target), max_depth)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    path = result["path"]
+    return {
+        "source": source,
+        "target": target,
+        "path": path,
+        "length": len(path) - 1 if path else None,
+        "served_by": result["served_by"],
+    }
+
+
+@router.get("/graph/component")
+async def get_component(
+    node: str = Query(..., description="节点 id，如 Author:1"),
+    limit: int = Query(path_services.DEFAULT_COMPONENT_NODES, ge=1, le=path_services.MAX_COMPONENT_NODES, description="最多返回的节点 id 数"),
+):
+    """节点所在的连通分量，返回 {node, size, nodes, complete, served_by}"""
+    services = path_services.PathService(get_driver())
+    result = await services.component(_parse_node(node), limit)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return {"node": node, **result}
+
+
+@router.get("/graph/components")
+async def get_components():
+    """全图连通分量统计 {count, singletons, largest}，需要启用内存中的图投影"""
+    services = path_services.PathService(get_driver())
+    result = await services.components()
+    if result is None:
+        raise HTTPException(status_code=503, detail="Graph projection is not available")
+    return result
+
+
+@router.get("/graph/projection")
+async def graph_projection_stats():
+    """内存中的图投影状态：节点数、关系数、构建耗时和内存占用"""
+    return graph_projection.stats()
+
+
+@router.post("/graph/projection/refresh")
+async def refresh_graph_projection():
+    """立即重建内存中的图投影"""
+    if not graph_projection.enabled:
+        raise HTTPException(status_code=409, detail="Graph projection is disabled, set GRAPH_PROJECTION_MAX_AGE")
+    await graph_projection.refresh(get_driver())
+    return graph_projection.stats()
+
+
+async def event_stream():
+    queue = graph_events.subscribe()
+    try:
+        yield b": connected\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=EVENT_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if message is None:
+                yield RESYNC
+                break
+            yield message
+    finally:
+        graph_events.unsubscribe(queue)
+
+
+@router.get("/graph/events")
+async def graph_event_stream():
+    """
+    图变更事件流(Server-Sent Events)
+    每个事件为 event: graph，data 为 {op: add|update|remove, kind: node|link, data}
+    收到 resync 事件或连接断开后，客户端应重新获取 /api/graph 快照
+    """
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/graph/events/stats")
+async def graph_event_stats():
+    """事件广播统计：连接数、投递次数和每个连接的平均投递耗时"""
+    return graph_events.stats()
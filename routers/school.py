@@ -1,8 +1,15 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from services import school_services
-from app.db import driver
+from services.delete_services import CASCADE_MODES
+from services.graph_services import graph_node
+from app.db import get_driver, get_session
+from app.batch import MAX_BATCH_IDS, order_by_ids
+from app.events import graph_events
+from app.fastjson import FastJSONResponse
+from app.export import EXPORT_FETCH_SIZE, MAX_EXPORT_FETCH_SIZE, ndjson_response
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, parse_fields
 
 router = APIRouter(
     prefix="/schools",       # 路由前缀
@@ -23,42 +30,116 @@ class SchoolUpdate(BaseModel):
     title: Optional[str] = None
     author: Optional[str] = None
 
-# 创建一个全局的 SchoolService 实例，使用共享的neo4j驱动
-school_service = school_services.SchoolService(driver)
+class SchoolPatch(SchoolUpdate):
+    id: int
+
+class SchoolPatches(BaseModel):
+    items: List[SchoolPatch] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+class SchoolIds(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+class SchoolBatch(BaseModel):
+    items: List[SchoolResponse]
+    missing: List[int]
+
+def get_school_service(session=Depends(get_session)) -> school_services.SchoolService:
+    """SchoolService 依赖，使用 lifespan 中创建的共享异步驱动和请求级 session"""
+    return school_services.SchoolService(get_driver(), session)
 
 @router.post("/", response_model=SchoolResponse)
-async def create_school(school: School):
+async def create_school(school: School, school_service: school_services.SchoolService = Depends(get_school_service)):
     """创建新学校，自动生成唯一ID"""
-    result = school_service.create_school(school.title, school.author)
+    result = await school_service.create_school(school.title, school.author)
     if result is None:
         raise HTTPException(status_code=400, detail="Failed to create school")
+    graph_events.publish("add", "node", graph_node("School", result["id"], result["title"]))
     return result
 
 @router.get("/", response_model=List[SchoolResponse])
-async def get_all_schools():
-    """获取所有学校"""
-    return school_service.get_all_schools()
+async def get_all_schools(
+    after: int = Query(0, description="上一页最后一所学校的 id"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，如 title"),
+    school_service: school_services.SchoolService = Depends(get_school_service),
+):
+    """按 id 翻页获取学校"""
+    columns = parse_fields(fields, school_services.SCHOOL_FIELDS)
+    schools = await school_service.get_all_schools(after, limit, columns)
+    # 投影已保证字段和类型，直接编码，不经过 response_model 校验
+    return FastJSONResponse(schools)
+
+@router.get("/export")
+async def export_schools(
+    fetch_size: int = Query(EXPORT_FETCH_SIZE, ge=1, le=MAX_EXPORT_FETCH_SIZE, description="每批从 Neo4j 拉取的记录数"),
+):
+    """以 NDJSON 流式导出所有学校"""
+    # 导出在 iter_schools 中打开自己的 session，不使用请求级 session
+    school_service = school_services.SchoolService(get_driver())
+    return ndjson_response(school_service.iter_schools(fetch_size))
+
+@router.post("/batch-get", response_model=SchoolBatch)
+async def batch_get_schools(body: SchoolIds, school_service: school_services.SchoolService = Depends(get_school_service)):
+    """按给定顺序批量获取学校，并返回不存在的 id"""
+    found = await school_service.get_schools(body.ids)
+    return order_by_ids(body.ids, found)
 
 @router.get("/{school_id}", response_model=SchoolResponse)
-async def get_school(school_id: int):
+async def get_school(school_id: int, school_service: school_services.SchoolService = Depends(get_school_service)):
     """根据ID获取学校"""
-    result = school_service.get_school(school_id)
+    result = await school_service.get_school(school_id)
     if result is None:
         raise HTTPException(status_code=404, detail="School not found")
     return result
 
 @router.put("/{school_id}", response_model=SchoolResponse)
-async def update_school(school_id: int, school: SchoolUpdate):
+async def update_school(school_id: int, school: SchoolUpdate, school_service: school_services.SchoolService = Depends(get_school_service)):
     """更新学校信息"""
-    result = school_service.update_school(school_id, school.title, school.author)
+    result = await school_service.update_school(school_id, school.title, school.author)
     if result is None:
         raise HTTPException(status_code=404, detail="School not found")
+    graph_events.publish("update", "node", graph_node("School", result["id"], result["title"]))
+    return result
+
+@router.patch("/", response_model=SchoolBatch)
+async def patch_schools(body: SchoolPatches, school_service: school_services.SchoolService = Depends(get_school_service)):
+    """批量部分更新学校，只修改每行给出的字段，所有行在一个事务中写入，并返回不存在的 id"""
+    updated = await school_service.update_schools({
+        item.id: item.model_dump(exclude={"id"}, exclude_none=True) for item in body.items
+    })
+    for result in updated.values():
+        graph_events.publish("update", "node", graph_node("School", result["id"], result["title"]))
+    return order_by_ids([item.id for item in body.items], updated)
+
+@router.patch("/{school_id}", response_model=SchoolResponse)
+async def patch_school(school_id: int, school: SchoolUpdate, school_service: school_services.SchoolService = Depends(get_school_service)):
+    """部分更新学校，只修改请求中给出的字段"""
+    updated = await school_service.update_schools({school_id: school.model_dump(exclude_none=True)})
+    if school_id not in updated:
+        raise HTTPException(status_code=404, detail="School not found")
+    result = updated[school_id]
+    graph_events.publish("update", "node", graph_node("School", result["id"], result["title"]))
     return result
 
 @router.delete("/{school_id}")
-async def delete_school(school_id: int):
+async def delete_school(
+    school_id: int,
+    cascade: Literal[CASCADE_MODES] = Query("restrict", description="restrict: 有关系时不删除；detach: 同时删除关系；orphans: 同时删除孤立的作者和学校"),
+    school_service: school_services.SchoolService = Depends(get_school_service),
+):
     """删除学校"""
-    result = school_service.delete_school(school_id)
-    if not result:
+    result = await school_service.delete_school(school_id, cascade)
+    if result is None:
         raise HTTPException(status_code=404, detail="School not found")
-    return {"message": f"School {school_id} deleted"}
\ No newline at end of file
+    if not result["deleted"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"School {school_id} has {result['relationships']} relationships, use cascade=detach or cascade=orphans"
+        )
+    for graph_id in result["removed"]:
+        graph_events.publish("remove", "node", {"id": graph_id})
+    return {
+        "message": f"School {school_id} deleted",
+        "relationships_deleted": result["relationships"],
+        "orphans_deleted": result["orphans"],
+    }
\ No newline at end of file
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+from services import search_services
+from app.db import get_driver, get_session
+
+router = APIRouter(
+    prefix="/search",       # 路由前缀
+    tags=["search"],        # 文档分类标签
+)
+
+class SearchHit(BaseModel):
+    id: str # 与 /api/graph 中的节点 id 相同，如 Book:1
+    name: str
+    group: str # 节点标签
+    category: int
+    score: float
+
+class SearchResults(BaseModel):
+    query: str
+    items: List[SearchHit]
+    next_offset: Optional[int] = None # 下一页的 offset，没有更多结果时为空
+
+
+@router.get("", response_model=SearchResults)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description="搜索词"),
+    labels: Optional[str] = Query(None, description="逗号分隔的节点标签，如 Book,Author"),
+    mode: Literal["search", "typeahead"] = Query("search", description="typeahead 只按名称前缀匹配，用于输入联想"),
+    fuzzy: bool = Query(True, description="是否允许拼写错误，typeahead 模式不使用"),
+    offset: int = Query(0, ge=0, le=search_services.MAX_SEARCH_OFFSET),
+    limit: Optional[int] = Query(None, ge=1, le=search_services.MAX_SEARCH_RESULTS, description="返回数量，typeahead 模式最多 20"),
+    session=Depends(get_session),
+):
+    """
+    全文搜索书籍、作者、学校和公司，按相关度排序
+    书籍按 title，作者按 name/occupation/birth_place，学校按 title/name，公司按 name 匹配，最后一个词按前缀匹配
+    """
+    label_list = [l.strip() for l in labels.split(",") if l.strip()] if labels else search_services.SEARCH_LABELS
+    unknown = [l for l in label_list if l not in search_services.SEARCH_INDEXES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown labels: {', '.join(unknown)}")
+    label_list = list(dict.fromkeys(label_list))
+    services = search_services.SearchService(get_driver(), session)
+    if mode == "typeahead":
+        limit = min(limit or search_services.DEFAULT_TYPEAHEAD_RESULTS, search_services.MAX_TYPEAHEAD_RESULTS)
+        result = await services.typeahead(q, label_list, limit)
+    else:
+        result = await services.search(q, label_list, offset, limit or search_services.DEFAULT_SEARCH_RESULTS, fuzzy)
+    return {"query": q, **result}
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal, Optional
 from services import users_services
-from app.db import driver
+from services.delete_services import CASCADE_MODES
+from app.db import get_driver, get_session
+from app.events import graph_events
+from app.fastjson import FastJSONResponse
+from app.export import EXPORT_FETCH_SIZE, MAX_EXPORT_FETCH_SIZE, ndjson_response
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, parse_fields
 
 router = APIRouter(
     prefix="/users",       # 路由前缀
@@ -28,17 +33,32 @@ fake_users_db = [
 ]
 
 @router.get("/", response_model=List[User])
-async def list_users():
-    """获取所有用户"""
-    services = users_services.UserService(driver)
-    users = services.get_all_users()
-    return users
+async def list_users(
+    after: str = Query("", description="上一页最后一个用户的 id，用户按 user_id 的字符串顺序(\"10\" 在 \"2\" 之前)翻页"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，如 name"),
+    session=Depends(get_session),
+):
+    """按 id 翻页获取用户"""
+    columns = parse_fields(fields, users_services.USER_FIELDS)
+    services = users_services.UserService(get_driver(), session)
+    users = await services.get_all_users(after, limit, columns)
+    # 投影已保证字段和类型，直接编码，不经过 response_model 校验
+    return FastJSONResponse(users)
+
+@router.get("/export")
+async def export_users(
+    fetch_size: int = Query(EXPORT_FETCH_SIZE, ge=1, le=MAX_EXPORT_FETCH_SIZE, description="每批从 Neo4j 拉取的记录数"),
+):
+    """以 NDJSON 流式导出所有用户"""
+    services = users_services.UserService(get_driver())
+    return ndjson_response(services.iter_users(fetch_size))
 
 @router.get("/{user_id}", response_model=User)
-async def get_user(user_id: int):
+async def get_user(user_id: int, session=Depends(get_session)):
     """根据 ID 获取用户"""
-    services = users_services.UserService(driver)
-    user_node = services.get_user(str(user_id))  # Convert to string for the service which expects string IDs
+    services = users_services.UserService(get_driver(), session)
+    user_node = await services.get_user(str(user_id))  # Convert to string for the service which expects string IDs
     if not user_node:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -51,10 +71,10 @@ async def get_user(user_id: int):
     return user_dict
 
 @router.post("/", response_model=User)
-async def create_user(user: UserCreate):
+async def create_user(user: UserCreate, session=Depends(get_session)):
     """创建新用户，user_id将自动生成"""
-    services = users_services.UserService(driver)
-    user_node = services.create_user(user.name, 30)  # 不再传递user_id参数
+    services = users_services.UserService(get_driver(), session)
+    user_node = await services.create_user(user.name, 30)  # 不再传递user_id参数
     
     # Convert Neo4j node to User model format
     user_dict = {
@@ -65,10 +85,25 @@ async def create_user(user: UserCreate):
     return user_dict
 
 @router.delete("/{user_id}")
-async def delete_user(user_id: int):
+async def delete_user(
+    user_id: int,
+    cascade: Literal[CASCADE_MODES] = Query("restrict", description="restrict: 有关系时不删除；detach: 同时删除关系；orphans: 同时删除孤立的作者和学校"),
+    session=Depends(get_session),
+):
     """删除用户"""
-    services = users_services.UserService(driver)
-    deleted = services.delete_user(str(user_id))
-    if not deleted:
+    services = users_services.UserService(get_driver(), session)
+    result = await services.delete_user(str(user_id), cascade)
+    if result is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return {"message": f"User {user_id} deleted"}
+    if not result["deleted"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"User {user_id} has {result['relationships']} relationships, use cascade=detach or cascade=orphans"
+        )
+    for graph_id in result["removed"]:
+        graph_events.publish("remove", "node", {"id": graph_id})
+    return {
+        "message": f"User {user_id} deleted",
+        "relationships_deleted": result["relationships"],
+        "orphans_deleted": result["orphans"],
+    }
@@ -1,12 +1,71 @@
+from app.cache import entity_cache
+from app.db import open_session, read, session_scope, stream, write
+from app.export import EXPORT_FETCH_SIZE
+from app.pagination import DEFAULT_PAGE_SIZE, projection
+from app.sequence import IdSequence
+from services.delete_services import delete_node
+
+# Author 的 author_id 分配器，进程内共享
+author_ids = IdSequence("Author", "MATCH (a:Author) RETURN COALESCE(MAX(toInteger(a.author_id)), 0) AS max_id")
+
+# 列表接口可返回的字段及对应的 Cypher 表达式，缺失的属性使用默认值
+AUTHOR_FIELDS = {
+    "id": "toInteger(a.author_id)",
+    "name": "a.name",
+    "email": "coalesce(a.email, toLower(a.name) + '@example.com')",
+    "gender": "coalesce(a.gender, '')",
+    "birth_date": "coalesce(a.birth_date, '')",
+    "birth_place": "coalesce(a.birth_place, '')",
+    "family_members": "coalesce(a.family_members, '')",
+    "imdb_id": "coalesce(a.imdb_id, '')",
+    "occupation": "coalesce(a.occupation, '')",
+    # 由 /analytics/jobs 写回，未运行过分析任务时为 null
+    "degree": "a.degree",
+    "pagerank": "a.pagerank",
+    "community": "a.community",
+}
+
+# 可用于排序的分析指标
+RANK_FIELDS = ("pagerank", "degree")
+# 可以部分更新的字段
+AUTHOR_UPDATE_FIELDS = ("name", "email", "gender", "birth_date", "birth_place", "family_members", "imdb_id", "occupation")
+
+# 部分更新：查询语句固定，只有参数变化，服务端只编译一次执行计划
+UPDATE_AUTHORS = f"""
+UNWIND $rows AS row
+MATCH (a:Author {{author_id: row.key}})
+SET a += row.props
+RETURN row.key AS key, {projection('a', AUTHOR_FIELDS)} AS a
+"""
+
+
+def parse_bibliography_cursor(after):
+    """
+    解析书目翻页游标
+    :param after: 空字符串、书籍 id 或 "title:" 加书名
+    :return: (after_id, after_title)，不对应的一项为 None
+    """
+    if not after:
+        return None, None
+    if after.startswith("title:"):
+        return None, after[len("title:"):]
+    try:
+        return int(after), None
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {after}") from None
+
+
 class AuthorService:
-    def __init__(self, neo4j_driver):
+    def __init__(self, neo4j_driver, session=None):
         """
         初始化作者服务类
         :param neo4j_driver: Neo4j 驱动实例
+        :param session: 请求级 session，为空时每次调用临时打开 session
         """
         self.driver = neo4j_driver
+        self.session = session
 
-    def create_author(self, name, email, gender, birth_date, birth_place, family_members, imdb_id, occupation):
+    async def create_author(self, name, email, gender, birth_date, birth_place, family_members, imdb_id, occupation):
         """
         创建作者节点
         :param name: 作者名
@@ -19,36 +78,39 @@ class AuthorService:
         :param occupation: 职业
         :return: 创建的作者节点
         """
-        with self.driver.session() as session:
-            # 自动生成唯一ID：查询当前最大ID并加1
-            result = session.run(
-                "MATCH (a:Author) RETURN COALESCE(MAX(toInteger(a.author_id)), 0) as max_id"
-            )
-            max_id = result.single()['max_id']
-            new_id = str(max_id + 1)
-            
+        # 自动生成唯一ID：从ID序列中获取
+        new_id = str(await author_ids.next_id(self.driver))
+        async with session_scope(self.driver, self.session) as session:
             # 创建新作者
-            result = session.run(
+            records = await write(
+                session,
+                "author.create",
                 "CREATE (a:Author {author_id: $author_id, name: $name, email: $email, gender: $gender, birth_date: $birth_date, birth_place: $birth_place, family_members: $family_members, imdb_id: $imdb_id, occupation: $occupation}) RETURN a",
                 author_id=new_id, name=name, email=email, gender=gender, birth_date=birth_date, birth_place=birth_place, family_members=family_members, imdb_id=imdb_id, occupation=occupation
             )
-            return result.single()[0]
+        return records[0][0]
 
-    def get_author(self, author_id):
+    async def get_author(self, author_id):
         """
         根据作者 ID 查询作者
         :param author_id: 作者 ID
-        :return: 作者节点，若不存在则返回 None
+        :return: 作者属性字典，若不存在则返回 None
         """
-        with self.driver.session() as session:
-            result = session.run(
+        return await entity_cache.get_or_load(
+            entity_cache.key("Author", author_id), lambda: self._load_author(author_id)
+        )
+
+    async def _load_author(self, author_id):
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(
+                session,
+                "author.get",
                 "MATCH (a:Author {author_id: $author_id}) RETURN a",
                 author_id=author_id
             )
-            record = result.single()
-            return record[0] if record else None
+        return dict(records[0][0]) if records else None
 
-    def update_author(self, author_id, new_name=None, new_email=None, new_gender=None, new_birth_date=None, new_birth_place=None, new_family_members=None, new_imdb_id=None, new_occupation=None):
+    async def update_author(self, author_id, new_name=None, new_email=None, new_gender=None, new_birth_date=None, new_birth_place=None, new_family_members=None, new_imdb_id=None, new_occupation=None):
         """
         修改作者信息
         :param author_id: 作者 ID
@@ -60,82 +122,165 @@ class AuthorService:
         :param new_family_members: 新家庭成员
         :param new_imdb_id: 新IMDB ID
         :param new_occupation: 新职业
-        :return: 更新后的作者节点，若作者不存在则返回 None
-        """
-        with self.driver.session() as session:
-            query = "MATCH (a:Author {author_id: $author_id})"
-            set_clauses = []
-            params = {"author_id": author_id}
-            
-            if new_name is not None:
-                set_clauses.append("a.name = $new_name")
-                params["new_name"] = new_name
-            if new_email is not None:
-                set_clauses.append("a.email = $new_email")
-                params["new_email"] = new_email
-            if new_gender is not None:
-                set_clauses.append("a.gender = $new_gender")
-                params["new_gender"] = new_gender
-            if new_birth_date is not None:
-                set_clauses.append("a.birth_date = $new_birth_date")
-                params["new_birth_date"] = new_birth_date
-            if new_birth_place is not None:
-                set_clauses.append("a.birth_place = $new_birth_place")
-                params["new_birth_place"] = new_birth_place
-            if new_family_members is not None:
-                set_clauses.append("a.family_members = $new_family_members")
-                params["new_family_members"] = new_family_members
-            if new_imdb_id is not None:
-                set_clauses.append("a.imdb_id = $new_imdb_id")
-                params["new_imdb_id"] = new_imdb_id
-            if new_occupation is not None:
-                set_clauses.append("a.occupation = $new_occupation")
-                params["new_occupation"] = new_occupation
-            
-            if set_clauses:
-                query += " SET " + ", ".join(set_clauses)
-                query += " RETURN a"
-                result = session.run(query, **params)
-                record = result.single()
-                return record[0] if record else None
-            return None
-
-    def delete_author(self, author_id):
-        """
-        根据作者 ID 删除作者
-        :param author_id: 作者 ID
-        :return: 是否删除成功
+        :return: 更新后的作者信息，若作者不存在则返回 None
         """
-        with self.driver.session() as session:
-            result = session.run(
-                "MATCH (a:Author {author_id: $author_id}) DELETE a RETURN count(a) as deleted_count",
-                author_id=author_id
+        props = {
+            "name": new_name,
+            "email": new_email,
+            "gender": new_gender,
+            "birth_date": new_birth_date,
+            "birth_place": new_birth_place,
+            "family_members": new_family_members,
+            "imdb_id": new_imdb_id,
+            "occupation": new_occupation,
+        }
+        updated = await self.update_authors({author_id: {field: value for field, value in props.items() if value is not None}})
+        return updated.get(author_id)
+
+    async def update_authors(self, updates):
+        """
+        批量部分更新作者，所有行使用同一条 UNWIND 查询在一个事务中写入
+        :param updates: {作者 ID: {字段: 新值}}，只更新给出的字段，其他字段会被忽略
+        :return: {作者 ID: 更新后的作者信息}，不存在的作者不在结果中
+        """
+        if not updates:
+            return {}
+        rows = [
+            {"key": key, "props": {field: value for field, value in props.items() if field in AUTHOR_UPDATE_FIELDS}}
+            for key, props in updates.items()
+        ]
+        async with session_scope(self.driver, self.session) as session:
+            records = await write(session, "author.update", UPDATE_AUTHORS, rows=rows)
+        await entity_cache.invalidate(*(entity_cache.key("Author", key) for key in updates))
+        return {record["key"]: record["a"] for record in records}
+
+    async def delete_author(self, author_id, cascade="restrict"):
+        """
+        删除作者，见 services.delete_services.delete_node
+        :param author_id: 作者ID
+        :param cascade: 删除模式 restrict/detach/orphans
+        :return: 若作者不存在返回 None，否则返回删除结果
+        """
+        return await delete_node(self.driver, self.session, "Author", "author_id", author_id, cascade)
+
+    async def get_authors(self, author_ids):
+        """
+        用一次 UNWIND 查询批量获取作者
+        :param author_ids: 作者 ID 列表
+        :return: {author_id: 作者信息}，不存在的 ID 不在结果中
+        """
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(
+                session,
+                "author.batch_get",
+                f"UNWIND $ids AS key MATCH (a:Author {{author_id: key}}) RETURN key, {projection('a', AUTHOR_FIELDS)} AS a",
+                ids=author_ids
             )
-            return result.single()[0] == 0
-    
-    def get_all_authors(self):
+        return {record["key"]: record["a"] for record in records}
+
+    async def get_all_authors(self, after="", limit=DEFAULT_PAGE_SIZE, fields=None):
         """
-        获取所有作者
+        按 author_id 翻页获取作者
+        author_id 以字符串存储，翻页顺序与 author_id 索引一致（字符串序）
+        :param after: 只返回 author_id 按字符串顺序排在该值之后的作者，传入上一页最后一条的 id(字符串)，空字符串表示第一页
+        :param limit: 每页数量
+        :param fields: 需要返回的字段，默认返回全部字段
         :return: 作者列表
         """
-        with self.driver.session() as session:
-            result = session.run(
-                "MATCH (a:Author) RETURN a"
+        query = (
+            "MATCH (a:Author) WHERE a.author_id > $after "
+            "WITH a ORDER BY a.author_id LIMIT $limit "
+            f"RETURN {projection('a', AUTHOR_FIELDS, fields)} AS a"
+        )
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(session, "author.list", query, after=str(after), limit=limit)
+        return [record["a"] for record in records]
+
+    async def get_top_authors(self, by="pagerank", limit=DEFAULT_PAGE_SIZE, fields=None):
+        """
+        按分析指标降序获取作者，没有该指标的作者不返回
+        通过 book2author 按名称创建的作者没有 author_id，分析任务也会写入其指标，这里同样不返回
+        :param by: RANK_FIELDS 中的指标
+        :param limit: 返回数量
+        :param fields: 需要返回的字段，默认返回全部字段
+        :return: 作者列表
+        """
+        query = (
+            f"MATCH (a:Author) WHERE a.{by} IS NOT NULL AND a.author_id IS NOT NULL "
+            f"WITH a ORDER BY a.{by} DESC, a.author_id LIMIT $limit "
+            f"RETURN {projection('a', AUTHOR_FIELDS, fields)} AS a"
+        )
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(session, f"author.top_{by}", query, limit=limit)
+        return [record["a"] for record in records]
+
+    async def find_authors_by_name(self, name, limit=2):
+        """
+        按名称查找作者，名称没有唯一约束，可能有多个同名作者
+        :param name: 作者名
+        :param limit: 最多返回的作者数
+        :return: [{"element_id", "author_id"}]，通过 book2author 创建的作者没有 author_id
+        """
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(
+                session,
+                "author.by_name",
+                "MATCH (a:Author {name: $name}) RETURN elementId(a) AS element_id, a.author_id AS author_id LIMIT $limit",
+                name=name, limit=limit
             )
-            authors = []
-            for record in result:
-                author_node = record["a"]
-                # Convert Neo4j node to dictionary format
-                author_dict = {
-                "id": int(author_node["author_id"]),  # Convert to int to match the Author model
-                "name": author_node["name"],
-                "email": author_node.get("email", f"{author_node['name'].lower()}@example.com"),
-                "gender": author_node.get("gender", ""),
-                "birth_date": author_node.get("birth_date", ""),
-                "birth_place": author_node.get("birth_place", ""),
-                "family_members": author_node.get("family_members", ""),
-                "imdb_id": author_node.get("imdb_id", ""),
-                "occupation": author_node.get("occupation", "")
-            }
-                authors.append(author_dict)
-            return authors
+        return [record.data() for record in records]
+
+    async def get_bibliography(self, author_id=None, element_id=None, after="", limit=DEFAULT_PAGE_SIZE):
+        """
+        分页获取作者的书籍
+        有 id 的书籍按 id 排在前面，通过 book2author 按书名创建的书籍没有 id，按书名排在后面
+        排序和 LIMIT 在子查询中完成，只保留一页书籍，不对作者的全部书籍做完整排序
+        book_count 在创建和删除 WRITTEN_BY 关系时维护，旧数据没有该属性时按关系数计算
+        :param author_id: 作者 ID，与 element_id 二选一
+        :param element_id: 作者节点的 elementId
+        :param after: 上一页返回的 next_after
+        :param limit: 每页数量
+        :return: {"author_id", "name", "book_count", "books": [...]}，作者不存在返回 None
+        """
+        after_id, after_title = parse_bibliography_cursor(after)
+        if author_id is not None:
+            match = "MATCH (a:Author {author_id: $key})"
+            key = author_id
+        else:
+            match = "MATCH (a:Author) WHERE elementId(a) = $key"
+            key = element_id
+        query = (
+            f"{match} "
+            "CALL { "
+            "WITH a "
+            "MATCH (a)<-[:WRITTEN_BY]-(b:Book) "
+            "WHERE CASE "
+            "WHEN $after_title IS NOT NULL THEN b.id IS NULL AND b.title > $after_title "
+            "WHEN $after_id IS NOT NULL THEN b.id > $after_id OR b.id IS NULL "
+            "ELSE true END "
+            # 升序时 null 排在最后：先按 id，再按书名
+            "WITH b ORDER BY b.id, b.title LIMIT $limit "
+            "RETURN collect(b {.id, .title, .author, "
+            "cursor: coalesce(toString(b.id), 'title:' + b.title)}) AS books "
+            "} "
+            "RETURN toInteger(a.author_id) AS author_id, a.name AS name, "
+            "coalesce(a.book_count, COUNT { (a)<-[:WRITTEN_BY]-() }) AS book_count, books"
+        )
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(
+                session, "author.bibliography", query,
+                key=key, after_id=after_id, after_title=after_title, limit=limit
+            )
+        return records[0].data() if records else None
+
+    async def iter_authors(self, fetch_size=EXPORT_FETCH_SIZE):
+        """
+        逐条迭代所有作者，用于流式导出
+        记录按 fetch_size 分批从服务端拉取，内存占用与作者总数无关
+        流式结果无法在托管事务中重放，这里使用自动提交事务和独立的 session
+        :param fetch_size: 每批拉取的记录数
+        :return: 作者信息的异步迭代器
+        """
+        async with open_session(self.driver, fetch_size=fetch_size) as session:
+            async for record in stream(session, "author.export", f"MATCH (a:Author) RETURN {projection('a', AUTHOR_FIELDS)} AS a"):
+                yield record["a"]
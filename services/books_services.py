@@ -1,34 +1,56 @@
+from app.cache import entity_cache
+from app.db import open_session, read, session_scope, stream, write
+from app.export import EXPORT_FETCH_SIZE
+from app.pagination import DEFAULT_PAGE_SIZE, projection
+from app.sequence import IdSequence
+from services.delete_services import delete_node
+
+# Book 的 id 分配器，进程内共享
+book_ids = IdSequence("Book", "MATCH (b:Book) RETURN COALESCE(MAX(b.id), 0) AS max_id")
+
+# 列表接口可返回的字段及对应的 Cypher 表达式
+BOOK_FIELDS = {"id": "b.id", "title": "b.title", "author": "b.author"}
+# 可以部分更新的字段
+BOOK_UPDATE_FIELDS = ("title", "author")
+
+# 部分更新：查询语句固定，只有参数变化，服务端只编译一次执行计划
+UPDATE_BOOKS = f"""
+UNWIND $rows AS row
+MATCH (b:Book {{id: row.key}})
+SET b += row.props
+RETURN row.key AS key, {projection('b', BOOK_FIELDS)} AS b
+"""
+
+
 class BookService:
-    def __init__(self, neo4j_driver):
+    def __init__(self, neo4j_driver, session=None):
         """初始化用户服务类，使用已创建的neo4j驱动
         :param neo4j_driver: Neo4j 驱动实例
+        :param session: 请求级 session，为空时每次调用临时打开 session
         """
         self.driver = neo4j_driver
+        self.session = session
 
-    def create_book(self, title, author):
+    async def create_book(self, title, author):
         """
         创建书籍，自动生成唯一的book_id
         :param title: 书籍标题
         :param author: 书籍作者
         :return: 新创建的书籍信息
         """
-        with self.driver.session() as session:
-            # 生成唯一的book_id (通过获取当前最大ID并加1)
-            result = session.run("MATCH (b:Book) RETURN COALESCE(MAX(b.id), 0) AS max_id")
-            max_id = result.single()['max_id']
-            book_id = max_id + 1
-            
+        # 从ID序列中获取唯一的book_id
+        book_id = await book_ids.next_id(self.driver)
+        async with session_scope(self.driver, self.session) as session:
             # 创建新书籍
-            result = session.run(
+            records = await write(
+                session,
+                "book.create",
                 "CREATE (b:Book {id: $book_id, title: $title, author: $author}) RETURN b",
                 book_id=book_id, title=title, author=author
             )
-            record = result.single()
-            if record:
-                return dict(record["b"])
-            return None
+        return dict(records[0]["b"]) if records else None
 
-    def update_book(self, book_id, new_title=None, new_author=None):
+    async def update_book(self, book_id, new_title=None, new_author=None):
         """
         更新书籍信息
         :param book_id: 书籍ID
@@ -36,88 +58,136 @@ class BookService:
         :param new_author: 新的书籍作者
         :return: 更新后的书籍信息，若书籍不存在则返回 None
         """
-        with self.driver.session() as session:
-            # 构建Cypher语句和参数
-            query = "MATCH (b:Book {id: $book_id})"
-            set_clauses = []
-            params = {"book_id": book_id}
-
-            if new_title:
-                set_clauses.append("b.title = $new_title")
-                params["new_title"] = new_title
-            if new_author:
-                set_clauses.append("b.author = $new_author")
-                params["new_author"] = new_author
-
-            if not set_clauses:
-                # 如果没有更新内容，直接查询书籍
-                result = session.run("MATCH (b:Book {id: $book_id}) RETURN b", book_id=book_id)
-                record = result.single()
-                return dict(record["b"]) if record else None
-
-            query += " SET " + ", ".join(set_clauses) + " RETURN b"
-            result = session.run(query, params)
-            record = result.single()
-            return dict(record["b"]) if record else None
-
-    def delete_book(self, book_id):
-        """
-        删除书籍
+        props = {}
+        if new_title:
+            props["title"] = new_title
+        if new_author:
+            props["author"] = new_author
+
+        if not props:
+            # 如果没有更新内容，直接查询书籍
+            return await self._load_book(book_id)
+
+        updated = await self.update_books({book_id: props})
+        return updated.get(book_id)
+
+    async def update_books(self, updates):
+        """
+        批量部分更新书籍，所有行使用同一条 UNWIND 查询在一个事务中写入
+        :param updates: {书籍ID: {字段: 新值}}，只更新给出的字段，其他字段会被忽略
+        :return: {书籍ID: 更新后的书籍信息}，不存在的书籍不在结果中
+        """
+        if not updates:
+            return {}
+        rows = [
+            {"key": key, "props": {field: value for field, value in props.items() if field in BOOK_UPDATE_FIELDS}}
+            for key, props in updates.items()
+        ]
+        async with session_scope(self.driver, self.session) as session:
+            records = await write(session, "book.update", UPDATE_BOOKS, rows=rows)
+        await entity_cache.invalidate(*(entity_cache.key("Book", key) for key in updates))
+        return {record["key"]: record["b"] for record in records}
+
+    async def delete_book(self, book_id, cascade="restrict"):
+        """
+        删除书籍，见 services.delete_services.delete_node
         :param book_id: 书籍ID
-        :return: 若删除成功返回 True，若书籍不存在返回 False
+        :param cascade: 删除模式 restrict/detach/orphans
+        :return: 若书籍不存在返回 None，否则返回删除结果
         """
-        with self.driver.session() as session:
-            result = session.run(
-                "MATCH (b:Book {id: $book_id}) DELETE b RETURN count(b) as deleted_count",
-                book_id=book_id
-            )
-            record = result.single()
-            return record["deleted_count"] == 0
+        return await delete_node(self.driver, self.session, "Book", "id", book_id, cascade)
 
-    def get_book(self, book_id):
+    async def get_book(self, book_id):
         """
         获取单个书籍信息
         :param book_id: 书籍ID
         :return: 书籍信息，若书籍不存在则返回 None
         """
-        with self.driver.session() as session:
-            result = session.run("MATCH (b:Book {id: $book_id}) RETURN b", book_id=book_id)
-            record = result.single()
-            return dict(record["b"]) if record else None
+        return await entity_cache.get_or_load(
+            entity_cache.key("Book", book_id), lambda: self._load_book(book_id)
+        )
+
+    async def _load_book(self, book_id):
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(session, "book.get", "MATCH (b:Book {id: $book_id}) RETURN b", book_id=book_id)
+        return dict(records[0]["b"]) if records else None
+
+    async def get_books(self, book_ids):
+        """
+        用一次 UNWIND 查询批量获取书籍
+        :param book_ids: 书籍 ID 列表
+        :return: {id: 书籍信息}，不存在的 ID 不在结果中
+        """
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(
+                session,
+                "book.batch_get",
+                f"UNWIND $ids AS key MATCH (b:Book {{id: key}}) RETURN key, {projection('b', BOOK_FIELDS)} AS b",
+                ids=book_ids
+            )
+        return {record["key"]: record["b"] for record in records}
+
+    async def get_all_books(self, after=0, limit=DEFAULT_PAGE_SIZE, fields=None):
+        """
+        按 id 翻页获取书籍信息
+        :param after: 只返回 id 大于该值的书籍，传入上一页最后一条的 id
+        :param limit: 每页数量
+        :param fields: 需要返回的字段，默认返回全部字段
+        :return: 书籍信息列表，按 id 升序
+        """
+        query = (
+            "MATCH (b:Book) WHERE b.id > $after "
+            "WITH b ORDER BY b.id LIMIT $limit "
+            f"RETURN {projection('b', BOOK_FIELDS, fields)} AS b"
+        )
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(session, "book.list", query, after=after, limit=limit)
+        return [record["b"] for record in records]
 
-    def get_all_books(self):
+    async def iter_books(self, fetch_size=EXPORT_FETCH_SIZE):
         """
-        获取所有书籍信息
-        :return: 包含所有书籍信息的列表
+        逐条迭代所有书籍，用于流式导出
+        记录按 fetch_size 分批从服务端拉取，内存占用与书籍总数无关
+        流式结果无法在托管事务中重放，这里使用自动提交事务和独立的 session
+        :param fetch_size: 每批拉取的记录数
+        :return: 书籍信息的异步迭代器
         """
-        with self.driver.session() as session:
-            result = session.run("MATCH (b:Book) RETURN b")
-            return [dict(record["b"]) for record in result]
+        async with open_session(self.driver, fetch_size=fetch_size) as session:
+            async for record in stream(session, "book.export", f"MATCH (b:Book) RETURN {projection('b', BOOK_FIELDS)} AS b"):
+                yield record["b"]
 
 
 if __name__ == "__main__":
-    # 使用示例，需要根据实际情况修改URI、用户名和密码
-    book_service = BookService("bolt://localhost:7687", "neo4j", "password")
-
-    try:
-        # 创建书籍
-        new_book = book_service.create_book(1, "Python编程", "Guido van Rossum")
-        print("创建的书籍:", new_book)
-
-        # 查询书籍
-        book = book_service.get_book(1)
-        print("查询的书籍:", book)
-
-        # 更新书籍
-        updated_book = book_service.update_book(1, new_title="Python编程：从入门到实践")
-        print("更新后的书籍:", updated_book)
-
-        # 查询所有书籍
-        all_books = book_service.get_all_books()
-        print("所有书籍:", all_books)
-
-        # 删除书籍
-        deleted = book_service.delete_book(1)
-        print("删除结果:", "成功" if deleted else "失败")
-    finally:
-        book_service.close()
+    import asyncio
+    from neo4j import AsyncGraphDatabase
+
+    async def main():
+        # 使用示例，需要根据实际情况修改URI、用户名和密码
+        driver = AsyncGraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "password"))
+        book_service = BookService(driver)
+
+        try:
+            # 创建书籍
+            new_book = await book_service.create_book("Python编程", "Guido van Rossum")
+            print("创建的书籍:", new_book)
+            book_id = new_book["id"]
+
+            # 查询书籍
+            book = await book_service.get_book(book_id)
+            print("查询的书籍:", book)
+
+            # 更新书籍
+            updated_book = await book_service.update_book(book_id, new_title="Python编程：从入门到实践")
+            print("更新后的书籍:", updated_book)
+
+            # 查询所有书籍
+            all_books = await book_service.get_all_books()
+            print("所有书籍:", all_books)
+
+            # 删除书籍
+            deleted = await book_service.delete_book(book_id)
+            print("删除结果:", "成功" if deleted and deleted["deleted"] else "失败")
+        finally:
+            await driver.close()
+
+    asyncio.run(main())
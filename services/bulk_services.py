@@ -0,0 +1,174 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import time
+from app.db import open_session, write
+
+from services.author_services import author_ids
+from services.books_services import book_ids
+
+logger = logging.getLogger(__name__)
+
+# 每个事务写入的行数
+BULK_BATCH_SIZE = int(os.getenv("NEO4J_BULK_BATCH_SIZE", "1000"))
+MAX_BULK_BATCH_SIZE = 50000
+# 一次请求最多导入的行数
+MAX_BULK_ROWS = int(os.getenv("NEO4J_BULK_MAX_ROWS", "100000"))
+# execute_write 的重试时间用尽后，批次因瞬时错误或连接中断失败时的额外重试次数
+BULK_RETRIES = int(os.getenv("NEO4J_BULK_RETRIES", "2"))
+
+# id 在写入前已分配，按 id MERGE：提交成功但确认丢失后重试同一批次不会重复创建，也不会违反唯一约束
+IMPORT_BOOKS = """
+UNWIND $rows AS row
+MERGE (b:Book {id: row.id})
+SET b += row
+"""
+
+IMPORT_AUTHORS = """
+UNWIND $rows AS row
+MERGE (a:Author {author_id: row.author_id})
+SET a += row
+"""
+
+# 按 id 建立 书籍-作者 关系，与 /book2author/links 相同：两端都用唯一约束的索引查找，不存在的一端不会被创建
+# 返回两端都存在的行，本批次的关系全部建立后，再重新计算涉及作者的 book_count
+IMPORT_BOOK_AUTHORS = """
+UNWIND $rows AS row
+MATCH (b:Book {id: row.book_id})
+MATCH (a:Author {author_id: row.author_id})
+MERGE (b)-[:WRITTEN_BY]->(a)
+WITH collect({book_id: row.book_id, author_id: row.author_id}) AS linked, collect(DISTINCT a) AS authors
+CALL {
+    WITH authors
+    UNWIND authors AS a
+    SET a.book_count = COUNT { (a)<-[:WRITTEN_BY]-() }
+}
+RETURN linked
+"""
+
+
+def parse_rows(data, content_type=None):
+    """
+    解析批量导入的数据
+    :param data: JSON 数组或带表头的 CSV 文本
+    :param content_type: 请求的 Content-Type，包含 csv 时按 CSV 解析，否则按 JSON 解析
+    :return: 行字典列表
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    if content_type and "csv" in content_type:
+        return list(csv.DictReader(io.StringIO(data)))
+    rows = json.loads(data)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of rows")
+    return rows
+
+
+class BulkImportService:
+    def __init__(self, neo4j_driver):
+        """
+        初始化批量导入服务类
+        :param neo4j_driver: Neo4j 驱动实例
+        """
+        self.driver = neo4j_driver
+
+    async def import_books(self, rows, batch_size=BULK_BATCH_SIZE, retries=BULK_RETRIES, on_progress=None):
+        """
+        批量创建书籍，id 从ID序列中批量分配
+        :param rows: 书籍列表，每行包含 title, author
+        :return: 导入统计
+        """
+        ids = await book_ids.next_ids(self.driver, len(rows))
+        rows = [{"id": book_id, "title": row["title"], "author": row["author"]} for book_id, row in zip(ids, rows)]
+        return await self._import("bulk.books", IMPORT_BOOKS, rows, batch_size, retries, on_progress)
+
+    async def import_authors(self, rows, batch_size=BULK_BATCH_SIZE, retries=BULK_RETRIES, on_progress=None):
+        """
+        批量创建作者，author_id 从ID序列中批量分配
+        :param rows: 作者列表，字段与 POST /authors/ 相同
+        :return: 导入统计
+        """
+        ids = await author_ids.next_ids(self.driver, len(rows))
+        rows = [{**row, "author_id": str(author_id)} for author_id, row in zip(ids, rows)]
+        return await self._import("bulk.authors", IMPORT_AUTHORS, rows, batch_size, retries, on_progress)
+
+    async def import_book_authors(self, rows, batch_size=BULK_BATCH_SIZE, retries=BULK_RETRIES, on_progress=None):
+        """
+        批量按 id 创建 书籍-作者 关系，书籍和作者必须已存在
+        :param rows: 关系列表，每行包含 book_id, author_id
+        :return: 导入统计，missing 为书籍或作者不存在的行
+        """
+        rows = [{"book_id": int(row["book_id"]), "author_id": str(row["author_id"])} for row in rows]
+        stats = await self._import(
+            "bulk.book_authors", IMPORT_BOOK_AUTHORS, rows, batch_size, retries, on_progress, self._missing_links
+        )
+        stats["missing"] = [{"book_id": row["book_id"], "author_id": int(row["author_id"])} for row in stats["missing"]]
+        return stats
+
+    @staticmethod
+    def _missing_links(batch, records):
+        """批次中书籍或作者不存在的行"""
+        linked = {(link["book_id"], link["author_id"]) for link in records[0]["linked"]}
+        return [row for row in batch if (row["book_id"], row["author_id"]) not in linked]
+
+    async def _import(self, name, query, rows, batch_size, retries, on_progress, find_missing=None):
+        """
+        按批次执行 UNWIND 写入，每个批次一个事务
+        :param name: 查询名称，用于指标
+        :param on_progress: 每个批次结束后调用 on_progress(已处理行数, 总行数)
+        :param find_missing: find_missing(批次, 查询结果) 返回批次中没有写入的行，为空时批次的行全部计为已导入
+        :return: {"rows", "imported", "batches", "failed_batches", "elapsed_s", "rows_per_s"}，
+                 指定 find_missing 时还有 missing
+        """
+        start = time.perf_counter()
+        imported = 0
+        failed_batches = []
+        missing = []
+        batches = range(0, len(rows), batch_size)
+        async with open_session(self.driver) as session:
+            for index, offset in enumerate(batches):
+                batch = rows[offset:offset + batch_size]
+                records = await self._write_batch(session, name, query, batch, retries)
+                if records is None:
+                    failed_batches.append({"batch": index, "offset": offset, "rows": len(batch)})
+                else:
+                    skipped = find_missing(batch, records) if find_missing else []
+                    missing += skipped
+                    imported += len(batch) - len(skipped)
+                if on_progress:
+                    on_progress(offset + len(batch), len(rows))
+        elapsed = time.perf_counter() - start
+        stats = {
+            "rows": len(rows),
+            "imported": imported,
+            "batches": len(batches),
+            "failed_batches": failed_batches,
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_s": round(imported / elapsed, 1) if elapsed else 0.0,
+        }
+        if find_missing:
+            stats["missing"] = missing
+        return stats
+
+    async def _write_batch(self, session, name, query, batch, retries):
+        """
+        写入一个批次，返回查询结果，失败时返回 None
+        只有瞬时错误和连接中断会退避重试，批次语句都是幂等的 MERGE，重试不会重复写入；
+        约束冲突、语法错误等其他错误重试也不会成功，直接记为失败
+        """
+        from neo4j.exceptions import DriverError, Neo4jError, ServiceUnavailable, SessionExpired, TransientError
+
+        for attempt in range(retries + 1):
+            try:
+                return await write(session, name, query, rows=batch)
+            except (TransientError, ServiceUnavailable, SessionExpired) as e:
+                logger.warning("Bulk batch of %d rows failed (attempt %d/%d): %s", len(batch), attempt + 1, retries + 1, e)
+                if attempt < retries:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+            except (Neo4jError, DriverError) as e:
+                logger.warning("Bulk batch of %d rows failed: %s", len(batch), e)
+                return None
+        return None
@@ -1,40 +1,61 @@
-from neo4j import Session
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from app.cache import entity_cache
+from app.db import read, write
 from app.schemas import CompanyCreate, CompanyOut
 
-def create_company(session: Session, company: CompanyCreate) -> CompanyOut:
+if TYPE_CHECKING:
+    from neo4j import AsyncSession
+
+async def create_company(session: AsyncSession, company: CompanyCreate) -> CompanyOut:
     query = """
     MERGE (c:Company {company_id:$company_id})
     ON CREATE SET c.name=$name
     ON MATCH  SET c.name=$name
     RETURN c.company_id AS company_id, c.name AS name
     """
-    result = session.run(query, company_id=company.company_id, name=company.name)
-    record = result.single()
+    record = (await write(session, "company.create", query, company_id=company.company_id, name=company.name))[0]
+    await entity_cache.invalidate(entity_cache.key("Company", company.company_id))
     return CompanyOut(**record.data())
 
-def get_company(session: Session, company_id: str) -> CompanyOut | None:
+async def get_company(session: AsyncSession, company_id: str) -> CompanyOut | None:
     query = """
     MATCH (c:Company {company_id:$company_id})
     RETURN c.company_id AS company_id, c.name AS name
     """
-    record = session.run(query, company_id=company_id).single()
-    return CompanyOut(**record.data()) if record else None
+    async def load():
+        records = await read(session, "company.get", query, company_id=company_id)
+        return records[0].data() if records else None
 
-def update_company(session: Session, company_id: str, company: CompanyCreate) -> CompanyOut | None:
+    data = await entity_cache.get_or_load(entity_cache.key("Company", company_id), load)
+    return CompanyOut(**data) if data else None
+
+async def update_company(session: AsyncSession, company_id: str, company: CompanyCreate) -> CompanyOut | None:
     query = """
     MATCH (c:Company {company_id:$company_id})
     SET c.name=$name
     RETURN c.company_id AS company_id, c.name AS name
     """
-    record = session.run(query, company_id=company_id, name=company.name).single()
-    return CompanyOut(**record.data()) if record else None
+    records = await write(session, "company.update", query, company_id=company_id, name=company.name)
+    await entity_cache.invalidate(entity_cache.key("Company", company_id))
+    return CompanyOut(**records[0].data()) if records else None
 
-def delete_company(session: Session, company_id: str) -> bool:
+async def delete_company(session: AsyncSession, company_id: str) -> bool:
     query = """
     MATCH (c:Company {company_id:$company_id})
     DELETE c
     RETURN count(c) > 0 AS deleted
     """
-    result = session.run(query, company_id=company_id)
-    record = result.single()
-    return record["deleted"] if record else False
+    records = await write(session, "company.delete", query, company_id=company_id)
+    await entity_cache.invalidate(entity_cache.key("Company", company_id))
+    return records[0]["deleted"] if records else False
+
+async def get_companies(session: AsyncSession, company_ids: list[str]) -> dict[str, CompanyOut]:
+    query = """
+    UNWIND $ids AS key
+    MATCH (c:Company {company_id:key})
+    RETURN c.company_id AS company_id, c.name AS name
+    """
+    records = await read(session, "company.batch_get", query, ids=company_ids)
+    return {record["company_id"]: CompanyOut(**record.data()) for record in records}
@@ -0,0 +1,138 @@
+import os
+
+from app.cache import entity_cache
+from app.db import auto_commit, read, session_scope, write
+from services.graph_services import NODE_KEYS, node_id
+
+# 删除模式：
+# restrict 节点还有关系时不删除
+# detach   先分批删除节点的所有关系，再删除节点
+# orphans  同 detach，并删除因此不再有任何关系的相邻作者和学校
+CASCADE_MODES = ("restrict", "detach", "orphans")
+# 只有这些标签的相邻节点会作为孤立节点删除
+ORPHAN_LABELS = ("Author", "School")
+# 分批删除时每个事务删除的关系或节点数
+DELETE_BATCH_SIZE = int(os.getenv("NEO4J_DELETE_BATCH_SIZE", "10000"))
+
+# 节点的关系数，以及相邻的作者和学校；orphan 表示该相邻节点的关系都连向被删除的节点
+# 作者、学校的关系数量有限，书籍不作为相邻节点返回，删除有大量书籍的作者时结果也很小
+INSPECT_NODE = """
+MATCH (n:{label} {{{key_field}: $key}})
+RETURN COUNT {{ (n)--() }} AS relationships,
+       [(n)--(m) WHERE m:Author OR m:School | m {{
+           element_id: elementId(m),
+           label: [l IN labels(m) WHERE l IN $orphan_labels][0],
+           key: coalesce(m.author_id, m.id),
+           orphan: NOT EXISTS {{ (m)--(x) WHERE x <> n }}
+       }}] AS neighbors
+"""
+
+# 分批删除节点的关系，每批在单独的事务中提交
+DETACH_RELATIONSHIPS = """
+MATCH (:{label} {{{key_field}: $key}})-[r]-()
+CALL {{ WITH r DELETE r }} IN TRANSACTIONS OF $batch_size ROWS
+"""
+
+# 节点没有关系后再删除，期间新建的关系会使删除失败而不是被悄悄删掉
+DELETE_NODE = """
+MATCH (n:{label} {{{key_field}: $key}})
+DELETE n
+RETURN count(n) AS deleted
+"""
+
+# 分批删除仍然没有任何关系的候选孤立节点，返回实际删除的节点
+DELETE_ORPHANS = """
+UNWIND $element_ids AS element_id
+MATCH (m) WHERE elementId(m) = element_id AND NOT EXISTS { (m)--() }
+WITH m, element_id
+CALL { WITH m DELETE m } IN TRANSACTIONS OF $batch_size ROWS
+RETURN element_id
+"""
+
+# 重新计算受影响作者的 book_count
+RECOUNT_BOOKS = """
+UNWIND $element_ids AS element_id
+MATCH (a:Author) WHERE elementId(a) = element_id
+SET a.book_count = COUNT { (a)<-[:WRITTEN_BY]-() }
+"""
+
+
+async def delete_node(driver, session, label, key_field, key, cascade="restrict"):
+    """
+    按删除模式删除一个节点
+    大量关系和孤立节点用 CALL { ... } IN TRANSACTIONS 分批删除，每批一个事务，
+    中途失败时已提交的批次不会回滚，重新执行同一个删除可以继续完成
+    :param driver: Neo4j 驱动实例
+    :param session: 请求级 session，为空时临时打开 session
+    :param label: 节点标签
+    :param key_field: 主键属性名
+    :param key: 主键值
+    :param cascade: 删除模式，见 CASCADE_MODES
+    :return: 节点不存在时返回 None；否则返回
+             {"deleted", "relationships", "orphans", "removed"}，
+             restrict 模式下节点还有关系时 deleted 为 False，relationships 为关系数；
+             orphans 为删除的孤立节点 [{label, key}]，removed 为从图中移除的所有节点 id
+    """
+    if cascade not in CASCADE_MODES:
+        raise ValueError(f"Unknown cascade mode: {cascade}")
+    params = {"key": key, "batch_size": DELETE_BATCH_SIZE}
+    async with session_scope(driver, session) as session:
+        records = await read(
+            session,
+            f"{label.lower()}.delete.inspect",
+            INSPECT_NODE.format(label=label, key_field=key_field),
+            params,
+            orphan_labels=list(ORPHAN_LABELS)
+        )
+        if not records:
+            return None
+        relationships = records[0]["relationships"]
+        # 与相邻节点有多条关系时会重复出现
+        neighbors = list({m["element_id"]: m for m in records[0]["neighbors"]}.values())
+        if relationships and cascade == "restrict":
+            return {"deleted": False, "relationships": relationships, "orphans": [], "removed": []}
+
+        if relationships:
+            await auto_commit(
+                session,
+                f"{label.lower()}.delete.detach",
+                DETACH_RELATIONSHIPS.format(label=label, key_field=key_field),
+                params
+            )
+        records = await write(
+            session, f"{label.lower()}.delete", DELETE_NODE.format(label=label, key_field=key_field), params
+        )
+        if not records[0]["deleted"]:
+            return None
+
+        orphans = []
+        candidates = [m for m in neighbors if m["orphan"]] if cascade == "orphans" else []
+        if candidates:
+            records, _ = await auto_commit(
+                session,
+                f"{label.lower()}.delete.orphans",
+                DELETE_ORPHANS,
+                element_ids=[m["element_id"] for m in candidates],
+                batch_size=DELETE_BATCH_SIZE
+            )
+            deleted = {record["element_id"] for record in records}
+            orphans = [m for m in candidates if m["element_id"] in deleted]
+
+        # 删除书籍后其作者的 book_count 需要重新计算
+        if label == "Book":
+            authors = [m["element_id"] for m in neighbors if m["label"] == "Author" and m not in orphans]
+            if authors:
+                await write(session, "book.delete.recount", RECOUNT_BOOKS, element_ids=authors)
+
+    await entity_cache.invalidate(
+        entity_cache.key(label, key),
+        *(entity_cache.key(m["label"], m["key"]) for m in neighbors if m["key"] is not None)
+    )
+    removed = [node_id(label, key)] if label in NODE_KEYS else []
+    removed += [node_id(m["label"], m["key"], m["element_id"]) for m in orphans]
+    return {
+        "deleted": True,
+        "relationships": relationships,
+        "orphans": [{"label": m["label"], "key": m["key"]} for m in orphans],
+        "removed": removed,
+    }
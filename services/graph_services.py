@@ -0,0 +1,112 @@
+from app.db import open_session, read
+
+# 可视化包含的节点标签及其业务主键
+NODE_KEYS = {
+    "Book": "id",
+    "Author": "author_id",
+    "School": "id",
+    "Company": "company_id",
+}
+GRAPH_LABELS = list(NODE_KEYS)
+
+# 快照默认和最大节点数
+DEFAULT_GRAPH_NODES = 2000
+MAX_GRAPH_NODES = 20000
+MAX_GRAPH_DEPTH = 3
+
+
+def node_id(label, key, element_id=None):
+    """
+    前端使用的节点 id，如 Book:1
+    由关系接口 MERGE 出来、没有业务主键的节点使用 elementId
+    """
+    return f"{label}:{key}" if key is not None else element_id
+
+
+def graph_node(label, key, name, element_id=None):
+    """快照和变更事件中使用的节点结构"""
+    graph_id = node_id(label, key, element_id)
+    return {"id": graph_id, "name": name or graph_id, "group": label, "category": GRAPH_LABELS.index(label)}
+
+
+def parse_node_id(value):
+    """
+    解析 Book:1 形式的节点 id
+    :return: (标签, 业务主键)，Book/School 的主键为整数
+    """
+    label, _, key = value.partition(":")
+    if label not in NODE_KEYS or not key:
+        raise ValueError(f"Invalid node id: {value}")
+    if NODE_KEYS[label] == "id":
+        key = int(key)
+    return label, key
+
+
+class GraphService:
+    def __init__(self, neo4j_driver):
+        """
+        初始化图快照服务类
+        :param neo4j_driver: Neo4j 驱动实例
+        """
+        self.driver = neo4j_driver
+
+    async def snapshot(self, labels=None, seed=None, depth=1, limit=DEFAULT_GRAPH_NODES):
+        """
+        获取 Book/Author/School/Company 子图
+        :param labels: 只包含这些标签的节点，默认全部
+        :param seed: 种子节点 (标签, 主键)，只返回其 depth 跳以内的节点
+        :param depth: 种子节点的跳数
+        :param limit: 最多返回的节点数
+        :return: {"nodes": [...], "links": [...]}，links 只包含两端都在 nodes 中的关系
+        """
+        labels = labels or GRAPH_LABELS
+        params = {"labels": labels, "limit": limit}
+        if seed is None:
+            query = "MATCH (n) WHERE any(l IN labels(n) WHERE l IN $labels) WITH n LIMIT $limit"
+        else:
+            label, key = seed
+            # 可变长度路径的跳数不能参数化，depth 已在路由中限制为整数
+            query = (
+                f"MATCH (s:{label} {{{NODE_KEYS[label]}: $key}})-[*0..{int(depth)}]-(n) "
+                "WHERE any(l IN labels(n) WHERE l IN $labels) "
+                "WITH DISTINCT n LIMIT $limit"
+            )
+            params["key"] = key
+        query += (
+            " RETURN elementId(n) AS element_id, labels(n) AS labels,"
+            " n {.id, .author_id, .company_id, .name, .title, .pagerank, .community} AS props"
+        )
+
+        nodes = []
+        ids = {}
+        async with open_session(self.driver) as session:
+            for record in await read(session, "graph.nodes", query, params):
+                label = next(l for l in record["labels"] if l in NODE_KEYS)
+                props = record["props"]
+                graph_id = node_id(label, props[NODE_KEYS[label]], record["element_id"])
+                ids[record["element_id"]] = graph_id
+                node = {
+                    "id": graph_id,
+                    "name": props["name"] or props["title"] or graph_id,
+                    "group": label,
+                    "category": GRAPH_LABELS.index(label),
+                }
+                # 运行过 /analytics/jobs 后，前端可按 value 确定节点大小、按 community 着色
+                if props["pagerank"] is not None:
+                    node["value"] = props["pagerank"]
+                    node["community"] = props["community"]
+                nodes.append(node)
+
+            # 只取这些节点的出边，另一端不在快照中的边在内存中过滤掉
+            records = await read(
+                session,
+                "graph.links",
+                "UNWIND $ids AS id MATCH (a)-[r]->(b) WHERE elementId(a) = id "
+                "RETURN id AS source, type(r) AS type, elementId(b) AS target",
+                ids=list(ids)
+            )
+        links = [
+            {"source": ids[record["source"]], "target": ids[record["target"]], "type": record["type"]}
+            for record in records if record["target"] in ids
+        ]
+        return {"nodes": nodes, "links": links}
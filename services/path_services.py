@@ -0,0 +1,150 @@
+import asyncio
+
+from app.db import open_session, read
+from app.projection import graph_projection
+from services.graph_services import GRAPH_LABELS, NODE_KEYS, node_id
+
+# 最短路径的最大跳数
+DEFAULT_PATH_DEPTH = 6
+MAX_PATH_DEPTH = 10
+# 连通分量最多返回的节点 id 数
+DEFAULT_COMPONENT_NODES = 100
+MAX_COMPONENT_NODES = 10000
+# Cypher 回退时连通分量最多展开的节点数，超过后 complete 为 false
+MAX_CYPHER_COMPONENT_NODES = 20000
+
+PATH_NODE_PROJECTION = "{element_id: elementId(n), labels: labels(n), props: n {.id, .author_id, .company_id}}"
+
+COMPONENT_EXPAND_QUERY = """
+UNWIND $ids AS id
+MATCH (n)--(m) WHERE elementId(n) = id AND any(l IN labels(m) WHERE l IN $labels)
+RETURN DISTINCT elementId(m) AS element_id, labels(m) AS labels, m {.id, .author_id, .company_id} AS props
+"""
+
+
+def _graph_id(record):
+    label = next(l for l in record["labels"] if l in NODE_KEYS)
+    return node_id(label, record["props"][NODE_KEYS[label]], record["element_id"])
+
+
+class PathService:
+    def __init__(self, neo4j_driver):
+        """
+        初始化路径与连通性服务类
+        内存中的图投影可用时直接在投影上计算，否则回退到 Cypher 并在后台重建投影
+        :param neo4j_driver: Neo4j 驱动实例
+        """
+        self.driver = neo4j_driver
+
+    def _projection(self):
+        """可用的投影，不可用时返回 None 并在需要时触发后台重建"""
+        if not graph_projection.enabled:
+            return None
+        if graph_projection.fresh:
+            return graph_projection.graph
+        graph_projection.schedule_refresh(self.driver)
+        return None
+
+    async def shortest_path(self, source, target, max_depth=DEFAULT_PATH_DEPTH):
+        """
+        两个节点之间的最短路径(忽略关系方向)
+        :param source: 起点 (标签, 业务主键)
+        :param target: 终点 (标签, 业务主键)
+        :return: {"path": 图 id 列表或 None, "served_by": "projection" | "cypher"}，
+                 节点不存在时返回 None
+        """
+        graph = self._projection()
+        if graph is not None:
+            try:
+                path = graph.shortest_path(node_id(*source), node_id(*target), max_depth)
+                return {"path": path, "served_by": "projection"}
+            except KeyError:
+                # 节点不在投影中(可能由其他 worker 新建)，交给 Cypher
+                pass
+
+        (source_label, source_key), (target_label, target_key) = source, target
+        async with open_session(self.driver) as session:
+            ends = await read(
+                session,
+                "path.ends",
+                f"OPTIONAL MATCH (a:{source_label} {{{NODE_KEYS[source_label]}: $source}}) "
+                f"OPTIONAL MATCH (b:{target_label} {{{NODE_KEYS[target_label]}: $target}}) "
+                "RETURN a IS NOT NULL AS source_found, b IS NOT NULL AS target_found",
+                source=source_key, target=target_key
+            )
+            if not (ends[0]["source_found"] and ends[0]["target_found"]):
+                return None
+            if source == target:
+                return {"path": [node_id(*source)], "served_by": "cypher"}
+            # 可变长度路径的跳数不能参数化，max_depth 已在路由中限制为整数
+            records = await read(
+                session,
+                "path.shortest",
+                f"MATCH (a:{source_label} {{{NODE_KEYS[source_label]}: $source}}), "
+                f"(b:{target_label} {{{NODE_KEYS[target_label]}: $target}}) "
+                f"MATCH p = shortestPath((a)-[*..{int(max_depth)}]-(b)) "
+                f"RETURN [n IN nodes(p) | {PATH_NODE_PROJECTION}] AS nodes",
+                source=source_key, target=target_key
+            )
+        path = [_graph_id(node) for node in records[0]["nodes"]] if records else None
+        return {"path": path, "served_by": "cypher"}
+
+    async def component(self, node, limit=DEFAULT_COMPONENT_NODES):
+        """
+        节点所在的连通分量
+        :param node: (标签, 业务主键)
+        :param limit: 最多返回的节点 id 数
+        :return: {"size", "nodes", "complete", "served_by"}，节点不存在时返回 None；
+                 Cypher 回退最多展开 MAX_CYPHER_COMPONENT_NODES 个节点，超过时 complete 为 false
+        """
+        graph = self._projection()
+        if graph is not None:
+            try:
+                size, members = graph.component(node_id(*node), limit)
+                return {"size": size, "nodes": members, "complete": True, "served_by": "projection"}
+            except KeyError:
+                pass
+
+        label, key = node
+        async with open_session(self.driver) as session:
+            records = await read(
+                session,
+                "path.component_seed",
+                f"MATCH (n:{label} {{{NODE_KEYS[label]}: $key}}) RETURN elementId(n) AS element_id",
+                key=key
+            )
+            if not records:
+                return None
+            start = records[0]["element_id"]
+            seen = {start}
+            members = [node_id(*node)]
+            frontier = [start]
+            complete = True
+            # 逐层展开，直到没有新节点
+            while frontier:
+                if len(seen) >= MAX_CYPHER_COMPONENT_NODES:
+                    complete = False
+                    break
+                next_frontier = []
+                for record in await read(
+                    session, "path.component_expand", COMPONENT_EXPAND_QUERY, ids=frontier, labels=GRAPH_LABELS
+                ):
+                    if record["element_id"] in seen:
+                        continue
+                    seen.add(record["element_id"])
+                    next_frontier.append(record["element_id"])
+                    if len(members) < limit:
+                        members.append(_graph_id(record))
+                frontier = next_frontier
+        return {"size": len(seen), "nodes": members, "complete": complete, "served_by": "cypher"}
+
+    async def components(self):
+        """
+        全图连通分量统计，只在投影可用时计算
+        :return: CSRGraph.components() 的结果，投影不可用时返回 None
+        """
+        graph = self._projection()
+        if graph is None:
+            return None
+        # 遍历整个投影是 CPU 密集计算，放到线程中避免阻塞事件循环
+        return await asyncio.to_thread(graph.components)
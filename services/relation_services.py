@@ -0,0 +1,150 @@
+from app.db import read, session_scope, write
+
+# 按 id 建立 书籍-作者 关系：两端都用唯一约束的索引查找，不存在的一端不会被创建
+# 所有关系建立后再统一重新计算作者的 book_count
+LINK_BOOK_AUTHORS = """
+UNWIND $rows AS row
+MATCH (b:Book {id: row.book_id})
+MATCH (a:Author {author_id: row.author_id})
+WITH row, b, a, EXISTS { (b)-[:WRITTEN_BY]->(a) } AS existed
+MERGE (b)-[:WRITTEN_BY]->(a)
+WITH collect({
+    book_id: row.book_id, author_id: row.author_id, existed: existed,
+    book: b.title, author: a.name, book_element_id: elementId(b), author_element_id: elementId(a)
+}) AS results, collect(DISTINCT a) AS authors
+CALL {
+    WITH authors
+    UNWIND authors AS a
+    SET a.book_count = COUNT { (a)<-[:WRITTEN_BY]-() }
+}
+RETURN results
+"""
+
+# 按 id 建立 作者-学校 关系
+LINK_AUTHOR_SCHOOLS = """
+UNWIND $rows AS row
+MATCH (a:Author {author_id: row.author_id})
+MATCH (s:School {id: row.school_id})
+WITH row, a, s, EXISTS { (a)-[:WRITTEN_BY]->(s) } AS existed
+MERGE (a)-[:WRITTEN_BY]->(s)
+RETURN row.author_id AS author_id, row.school_id AS school_id, existed,
+       a.name AS author, coalesce(s.name, s.title) AS school,
+       elementId(a) AS author_element_id, elementId(s) AS school_element_id
+"""
+
+
+# 按名称建立关系(已弃用的 /create 接口)：不存在的节点会按名称新建，没有 id
+CREATE_BOOK_AUTHOR_BY_NAME = """
+MERGE (b:Book {title: $book_title})
+MERGE (a:Author {name: $author_name})
+MERGE (b)-[:WRITTEN_BY]->(a)
+ON CREATE SET a.book_count = COUNT { (a)<-[:WRITTEN_BY]-() }
+RETURN b.title AS book, a.name AS author, b.id AS book_id, a.author_id AS author_id,
+       elementId(b) AS book_element_id, elementId(a) AS author_element_id
+"""
+
+CREATE_AUTHOR_SCHOOL_BY_NAME = """
+MERGE (a:Author {name: $author_name})
+MERGE (s:School {name: $school_name})
+MERGE (a)-[:WRITTEN_BY]->(s)
+RETURN s.name AS school, a.name AS author, s.id AS school_id, a.author_id AS author_id,
+       elementId(s) AS school_element_id, elementId(a) AS author_element_id
+"""
+
+BOOK_TITLES_BY_AUTHOR_NAME = """
+MATCH (a:Author {name: $author_name})<-[:WRITTEN_BY]-(b:Book)
+RETURN a.name AS author, collect(b.title) AS books
+"""
+
+def _summarize(rows, results, keys):
+    """
+    统计新建、已存在、重复和端点不存在的关系
+    :param rows: 去重前的请求行
+    :param results: 查询返回的行，只包含两端都存在的关系
+    :param keys: 行中标识两端的字段名
+    """
+    unique = list(dict.fromkeys(tuple(row[key] for key in keys) for row in rows))
+    found = {tuple(result[key] for key in keys) for result in results}
+    created = [result for result in results if not result["existed"]]
+    return {
+        "created": len(created),
+        "existing": len(results) - len(created),
+        "duplicates": len(rows) - len(unique),
+        "missing": [dict(zip(keys, pair)) for pair in unique if pair not in found],
+        "links": created,
+    }
+
+
+class RelationService:
+    def __init__(self, neo4j_driver, session=None):
+        """
+        初始化关系服务类，关系两端按 id 查找，不会创建节点
+        按名称建立关系的方法只供已弃用的 /create 接口使用
+        :param neo4j_driver: Neo4j 驱动实例
+        :param session: 请求级 session，为空时每次调用临时打开 session
+        """
+        self.driver = neo4j_driver
+        self.session = session
+
+    async def link_book_authors(self, rows):
+        """
+        批量建立 书籍-作者 关系，已存在的关系不会重复创建，可以安全重试
+        :param rows: [{"book_id": int, "author_id": str}]，在一个事务中写入
+        :return: {"created", "existing", "duplicates", "missing", "links"}，
+                 missing 为书籍或作者不存在的行，links 为新建关系的两端
+        """
+        # 同一批次中的重复行只写一次，否则 EXISTS 在写入前求值，会都被算作新建
+        unique = [dict(zip(("book_id", "author_id"), pair)) for pair in dict.fromkeys(
+            (row["book_id"], row["author_id"]) for row in rows
+        )]
+        async with session_scope(self.driver, self.session) as session:
+            records = await write(session, "book2author.link", LINK_BOOK_AUTHORS, rows=unique)
+        return _summarize(rows, records[0]["results"], ("book_id", "author_id"))
+
+    async def link_author_schools(self, rows):
+        """
+        批量建立 作者-学校 关系，已存在的关系不会重复创建，可以安全重试
+        :param rows: [{"author_id": str, "school_id": int}]，在一个事务中写入
+        :return: {"created", "existing", "duplicates", "missing", "links"}
+        """
+        unique = [dict(zip(("author_id", "school_id"), pair)) for pair in dict.fromkeys(
+            (row["author_id"], row["school_id"]) for row in rows
+        )]
+        async with session_scope(self.driver, self.session) as session:
+            records = await write(session, "author2school.link", LINK_AUTHOR_SCHOOLS, rows=unique)
+        return _summarize(rows, [record.data() for record in records], ("author_id", "school_id"))
+
+    async def create_book_author_by_name(self, book_title, author_name):
+        """
+        按名称建立 书籍-作者 关系，不存在的书籍和作者会按名称新建
+        :return: {"book", "author", "book_id", "author_id", "book_element_id", "author_element_id"}
+        """
+        async with session_scope(self.driver, self.session) as session:
+            records = await write(
+                session, "book2author.create", CREATE_BOOK_AUTHOR_BY_NAME,
+                book_title=book_title, author_name=author_name
+            )
+        return records[0].data()
+
+    async def create_author_school_by_name(self, author_name, school_name):
+        """
+        按名称建立 作者-学校 关系，不存在的作者和学校会按名称新建
+        :return: {"school", "author", "school_id", "author_id", "school_element_id", "author_element_id"}
+        """
+        async with session_scope(self.driver, self.session) as session:
+            records = await write(
+                session, "author2school.create", CREATE_AUTHOR_SCHOOL_BY_NAME,
+                school_name=school_name, author_name=author_name
+            )
+        return records[0].data()
+
+    async def get_book_titles_by_author_name(self, author_name):
+        """
+        查询某作者的所有书籍标题，不分页
+        :return: {"author", "books"}，作者不存在或没有书籍时 books 为空列表
+        """
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(session, "book2author.books_by_author", BOOK_TITLES_BY_AUTHOR_NAME, author_name=author_name)
+        if records:
+            return {"author": records[0]["author"], "books": records[0]["books"]}
+        return {"author": author_name, "books": []}
@@ -1,34 +1,56 @@
+from app.cache import entity_cache
+from app.db import open_session, read, session_scope, stream, write
+from app.export import EXPORT_FETCH_SIZE
+from app.pagination import DEFAULT_PAGE_SIZE, projection
+from app.sequence import IdSequence
+from services.delete_services import delete_node
+
+# School 的 id 分配器，进程内共享
+school_ids = IdSequence("School", "MATCH (s:School) RETURN COALESCE(MAX(s.id), 0) AS max_id")
+
+# 列表接口可返回的字段及对应的 Cypher 表达式
+SCHOOL_FIELDS = {"id": "s.id", "title": "s.title", "author": "s.author"}
+# 可以部分更新的字段
+SCHOOL_UPDATE_FIELDS = ("title", "author")
+
+# 部分更新：查询语句固定，只有参数变化，服务端只编译一次执行计划
+UPDATE_SCHOOLS = f"""
+UNWIND $rows AS row
+MATCH (s:School {{id: row.key}})
+SET s += row.props
+RETURN row.key AS key, {projection('s', SCHOOL_FIELDS)} AS s
+"""
+
+
 class SchoolService:
-    def __init__(self, neo4j_driver):
+    def __init__(self, neo4j_driver, session=None):
         """初始化学校服务类，使用已创建的neo4j驱动
         :param neo4j_driver: Neo4j 驱动实例
+        :param session: 请求级 session，为空时每次调用临时打开 session
         """
         self.driver = neo4j_driver
+        self.session = session
 
-    def create_school(self, title, author):
+    async def create_school(self, title, author):
         """
         创建学校，自动生成唯一的school_id
         :param title: 学校名称
         :param author: 学校创建者
         :return: 新创建的学校信息
         """
-        with self.driver.session() as session:
-            # 生成唯一的school_id (通过获取当前最大ID并加1)
-            result = session.run("MATCH (s:School) RETURN COALESCE(MAX(s.id), 0) AS max_id")
-            max_id = result.single()['max_id']
-            school_id = max_id + 1
-            
+        # 从ID序列中获取唯一的school_id
+        school_id = await school_ids.next_id(self.driver)
+        async with session_scope(self.driver, self.session) as session:
             # 创建新学校
-            result = session.run(
+            records = await write(
+                session,
+                "school.create",
                 "CREATE (s:School {id: $school_id, title: $title, author: $author}) RETURN s",
                 school_id=school_id, title=title, author=author
             )
-            record = result.single()
-            if record:
-                return dict(record["s"])
-            return None
+        return dict(records[0]["s"]) if records else None
 
-    def update_school(self, school_id, new_title=None, new_author=None):
+    async def update_school(self, school_id, new_title=None, new_author=None):
         """
         更新学校信息
         :param school_id: 学校ID
@@ -36,88 +58,136 @@ class SchoolService:
         :param new_author: 新的学校创建者
         :return: 更新后的学校信息，若学校不存在则返回 None
         """
-        with self.driver.session() as session:
-            # 构建Cypher语句和参数
-            query = "MATCH (s:School {id: $school_id})"
-            set_clauses = []
-            params = {"school_id": school_id}
-
-            if new_title:
-                set_clauses.append("s.title = $new_title")
-                params["new_title"] = new_title
-            if new_author:
-                set_clauses.append("s.author = $new_author")
-                params["new_author"] = new_author
-
-            if not set_clauses:
-                # 如果没有更新内容，直接查询学校
-                result = session.run("MATCH (s:School {id: $school_id}) RETURN s", school_id=school_id)
-                record = result.single()
-                return dict(record["s"]) if record else None
-
-            query += " SET " + ", ".join(set_clauses) + " RETURN s"
-            result = session.run(query, params)
-            record = result.single()
-            return dict(record["s"]) if record else None
-
-    def delete_school(self, school_id):
-        """
-        删除学校
+        props = {}
+        if new_title:
+            props["title"] = new_title
+        if new_author:
+            props["author"] = new_author
+
+        if not props:
+            # 如果没有更新内容，直接查询学校
+            return await self._load_school(school_id)
+
+        updated = await self.update_schools({school_id: props})
+        return updated.get(school_id)
+
+    async def update_schools(self, updates):
+        """
+        批量部分更新学校，所有行使用同一条 UNWIND 查询在一个事务中写入
+        :param updates: {学校ID: {字段: 新值}}，只更新给出的字段，其他字段会被忽略
+        :return: {学校ID: 更新后的学校信息}，不存在的学校不在结果中
+        """
+        if not updates:
+            return {}
+        rows = [
+            {"key": key, "props": {field: value for field, value in props.items() if field in SCHOOL_UPDATE_FIELDS}}
+            for key, props in updates.items()
+        ]
+        async with session_scope(self.driver, self.session) as session:
+            records = await write(session, "school.update", UPDATE_SCHOOLS, rows=rows)
+        await entity_cache.invalidate(*(entity_cache.key("School", key) for key in updates))
+        return {record["key"]: record["s"] for record in records}
+
+    async def delete_school(self, school_id, cascade="restrict"):
+        """
+        删除学校，见 services.delete_services.delete_node
         :param school_id: 学校ID
-        :return: 若删除成功返回 True，若学校不存在返回 False
+        :param cascade: 删除模式 restrict/detach/orphans
+        :return: 若学校不存在返回 None，否则返回删除结果
         """
-        with self.driver.session() as session:
-            result = session.run(
-                "MATCH (s:School {id: $school_id}) DELETE s RETURN count(s) as deleted_count",
-                school_id=school_id
-            )
-            record = result.single()
-            return record["deleted_count"] == 0
+        return await delete_node(self.driver, self.session, "School", "id", school_id, cascade)
 
-    def get_school(self, school_id):
+    async def get_school(self, school_id):
         """
         获取单个学校信息
         :param school_id: 学校ID
         :return: 学校信息，若学校不存在则返回 None
         """
-        with self.driver.session() as session:
-            result = session.run("MATCH (s:School {id: $school_id}) RETURN s", school_id=school_id)
-            record = result.single()
-            return dict(record["s"]) if record else None
+        return await entity_cache.get_or_load(
+            entity_cache.key("School", school_id), lambda: self._load_school(school_id)
+        )
+
+    async def _load_school(self, school_id):
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(session, "school.get", "MATCH (s:School {id: $school_id}) RETURN s", school_id=school_id)
+        return dict(records[0]["s"]) if records else None
+
+    async def get_schools(self, school_ids):
+        """
+        用一次 UNWIND 查询批量获取学校
+        :param school_ids: 学校 ID 列表
+        :return: {id: 学校信息}，不存在的 ID 不在结果中
+        """
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(
+                session,
+                "school.batch_get",
+                f"UNWIND $ids AS key MATCH (s:School {{id: key}}) RETURN key, {projection('s', SCHOOL_FIELDS)} AS s",
+                ids=school_ids
+            )
+        return {record["key"]: record["s"] for record in records}
+
+    async def get_all_schools(self, after=0, limit=DEFAULT_PAGE_SIZE, fields=None):
+        """
+        按 id 翻页获取学校信息
+        :param after: 只返回 id 大于该值的学校，传入上一页最后一条的 id
+        :param limit: 每页数量
+        :param fields: 需要返回的字段，默认返回全部字段
+        :return: 学校信息列表，按 id 升序
+        """
+        query = (
+            "MATCH (s:School) WHERE s.id > $after "
+            "WITH s ORDER BY s.id LIMIT $limit "
+            f"RETURN {projection('s', SCHOOL_FIELDS, fields)} AS s"
+        )
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(session, "school.list", query, after=after, limit=limit)
+        return [record["s"] for record in records]
 
-    def get_all_schools(self):
+    async def iter_schools(self, fetch_size=EXPORT_FETCH_SIZE):
         """
-        获取所有学校信息
-        :return: 包含所有学校信息的列表
+        逐条迭代所有学校，用于流式导出
+        记录按 fetch_size 分批从服务端拉取，内存占用与学校总数无关
+        流式结果无法在托管事务中重放，这里使用自动提交事务和独立的 session
+        :param fetch_size: 每批拉取的记录数
+        :return: 学校信息的异步迭代器
         """
-        with self.driver.session() as session:
-            result = session.run("MATCH (s:School) RETURN s")
-            return [dict(record["s"]) for record in result]
+        async with open_session(self.driver, fetch_size=fetch_size) as session:
+            async for record in stream(session, "school.export", f"MATCH (s:School) RETURN {projection('s', SCHOOL_FIELDS)} AS s"):
+                yield record["s"]
 
 
 if __name__ == "__main__":
-    # 使用示例，需要根据实际情况修改URI、用户名和密码
-    school_service = SchoolService("bolt://localhost:7687", "neo4j", "password")
-
-    try:
-        # 创建学校
-        new_school = school_service.create_school(1, "北京大学", "蔡元培")
-        print("创建的学校:", new_school)
-
-        # 查询学校
-        school = school_service.get_school(1)
-        print("查询的学校:", school)
-
-        # 更新学校
-        updated_school = school_service.update_school(1, new_title="北京大学（北京校区）")
-        print("更新后的学校:", updated_school)
-
-        # 查询所有学校
-        all_schools = school_service.get_all_schools()
-        print("所有学校:", all_schools)
-
-        # 删除学校
-        deleted = school_service.delete_school(1)
-        print("删除结果:", "成功" if deleted else "失败")
-    finally:
-        school_service.close()
+    import asyncio
+    from neo4j import AsyncGraphDatabase
+
+    async def main():
+        # 使用示例，需要根据实际情况修改URI、用户名和密码
+        driver = AsyncGraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "password"))
+        school_service = SchoolService(driver)
+
+        try:
+            # 创建学校
+            new_school = await school_service.create_school("北京大学", "蔡元培")
+            print("创建的学校:", new_school)
+            school_id = new_school["id"]
+
+            # 查询学校
+            school = await school_service.get_school(school_id)
+            print("查询的学校:", school)
+
+            # 更新学校
+            updated_school = await school_service.update_school(school_id, new_title="北京大学（北京校区）")
+            print("更新后的学校:", updated_school)
+
+            # 查询所有学校
+            all_schools = await school_service.get_all_schools()
+            print("所有学校:", all_schools)
+
+            # 删除学校
+            deleted = await school_service.delete_school(school_id)
+            print("删除结果:", "成功" if deleted and deleted["deleted"] else "失败")
+        finally:
+            await driver.close()
+
+    asyncio.run(main())
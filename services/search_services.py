@@ -0,0 +1,162 @@
+import os
+import re
+
+from app.cache import LRUCache, ReadThroughCache
+from app.db import read, session_scope
+from app.events import graph_events
+from app.indexes import FULLTEXT_INDEXES
+from services.graph_services import NODE_KEYS, graph_node
+
+# 标签 -> 全文索引名称
+SEARCH_INDEXES = {label: name for name, label, _ in FULLTEXT_INDEXES}
+SEARCH_LABELS = list(SEARCH_INDEXES)
+# 联想模式只匹配名称字段
+NAME_FIELDS = {
+    "Book": ["title"],
+    "Author": ["name"],
+    "School": ["title", "name"],
+    "Company": ["name"],
+}
+
+# 搜索每页默认和最大数量，offset 上限避免深翻页
+DEFAULT_SEARCH_RESULTS = 20
+MAX_SEARCH_RESULTS = 100
+MAX_SEARCH_OFFSET = 1000
+# 联想默认和最大数量
+DEFAULT_TYPEAHEAD_RESULTS = 8
+MAX_TYPEAHEAD_RESULTS = 20
+# 查询最多使用的词数
+MAX_QUERY_TERMS = 8
+# 模糊匹配只用于长度不小于该值的词，短词的编辑距离 1 匹配过多
+FUZZY_MIN_LENGTH = 4
+
+# 联想结果按输入缓存，秒，0 表示关闭
+SEARCH_TYPEAHEAD_TTL = float(os.getenv("SEARCH_TYPEAHEAD_TTL", "30"))
+typeahead_cache = ReadThroughCache(LRUCache(max_entries=10000), ttl=SEARCH_TYPEAHEAD_TTL)
+
+_LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+# 大写时被 Lucene 当作运算符的词，作为搜索词时加引号
+_LUCENE_KEYWORDS = {"AND", "OR", "NOT", "TO"}
+# 词首尾的标点，分析器切词时会去掉
+_EDGE_PUNCTUATION = re.compile(r"^\W+|\W+$")
+# 中日韩文字由分析器按字切分，前缀和模糊匹配不适用
+_CJK = re.compile(r"[぀-ヿ㐀-鿿豈-﫿가-힯]")
+
+
+def lucene_query(q, prefix=True, fuzzy=False, fields=None):
+    """
+    把用户输入转换为 Lucene 查询，所有词都需要匹配
+    :param q: 用户输入，Lucene 特殊字符会被转义，AND/OR/NOT/TO 按普通词搜索
+    :param prefix: 最后一个词同时按前缀匹配(用户可能还没输入完)
+    :param fuzzy: 较长的词允许 1 个编辑距离
+    :param fields: 只在这些属性中匹配，默认为索引的全部属性
+    :return: 查询字符串，没有可搜索的词时返回 None
+    """
+    terms = [term for term in q.split() if re.search(r"\w", term)][:MAX_QUERY_TERMS]
+    clauses = []
+    for i, term in enumerate(terms):
+        escaped = f'"{term}"' if term in _LUCENE_KEYWORDS else _LUCENE_SPECIAL.sub(r"\\\1", term)
+        variants = [f"{escaped}^2"]
+        # 通配和模糊查询不经过分析器，只对去掉首尾标点后是单个词的输入生成，并自己转成小写
+        # 中间带标点的词(如 foo-bar)会被分析器切成多个词，通配无法匹配
+        word = _EDGE_PUNCTUATION.sub("", term).lower()
+        if re.fullmatch(r"\w+", word) and not _CJK.search(word):
+            if prefix and i == len(terms) - 1:
+                variants.append(f"{word}*")
+            if fuzzy and len(word) >= FUZZY_MIN_LENGTH:
+                variants.append(f"{word}~1")
+        clause = "(" + " OR ".join(variants) + ")"
+        if fields:
+            clause = "(" + " OR ".join(f"{field}:{clause}" for field in fields) + ")"
+        clauses.append(clause)
+    return " AND ".join(clauses) or None
+
+
+def search_cypher(labels):
+    """
+    在多个全文索引中查询并按得分合并，每个标签的查询语句为参数 $query_<标签>
+    每个索引取前 $window 条，合并后再 SKIP/LIMIT
+    不同索引的词频统计不同，原始得分不能直接比较：每个索引的得分先除以该索引的最高分，
+    归一化到 (0, 1] 后再合并排序，归一化得分相同时按原始得分排序
+    """
+    calls = "\n    UNION ALL\n".join(
+        f"    CALL db.index.fulltext.queryNodes('{SEARCH_INDEXES[label]}', $query_{label}, {{limit: $window}}) "
+        "YIELD node, score "
+        "WITH collect({node: node, score: score}) AS hits, max(score) AS top "
+        "UNWIND hits AS hit RETURN hit.node AS node, hit.score / top AS score, hit.score AS raw_score"
+        for label in labels
+    )
+    return (
+        f"CALL {{\n{calls}\n}}\n"
+        "WITH node, score, raw_score ORDER BY score DESC, raw_score DESC SKIP $offset LIMIT $limit\n"
+        "RETURN elementId(node) AS element_id, labels(node) AS labels, "
+        "node {.id, .author_id, .company_id, .name, .title} AS props, score"
+    )
+
+
+def _item(record):
+    label = next(l for l in record["labels"] if l in NODE_KEYS)
+    props = record["props"]
+    node = graph_node(label, props[NODE_KEYS[label]], props["name"] or props["title"], record["element_id"])
+    return {**node, "score": record["score"]}
+
+
+class SearchService:
+    def __init__(self, neo4j_driver, session=None):
+        """
+        初始化全文搜索服务类
+        :param neo4j_driver: Neo4j 驱动实例
+        :param session: 请求级 session，为空时每次调用临时打开 session
+        """
+        self.driver = neo4j_driver
+        self.session = session
+
+    async def _query(self, name, labels, queries, offset, limit):
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(
+                session,
+                name,
+                search_cypher(labels),
+                {f"query_{label}": queries[label] for label in labels},
+                window=offset + limit, offset=offset, limit=limit
+            )
+        return [_item(record) for record in records]
+
+    async def search(self, q, labels=None, offset=0, limit=DEFAULT_SEARCH_RESULTS, fuzzy=True):
+        """
+        在所有可搜索属性中按相关度搜索，最后一个词按前缀匹配
+        :param q: 搜索词
+        :param labels: 只搜索这些标签，默认全部
+        :param offset: 跳过的结果数
+        :param limit: 返回数量
+        :param fuzzy: 是否允许拼写错误
+        :return: {"items": [{id, name, group, category, score}], "next_offset"}，
+                 next_offset 为下一页的 offset，没有更多结果时为 None
+        """
+        labels = labels or SEARCH_LABELS
+        query = lucene_query(q, prefix=True, fuzzy=fuzzy)
+        if query is None:
+            return {"items": [], "next_offset": None}
+        # 多取一条判断是否还有下一页
+        items = await self._query("search.query", labels, dict.fromkeys(labels, query), offset, limit + 1)
+        return {
+            "items": items[:limit],
+            "next_offset": offset + limit if len(items) > limit else None,
+        }
+
+    async def typeahead(self, q, labels=None, limit=DEFAULT_TYPEAHEAD_RESULTS):
+        """
+        输入联想：只按名称前缀匹配，不做模糊匹配，结果按输入缓存 SEARCH_TYPEAHEAD_TTL 秒，图数据变更后失效
+        :return: {"items": [{id, name, group, category, score}]}
+        """
+        labels = labels or SEARCH_LABELS
+        queries = {label: lucene_query(q, prefix=True, fields=NAME_FIELDS[label]) for label in labels}
+        if queries[labels[0]] is None:
+            return {"items": []}
+
+        async def load():
+            return {"items": await self._query("search.typeahead", labels, queries, 0, limit)}
+
+        # 键中带有图数据版本，新建、改名、删除节点(发布图变更事件)和批量导入后旧的联想结果不再命中
+        key = f"typeahead:{graph_events.version}:{','.join(labels)}:{limit}:{' '.join(q.lower().split())}"
+        return await typeahead_cache.get_or_load(key, load)
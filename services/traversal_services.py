@@ -0,0 +1,198 @@
+from app.db import open_session, read, session_scope, stream
+from services.graph_services import GRAPH_LABELS, NODE_KEYS, graph_node, node_id
+
+# 遍历的最大跳数
+MAX_TRAVERSAL_DEPTH = 4
+# 每个节点最多展开的关系数，超过的部分被截断，避免一个超级节点撑爆内存
+DEFAULT_FAN_OUT = 50
+MAX_FAN_OUT = 1000
+# 邻域遍历最多返回的节点数
+DEFAULT_TRAVERSAL_NODES = 1000
+MAX_TRAVERSAL_NODES = 20000
+# 合作者/同校作者最多返回的作者数
+DEFAULT_TRAVERSAL_RESULTS = 100
+MAX_TRAVERSAL_RESULTS = 1000
+# 每次展开查询最多返回的关系数，决定每批展开的节点数
+EXPAND_BATCH_ROWS = 10000
+
+# 在服务端按节点截断：子查询中 LIMIT $fan_out 只取每个节点的前 fan_out 条关系
+# degree 只统计与展开相同标签的邻居，用于判断该节点是否被截断
+EXPAND_QUERY = """
+UNWIND $ids AS id
+MATCH (n) WHERE elementId(n) = id
+WITH n, id, COUNT { (n)--(m) WHERE any(l IN labels(m) WHERE l IN $labels) } AS degree
+CALL {
+    WITH n
+    MATCH (n)-[r]-(m)
+    WHERE any(l IN labels(m) WHERE l IN $labels)
+    RETURN r, m LIMIT $fan_out
+}
+RETURN id AS source, degree, type(r) AS type, startNode(r) = n AS outgoing,
+       elementId(m) AS element_id, labels(m) AS labels, m {.id, .author_id, .company_id, .name, .title} AS props
+"""
+
+# 通过共同书籍找到合作者，书籍和每本书的作者都按 fan_out 截断
+COAUTHORS_QUERY = """
+MATCH (a:Author {author_id: $author_id})<-[:WRITTEN_BY]-(b:Book)
+WITH a, b LIMIT $fan_out
+CALL {
+    WITH a, b
+    MATCH (b)-[:WRITTEN_BY]->(co:Author)
+    WHERE co <> a
+    RETURN co LIMIT $fan_out
+}
+WITH co, collect(b.title) AS books
+ORDER BY size(books) DESC, co.author_id
+LIMIT $limit
+RETURN co.author_id AS author_id, co.name AS name, elementId(co) AS element_id, books
+"""
+
+# 同一学校的其他作者，学校和每所学校的作者都按 fan_out 截断
+SAME_SCHOOL_QUERY = """
+MATCH (a:Author {author_id: $author_id})-[:WRITTEN_BY]->(s:School)
+WITH a, s LIMIT $fan_out
+CALL {
+    WITH a, s
+    MATCH (s)<-[:WRITTEN_BY]-(other:Author)
+    WHERE other <> a
+    RETURN other LIMIT $fan_out
+}
+WITH other, collect(coalesce(s.name, s.title)) AS schools
+ORDER BY size(schools) DESC, other.author_id
+LIMIT $limit
+RETURN other.author_id AS author_id, other.name AS name, elementId(other) AS element_id, schools
+"""
+
+
+def _node(labels, props, element_id):
+    label = next(l for l in labels if l in NODE_KEYS)
+    return graph_node(label, props[NODE_KEYS[label]], props["name"] or props["title"], element_id)
+
+
+class TraversalService:
+    def __init__(self, neo4j_driver):
+        """
+        初始化图遍历服务类
+        遍历结果逐条产生，由路由以 NDJSON 流式返回
+        :param neo4j_driver: Neo4j 驱动实例
+        """
+        self.driver = neo4j_driver
+
+    async def find_node(self, label, key):
+        """
+        查找遍历的起点
+        :param label: 节点标签
+        :param key: 业务主键
+        :return: {"element_id", "node"}，不存在时返回 None
+        """
+        async with session_scope(self.driver) as session:
+            records = await read(
+                session,
+                "traversal.seed",
+                f"MATCH (n:{label} {{{NODE_KEYS[label]}: $key}}) "
+                "RETURN elementId(n) AS element_id, labels(n) AS labels, n {.id, .author_id, .company_id, .name, .title} AS props",
+                key=key
+            )
+        if not records:
+            return None
+        record = records[0]
+        return {"element_id": record["element_id"], "node": _node(record["labels"], record["props"], record["element_id"])}
+
+    async def neighborhood(self, seed, depth, fan_out=DEFAULT_FAN_OUT, limit=DEFAULT_TRAVERSAL_NODES):
+        """
+        按跳数逐层展开 seed 的邻域(忽略关系方向)
+        每层的节点分批展开，每个节点最多展开 fan_out 条关系，节点总数达到 limit 后不再加入新节点
+        最后一层节点不再展开，它们之间的关系不会返回
+        :param seed: find_node 的返回值
+        :return: 异步迭代器，依次产生
+                 {"type": "node", "depth", id, name, group, category}、
+                 {"type": "link", "source", "target", "rel"} 和最后一条
+                 {"type": "summary", "nodes", "links", "depth", "truncated", "limit_reached"}，
+                 truncated 为关系数超过 fan_out、未完全展开的节点
+        """
+        visited = {seed["element_id"]: seed["node"]["id"]}
+        links = set()
+        truncated = set()
+        limit_reached = False
+        frontier = [seed["element_id"]]
+        reached = 0
+        batch_size = max(1, EXPAND_BATCH_ROWS // fan_out)
+        yield {"type": "node", "depth": 0, **seed["node"]}
+
+        async with open_session(self.driver) as session:
+            for hop in range(1, depth + 1):
+                if not frontier or limit_reached:
+                    break
+                reached = hop
+                next_frontier = []
+                for offset in range(0, len(frontier), batch_size):
+                    records = await read(
+                        session,
+                        "traversal.expand",
+                        EXPAND_QUERY,
+                        ids=frontier[offset:offset + batch_size], fan_out=fan_out, labels=GRAPH_LABELS
+                    )
+                    for record in records:
+                        source = record["source"]
+                        if record["degree"] > fan_out:
+                            truncated.add(visited[source])
+                        target = record["element_id"]
+                        if target not in visited:
+                            if len(visited) >= limit:
+                                limit_reached = True
+                                continue
+                            node = _node(record["labels"], record["props"], target)
+                            visited[target] = node["id"]
+                            next_frontier.append(target)
+                            yield {"type": "node", "depth": hop, **node}
+                        ends = (visited[source], visited[target]) if record["outgoing"] else (visited[target], visited[source])
+                        link = (*ends, record["type"])
+                        if link not in links:
+                            links.add(link)
+                            yield {"type": "link", "source": ends[0], "target": ends[1], "rel": record["type"]}
+                frontier = next_frontier
+
+        yield {
+            "type": "summary",
+            "nodes": len(visited),
+            "links": len(links),
+            "depth": reached,
+            "truncated": sorted(truncated),
+            "limit_reached": limit_reached,
+        }
+
+    async def coauthors(self, author_id, fan_out=DEFAULT_FAN_OUT, limit=DEFAULT_TRAVERSAL_RESULTS):
+        """
+        与作者有共同书籍的其他作者，按共同书籍数降序
+        :param author_id: 作者 ID
+        :return: {"author_id", "name", "id", "books"} 的异步迭代器
+        """
+        async with open_session(self.driver) as session:
+            async for record in stream(
+                session, "traversal.coauthors", COAUTHORS_QUERY,
+                author_id=str(author_id), fan_out=fan_out, limit=limit
+            ):
+                yield {
+                    "id": node_id("Author", record["author_id"], record["element_id"]),
+                    "author_id": record["author_id"],
+                    "name": record["name"],
+                    "books": record["books"],
+                }
+
+    async def same_school(self, author_id, fan_out=DEFAULT_FAN_OUT, limit=DEFAULT_TRAVERSAL_RESULTS):
+        """
+        与作者关联同一学校的其他作者，按共同学校数降序
+        :param author_id: 作者 ID
+        :return: {"author_id", "name", "id", "schools"} 的异步迭代器
+        """
+        async with open_session(self.driver) as session:
+            async for record in stream(
+                session, "traversal.same_school", SAME_SCHOOL_QUERY,
+                author_id=str(author_id), fan_out=fan_out, limit=limit
+            ):
+                yield {
+                    "id": node_id("Author", record["author_id"], record["element_id"]),
+                    "author_id": record["author_id"],
+                    "name": record["name"],
+                    "schools": record["schools"],
+                }
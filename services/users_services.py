@@ -1,48 +1,71 @@
+from app.cache import entity_cache
+from app.db import open_session, read, session_scope, stream, write
+from app.export import EXPORT_FETCH_SIZE
+from app.pagination import DEFAULT_PAGE_SIZE, projection
+from app.sequence import IdSequence
+from services.delete_services import delete_node
+
+# User 的 user_id 分配器，进程内共享
+user_ids = IdSequence("User", "MATCH (u:User) RETURN COALESCE(MAX(toInteger(u.user_id)), 0) AS max_id")
+
+# 列表接口可返回的字段及对应的 Cypher 表达式，email 不在数据库中，由 name 生成
+USER_FIELDS = {
+    "id": "toInteger(u.user_id)",
+    "name": "u.name",
+    "email": "toLower(u.name) + '@example.com'",
+}
+
+
 class UserService:
-    def __init__(self, neo4j_driver):
+    def __init__(self, neo4j_driver, session=None):
         """
         初始化用户服务类
         :param neo4j_driver: Neo4j 驱动实例
+        :param session: 请求级 session，为空时每次调用临时打开 session
         """
         self.driver = neo4j_driver
+        self.session = session
 
-    def create_user(self, name, age):
+    async def create_user(self, name, age):
         """
         创建用户节点
         :param name: 用户名
         :param age: 用户年龄
         :return: 创建的用户节点
         """
-        with self.driver.session() as session:
-            # 自动生成唯一ID：查询当前最大ID并加1
-            result = session.run(
-                "MATCH (u:User) RETURN COALESCE(MAX(toInteger(u.user_id)), 0) as max_id"
-            )
-            max_id = result.single()['max_id']
-            new_id = str(max_id + 1)
-            
+        # 自动生成唯一ID：从ID序列中获取
+        new_id = str(await user_ids.next_id(self.driver))
+        async with session_scope(self.driver, self.session) as session:
             # 创建新用户
-            result = session.run(
+            records = await write(
+                session,
+                "user.create",
                 "CREATE (u:User {user_id: $user_id, name: $name, age: $age}) RETURN u",
                 user_id=new_id, name=name, age=age
             )
-            return result.single()[0]
+        return records[0][0]
 
-    def get_user(self, user_id):
+    async def get_user(self, user_id):
         """
         根据用户 ID 查询用户
         :param user_id: 用户 ID
-        :return: 用户节点，若不存在则返回 None
+        :return: 用户属性字典，若不存在则返回 None
         """
-        with self.driver.session() as session:
-            result = session.run(
+        return await entity_cache.get_or_load(
+            entity_cache.key("User", user_id), lambda: self._load_user(user_id)
+        )
+
+    async def _load_user(self, user_id):
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(
+                session,
+                "user.get",
                 "MATCH (u:User {user_id: $user_id}) RETURN u",
                 user_id=user_id
             )
-            record = result.single()
-            return record[0] if record else None
+        return dict(records[0][0]) if records else None
 
-    def update_user(self, user_id, new_name=None, new_age=None):
+    async def update_user(self, user_id, new_name=None, new_age=None):
         """
         修改用户信息
         :param user_id: 用户 ID
@@ -50,56 +73,61 @@ class UserService:
         :param new_age: 新年龄
         :return: 更新后的用户节点，若用户不存在则返回 None
         """
-        with self.driver.session() as session:
-            query = "MATCH (u:User {user_id: $user_id})"
-            set_clauses = []
-            params = {"user_id": user_id}
-            
-            if new_name is not None:
-                set_clauses.append("u.name = $new_name")
-                params["new_name"] = new_name
-            if new_age is not None:
-                set_clauses.append("u.age = $new_age")
-                params["new_age"] = new_age
-            
-            if set_clauses:
-                query += " SET " + ", ".join(set_clauses)
-                query += " RETURN u"
-                result = session.run(query, **params)
-                record = result.single()
-                return record[0] if record else None
+        query = "MATCH (u:User {user_id: $user_id})"
+        set_clauses = []
+        params = {"user_id": user_id}
+
+        if new_name is not None:
+            set_clauses.append("u.name = $new_name")
+            params["new_name"] = new_name
+        if new_age is not None:
+            set_clauses.append("u.age = $new_age")
+            params["new_age"] = new_age
+
+        if not set_clauses:
             return None
+        query += " SET " + ", ".join(set_clauses)
+        query += " RETURN u"
+        async with session_scope(self.driver, self.session) as session:
+            records = await write(session, "user.update", query, params)
+        await entity_cache.invalidate(entity_cache.key("User", user_id))
+        return records[0][0] if records else None
 
-    def delete_user(self, user_id):
+    async def delete_user(self, user_id, cascade="restrict"):
         """
-        根据用户 ID 删除用户
-        :param user_id: 用户 ID
-        :return: 是否删除成功
+        删除用户，见 services.delete_services.delete_node
+        :param user_id: 用户ID
+        :param cascade: 删除模式 restrict/detach/orphans
+        :return: 若用户不存在返回 None，否则返回删除结果
         """
-        with self.driver.session() as session:
-            result = session.run(
-                "MATCH (u:User {user_id: $user_id}) DELETE u RETURN count(u) as deleted_count",
-                user_id=user_id
-            )
-            return result.single()[0] == 0
-    
-    def get_all_users(self):
+        return await delete_node(self.driver, self.session, "User", "user_id", user_id, cascade)
+
+    async def get_all_users(self, after="", limit=DEFAULT_PAGE_SIZE, fields=None):
         """
-        获取所有用户
+        按 user_id 翻页获取用户
+        user_id 以字符串存储，翻页顺序与 user_id 索引一致（字符串序）
+        :param after: 只返回 user_id 按字符串顺序排在该值之后的用户，传入上一页最后一条的 id(字符串)，空字符串表示第一页
+        :param limit: 每页数量
+        :param fields: 需要返回的字段，默认返回全部字段
         :return: 用户列表
         """
-        with self.driver.session() as session:
-            result = session.run(
-                "MATCH (u:User) RETURN u"
-            )
-            users = []
-            for record in result:
-                user_node = record["u"]
-                # Convert Neo4j node to dictionary format
-                user_dict = {
-                    "id": int(user_node["user_id"]),  # Convert to int to match the User model
-                    "name": user_node["name"],
-                    "email": f"{user_node['name'].lower()}@example.com"  # Generate email as it's not in the database
-                }
-                users.append(user_dict)
-            return users
+        query = (
+            "MATCH (u:User) WHERE u.user_id > $after "
+            "WITH u ORDER BY u.user_id LIMIT $limit "
+            f"RETURN {projection('u', USER_FIELDS, fields)} AS u"
+        )
+        async with session_scope(self.driver, self.session) as session:
+            records = await read(session, "user.list", query, after=str(after), limit=limit)
+        return [record["u"] for record in records]
+
+    async def iter_users(self, fetch_size=EXPORT_FETCH_SIZE):
+        """
+        逐条迭代所有用户，用于流式导出
+        记录按 fetch_size 分批从服务端拉取，内存占用与用户总数无关
+        流式结果无法在托管事务中重放，这里使用自动提交事务和独立的 session
+        :param fetch_size: 每批拉取的记录数
+        :return: 用户信息的异步迭代器
+        """
+        async with open_session(self.driver, fetch_size=fetch_size) as session:
+            async for record in stream(session, "user.export", f"MATCH (u:User) RETURN {projection('u', USER_FIELDS)} AS u"):
+                yield record["u"]
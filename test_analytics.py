@@ -0,0 +1,87 @@
+import asyncio
+from array import array
+
+import pytest
+
+from app.analytics import AnalyticsJobs, compute_scores
+
+# compute_scores 需要可选依赖 numpy/scipy，不需要 Neo4j
+pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+
+def scores(n, edges, **options):
+    return compute_scores(n, array("i", [a for a, _ in edges]), array("i", [b for _, b in edges]), **options)
+
+
+def test_degree_counts_both_ends():
+    result = scores(4, [(0, 1), (0, 2), (0, 3)])
+    assert result["degree"].tolist() == [3, 1, 1, 1]
+
+
+def test_pagerank_sums_to_one_and_ranks_hub_first():
+    # 星形图：中心节点的 PageRank 最高，叶子节点相同
+    result = scores(5, [(0, 1), (0, 2), (0, 3), (0, 4)])
+    rank = result["pagerank"]
+    assert abs(rank.sum() - 1) < 1e-6
+    assert rank.argmax() == 0
+    assert max(rank[1:]) - min(rank[1:]) < 1e-9
+    assert 1 <= result["iterations"] <= 100
+
+
+def test_pagerank_spreads_dangling_nodes_evenly():
+    # 孤立节点的分数均匀分给所有节点
+    result = scores(3, [(0, 1)])
+    rank = result["pagerank"]
+    assert abs(rank.sum() - 1) < 1e-6
+    assert abs(rank[0] - rank[1]) < 1e-9
+    assert rank[2] < rank[0]
+
+
+def test_label_propagation_separates_components():
+    # 两个不相连的书籍-作者子图，各自形成一个社区
+    result = scores(6, [(0, 1), (1, 2), (0, 2), (3, 4), (4, 5), (3, 5)])
+    community = result["community"].tolist()
+    assert community[0] == community[1] == community[2]
+    assert community[3] == community[4] == community[5]
+    assert community[0] != community[3]
+    assert sorted(set(community)) == [0, 1]
+
+
+def test_label_propagation_converges_on_bipartite_graph():
+    # 一位作者和三本书：自环避免同步更新时的来回振荡
+    result = scores(4, [(1, 0), (2, 0), (3, 0)], community_iterations=20)
+    assert len(set(result["community"].tolist())) == 1
+
+
+def test_empty_graph():
+    result = scores(0, [])
+    assert len(result["degree"]) == len(result["pagerank"]) == len(result["community"]) == 0
+    assert result["iterations"] == 0
+
+
+def test_history_keeps_queued_and_running_jobs():
+    jobs = AnalyticsJobs(history=2)
+
+    async def submit_all():
+        # 没有驱动时任务在导出阶段失败；排队的任务在锁释放前保持 queued
+        async with jobs._lock:
+            submitted = [jobs.submit(None) for _ in range(4)]
+            assert len(jobs.list()) == 4
+        await asyncio.gather(*jobs._tasks)
+        return submitted
+
+    submitted = asyncio.run(submit_all())
+    assert all(job["status"] == "failed" for job in submitted)
+    assert [job["id"] for job in jobs.list()] == [submitted[3]["id"], submitted[2]["id"]]
+
+
+if __name__ == "__main__":
+    test_degree_counts_both_ends()
+    test_pagerank_sums_to_one_and_ranks_hub_first()
+    test_pagerank_spreads_dangling_nodes_evenly()
+    test_label_propagation_separates_components()
+    test_label_propagation_converges_on_bipartite_graph()
+    test_empty_graph()
+    test_history_keeps_queued_and_running_jobs()
+    print("Analytics scores are correct.")
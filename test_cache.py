@@ -0,0 +1,94 @@
+import asyncio
+
+from app.cache import LRUCache, ReadThroughCache
+
+
+def test_concurrent_loads_share_one_call():
+    cache = ReadThroughCache(LRUCache(max_entries=10), ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+
+    assert asyncio.run(run()) == [{"id": 1}] * 5
+    assert len(calls) == 1
+
+
+def test_cancelled_loader_does_not_fail_waiters():
+    # 加载的请求被取消(客户端断开)，同时等待同一个键的请求应自己加载，而不是收到 CancelledError
+    cache = ReadThroughCache(LRUCache(max_entries=10), ttl=60)
+    started = []
+
+    async def loader():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return {"id": 1}
+
+    async def run():
+        first = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        try:
+            await first
+        except asyncio.CancelledError:
+            pass
+        else:
+            raise AssertionError("first request was not cancelled")
+        return await second
+
+    assert asyncio.run(run()) == {"id": 1}
+    assert len(started) == 2
+
+
+def test_cancelled_waiter_does_not_cancel_loader():
+    cache = ReadThroughCache(LRUCache(max_entries=10), ttl=60)
+
+    async def loader():
+        await asyncio.sleep(0.03)
+        return {"id": 1}
+
+    async def run():
+        first = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0.01)
+        second.cancel()
+        try:
+            await second
+        except asyncio.CancelledError:
+            pass
+        else:
+            raise AssertionError("waiter was not cancelled")
+        return await first
+
+    assert asyncio.run(run()) == {"id": 1}
+
+
+def test_loader_error_is_shared_and_not_cached():
+    cache = ReadThroughCache(LRUCache(max_entries=10), ttl=60)
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("k", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert asyncio.run(cache.backend.get("k")) is None
+
+
+if __name__ == "__main__":
+    test_concurrent_loads_share_one_call()
+    test_cancelled_loader_does_not_fail_waiters()
+    test_cancelled_waiter_does_not_cancel_loader()
+    test_loader_error_is_shared_and_not_cached()
+    print("Read-through cache handles cancellation.")
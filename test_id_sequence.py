@@ -0,0 +1,52 @@
+from neo4j import AsyncGraphDatabase
+import asyncio
+import os
+
+from app.indexes import ensure_schema
+from app.sequence import IdSequence
+
+SEQUENCE_NAME = "__test_id_sequence__"
+WORKERS = 4          # 模拟的进程数，每个进程持有自己的 IdSequence 实例
+TASKS_PER_WORKER = 50
+IDS_PER_TASK = 20
+
+
+async def allocate_concurrently():
+    # 使用与db.py相同的连接配置
+    NEO4J_URI = os.getenv("NEO4J_URI", "neo4j://localhost:7687")
+    NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+    NEO4J_PASS = os.getenv("NEO4J_PASS", "fengjutian")
+
+    driver = AsyncGraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+    try:
+        # Sequence.name 唯一约束保证并发初始化时只会创建一个 Sequence 节点
+        await ensure_schema(driver)
+        # 很小的 block_size，让各个"进程"频繁地并发预留ID段
+        sequences = [
+            IdSequence(SEQUENCE_NAME, "RETURN 0 AS max_id", block_size=7)
+            for _ in range(WORKERS)
+        ]
+
+        async def task(sequence):
+            return [await sequence.next_id(driver) for _ in range(IDS_PER_TASK)]
+
+        batches = await asyncio.gather(*(
+            task(sequence) for sequence in sequences for _ in range(TASKS_PER_WORKER)
+        ))
+        return [i for batch in batches for i in batch]
+    finally:
+        async with driver.session() as session:
+            await session.run("MATCH (s:Sequence {name: $name}) DELETE s", name=SEQUENCE_NAME)
+        await driver.close()
+
+
+def test_concurrent_allocation_has_no_duplicates():
+    ids = asyncio.run(allocate_concurrently())
+    assert len(ids) == WORKERS * TASKS_PER_WORKER * IDS_PER_TASK
+    assert len(set(ids)) == len(ids), "duplicate ids allocated"
+    assert min(ids) >= 1
+
+
+if __name__ == "__main__":
+    test_concurrent_allocation_has_no_duplicates()
+    print("No duplicate ids allocated.")
@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+
+# 导入 main 的累计耗时上限，毫秒
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "800"))
+# 导入应用时不应加载的模块：驱动在 lifespan 中才导入，可选依赖在使用时才导入
+DEFERRED_MODULES = ["neo4j", "numpy", "scipy", "redis"]
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times(module):
+    """
+    在新的解释器中用 python -X importtime 导入模块
+    :return: {模块名: 累计耗时(微秒)}
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main_import_ms():
+    # 先导入一次，生成 __pycache__，只测量导入本身
+    import_times("main")
+    return import_times("main")["main"] / 1000
+
+
+def test_main_import_within_budget():
+    elapsed_ms = main_import_ms()
+    assert elapsed_ms < IMPORT_TIME_BUDGET_MS, f"import main took {elapsed_ms:.0f}ms, budget {IMPORT_TIME_BUDGET_MS:.0f}ms"
+
+
+def test_main_import_defers_driver_and_optional_dependencies():
+    times = import_times("main")
+    loaded = [module for module in DEFERRED_MODULES if module in times]
+    assert not loaded, f"import main loaded {loaded}"
+
+
+def test_schemas_import_does_not_load_app():
+    times = import_times("app.schemas")
+    loaded = [module for module in ["neo4j", "fastapi", "app.db"] if module in times]
+    assert not loaded, f"import app.schemas loaded {loaded}"
+
+
+if __name__ == "__main__":
+    test_main_import_within_budget()
+    test_main_import_defers_driver_and_optional_dependencies()
+    test_schemas_import_does_not_load_app()
+    print(f"import main: {main_import_ms():.0f}ms (budget {IMPORT_TIME_BUDGET_MS:.0f}ms)")
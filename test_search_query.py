@@ -0,0 +1,63 @@
+from services.search_services import MAX_QUERY_TERMS, lucene_query, search_cypher
+
+
+def test_terms_are_all_required_and_last_term_is_prefixed():
+    assert lucene_query("hobbit tolkien") == "(hobbit^2) AND (tolkien^2 OR tolkien*)"
+
+
+def test_keywords_are_quoted():
+    # 大写的 AND/OR/NOT/TO 不能作为运算符发送
+    query = lucene_query("war AND peace OR NOT TO", prefix=False)
+    assert query == '(war^2) AND ("AND"^2) AND (peace^2) AND ("OR"^2) AND ("NOT"^2) AND ("TO"^2)'
+    # 前缀匹配用小写，不是运算符
+    assert lucene_query("NOT") == '("NOT"^2 OR not*)'
+    # 小写的 and 不是运算符
+    assert lucene_query("and", prefix=False) == "(and^2)"
+
+
+def test_punctuation_is_escaped_and_stripped_from_variants():
+    assert lucene_query("hello world!", fuzzy=True) == "(hello^2 OR hello~1) AND (world\\!^2 OR world* OR world~1)"
+    assert lucene_query("c++") == "(c\\+\\+^2 OR c*)"
+    # 字段语法和引号被转义，不能改变查询结构
+    assert lucene_query('"(title:x)"') == '(\\"\\(title\\:x\\)\\"^2)'
+    # 中间带标点的词会被分析器切开，不生成通配和模糊变体
+    assert lucene_query("foo-bar", fuzzy=True) == "(foo\\-bar^2)"
+
+
+def test_cjk_terms_are_not_prefixed_or_fuzzy():
+    assert lucene_query("红楼梦", fuzzy=True) == "(红楼梦^2)"
+    assert lucene_query("曹雪芹 红楼梦") == "(曹雪芹^2) AND (红楼梦^2)"
+
+
+def test_fields_restrict_each_clause():
+    assert lucene_query("tol", fields=["name"]) == "(name:(tol^2 OR tol*))"
+
+
+def test_no_searchable_terms():
+    assert lucene_query("") is None
+    assert lucene_query("   ") is None
+    assert lucene_query("&& || !") is None
+
+
+def test_term_count_is_limited():
+    query = lucene_query(" ".join(f"w{i}" for i in range(MAX_QUERY_TERMS + 5)), prefix=False)
+    assert query.count(" AND ") == MAX_QUERY_TERMS - 1
+
+
+def test_scores_are_normalized_per_index():
+    # 各索引的得分先除以该索引的最高分，再合并排序
+    cypher = search_cypher(["Book", "Author"])
+    assert cypher.count("hit.score / top AS score") == 2
+    assert "ORDER BY score DESC, raw_score DESC" in cypher
+
+
+if __name__ == "__main__":
+    test_terms_are_all_required_and_last_term_is_prefixed()
+    test_keywords_are_quoted()
+    test_punctuation_is_escaped_and_stripped_from_variants()
+    test_cjk_terms_are_not_prefixed_or_fuzzy()
+    test_fields_restrict_each_clause()
+    test_no_searchable_terms()
+    test_term_count_is_limited()
+    test_scores_are_normalized_per_index()
+    print("Lucene queries are correct.")